@@ -1,24 +1,35 @@
 // app/api/events/route.js
 import { NextResponse } from 'next/server';
-import axios from 'axios';
 
 // Environment variable for Flask webhook URL - add this to your .env.local file
 const WEBHOOK_URL = process.env.WEBHOOK_URL || 'http://localhost:8000/api/events';
 
-export async function GET() {
+export async function GET(request) {
   try {
-    // Fetch events from the Flask webhook
-    const response = await axios.get(WEBHOOK_URL);
-    
-    // Return the data
-    return NextResponse.json(response.data);
+    // Forward paging/format parameters (after, limit, format) to the Flask webhook
+    const { search } = new URL(request.url);
+    const response = await fetch(`${WEBHOOK_URL}${search}`);
+
+    if (!response.ok) {
+      console.error('Error fetching events from webhook:', response.status);
+      return NextResponse.json(
+        { error: 'Failed to fetch events' },
+        { status: response.status }
+      );
+    }
+
+    // Pass the body through as it streams in instead of buffering it
+    return new Response(response.body, {
+      status: 200,
+      headers: { 'Content-Type': response.headers.get('Content-Type') || 'application/json' }
+    });
   } catch (error) {
     console.error('Error fetching events from webhook:', error);
-    
+
     // Return error with appropriate status code
     return NextResponse.json(
       { error: 'Failed to fetch events' },
-      { status: error.response?.status || 500 }
+      { status: 500 }
     );
   }
 }
\ No newline at end of file
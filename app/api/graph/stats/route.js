@@ -0,0 +1,29 @@
+// app/api/graph/stats/route.js
+import { NextResponse } from 'next/server';
+
+// Flask endpoint for whole-graph statistics - add this to your .env.local file
+const GRAPH_STATS_URL = process.env.GRAPH_STATS_URL || 'http://localhost:8000/api/graph/stats';
+
+export async function GET(request) {
+  try {
+    // Forward top_k/components to the Flask endpoint
+    const { search } = new URL(request.url);
+    const response = await fetch(`${GRAPH_STATS_URL}${search}`);
+
+    if (!response.ok) {
+      console.error('Error fetching graph stats:', response.status);
+      return NextResponse.json(
+        { error: 'Failed to fetch graph stats' },
+        { status: response.status }
+      );
+    }
+
+    return NextResponse.json(await response.json());
+  } catch (error) {
+    console.error('Error fetching graph stats:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch graph stats' },
+      { status: 500 }
+    );
+  }
+}
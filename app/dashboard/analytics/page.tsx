@@ -9,6 +9,7 @@ import { useRouter } from 'next/navigation';
 import mapboxgl from 'mapbox-gl';
 import 'mapbox-gl/dist/mapbox-gl.css';
 import axios from 'axios';
+import { fetchEventPages } from '@/lib/eventStream';
 
 // Set your Mapbox access token here
 // In production, use environment variables
@@ -16,6 +17,7 @@ mapboxgl.accessToken = process.env.NEXT_PUBLIC_MAPBOX_ACCESS_TOKEN || 'YOUR_MAPB
 
 // Define our event data interface
 interface EventData {
+  key?: string;
   source: string;
   goldsteinscore: number;
   quadclass: number;
@@ -82,13 +84,13 @@ function GeoEventAnalysis() {
     const fetchEvents = async () => {
       try {
         setLoading(true);
-        const response = await fetch('/api/events');
-        
-        if (!response.ok) {
-          throw new Error(`Error fetching events: ${response.status}`);
-        }
-        
-        const data = await response.json();
+        // Stream events page by page so the first results show up early
+        const data: EventData[] = await fetchEventPages('/api/events', {
+          onPage: (_page: EventData[], loaded: EventData[]) => {
+            setEvents([...loaded]);
+            setFilteredEvents([...loaded]);
+          }
+        });
         setEvents(data);
         setFilteredEvents(data); // Initially show all events
       } catch (err) {
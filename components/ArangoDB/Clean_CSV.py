@@ -1,132 +1,421 @@
 import pandas as pd
 import numpy as np
+import csv
+import importlib.util
 import os
-import time
+import warnings
 from datetime import datetime
 import shutil
+from dir_watcher import DirectoryWatcher, is_candidate
 
 # Define input and output directories
 INPUT_DIR = "/Users/aahilali/Desktop/my-app/components/ArangoDBInput"
 OUTPUT_DIR = "/Users/aahilali/Desktop/my-app/components/ArangoDBOutput"
 
-def clean_gdelt_csv(input_file, output_file):
+# Worker processes cleaning files picked up by the directory watcher
+WATCH_WORKERS = int(os.getenv("CLEAN_WORKERS", "2"))
+
+# GDELT 2.0 export column index -> cleaned column name
+GDELT_COLUMNS = {
+    0: 'GlobalEventID',
+    1: 'Day',
+    2: 'MonthYear',
+    3: 'Year',
+    4: 'FractionDate',
+    5: 'Actor1Type2Code',
+    6: 'Actor1Type1Code',
+    16: 'Actor1Type3Code',
+    17: 'Actor1CountryCode',
+    25: 'IsRootEvent',
+    26: 'EventCode',
+    27: 'EventBaseCode',
+    28: 'EventRootCode',
+    29: 'QuadClass',
+    30: 'GoldsteinScale',
+    31: 'NumMentions',
+    32: 'NumSources',
+    33: 'NumArticles',
+    34: 'AvgTone',
+    35: 'Actor1Geo_Type',
+    36: 'Actor1Geo_Fullname',
+    37: 'Actor1Geo_CountryCode',
+    38: 'Actor1Geo_ADM1Code',
+    39: 'Actor1Geo_ADM2Code',
+    40: 'Actor1Geo_Lat',
+    41: 'Actor1Geo_Long',
+    42: 'Actor1Geo_FeatureID',
+    59: 'DateAdded',
+    60: 'Source'
+}
+
+# Total number of tab-separated fields in an export row
+GDELT_FIELD_COUNT = 61
+
+# Explicit dtypes for the kept columns; anything not listed is text
+INT_COLUMNS = ['Day', 'MonthYear', 'Year', 'IsRootEvent', 'EventCode', 'EventBaseCode',
+               'EventRootCode', 'QuadClass', 'NumMentions', 'NumSources', 'NumArticles',
+               'Actor1Geo_Type', 'DateAdded']
+FLOAT_COLUMNS = ['FractionDate', 'GoldsteinScale', 'AvgTone', 'Actor1Geo_Lat', 'Actor1Geo_Long']
+
+# Chunked cleaning: estimated memory per parsed row (raw text, parser
+# buffers and typed columns) and average raw line length of an export
+BYTES_PER_ROW = 2048
+RAW_BYTES_PER_ROW = 512
+MIN_CHUNK_ROWS = 1000
+DEFAULT_MAX_MEMORY_MB = 256
+
+# Set CLEAN_MAX_MEMORY_MB to stream files from the input directory in
+# chunks under that budget instead of loading each one whole
+MAX_MEMORY_MB = int(os.getenv("CLEAN_MAX_MEMORY_MB", "0")) or None
+
+# Every field gets a name so both engines can select columns by name
+ALL_FIELD_NAMES = [GDELT_COLUMNS.get(i, f'_unused_{i}') for i in range(GDELT_FIELD_COUNT)]
+KEPT_COLUMNS = list(GDELT_COLUMNS.values())
+
+def _pandas_dtypes():
+    dtypes = {name: str for name in KEPT_COLUMNS}
+    dtypes.update({name: 'Int64' for name in INT_COLUMNS})
+    dtypes.update({name: 'float64' for name in FLOAT_COLUMNS})
+    return dtypes
+
+def _coerce_types(df):
+    """Convert text columns to the declared dtypes, turning bad values into nulls"""
+    for name in INT_COLUMNS:
+        df[name] = pd.to_numeric(df[name], errors='coerce').round().astype('Int64')
+    for name in FLOAT_COLUMNS:
+        df[name] = pd.to_numeric(df[name], errors='coerce').astype('float64')
+    return df
+
+def _drop_invalid_rows(df):
+    """Drop rows without a numeric event ID or a day; returns (df, dropped count)"""
+    valid = df['GlobalEventID'].str.fullmatch(r'\d+').fillna(False).astype(bool) & df['Day'].notna()
+    if valid.all():
+        return df, 0
+    return df[valid].reset_index(drop=True), int((~valid).sum())
+
+def _read_with_pyarrow(input_file):
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    rejected = []
+
+    def skip_invalid_row(row):
+        rejected.append(row.number)
+        return 'skip'
+
+    def read(column_types):
+        table = pa_csv.read_csv(
+            input_file,
+            read_options=pa_csv.ReadOptions(column_names=ALL_FIELD_NAMES),
+            parse_options=pa_csv.ParseOptions(delimiter='\t', quote_char=False,
+                                              invalid_row_handler=skip_invalid_row),
+            convert_options=pa_csv.ConvertOptions(include_columns=KEPT_COLUMNS,
+                                                  column_types=column_types,
+                                                  strings_can_be_null=True),
+        )
+        return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+    column_types = {name: pa.string() for name in KEPT_COLUMNS}
+    column_types.update({name: pa.int64() for name in INT_COLUMNS})
+    column_types.update({name: pa.float64() for name in FLOAT_COLUMNS})
     try:
-        # Read the CSV file without headers since they're not labeled
-        df = pd.read_csv(input_file, header=None,
-                        delimiter='\t',  # Changed to tab delimiter
-                        on_bad_lines='warn',
-                        engine='python')
-        
-        # Define the new column headers
-        new_headers = {
-            0: 'GlobalEventID',
-            1: 'Day',
-            2: 'MonthYear',
-            3: 'Year',
-            4: 'FractionDate',
-            5: 'Actor1Type2Code',
-            6: 'Actor1Type1Code',
-            16: 'Actor1Type3Code',
-            17: 'Actor1CountryCode',
-            25: 'IsRootEvent',
-            26: 'EventCode',
-            27: 'EventBaseCode',
-            28: 'EventRootCode',
-            29: 'QuadClass',
-            30: 'GoldsteinScale',
-            31: 'NumMentions',
-            32: 'NumSources',
-            33: 'NumArticles',
-            34: 'AvgTone',
-            35: 'Actor1Geo_Type',
-            36: 'Actor1Geo_Fullname',
-            37: 'Actor1Geo_CountryCode',
-            38: 'Actor1Geo_ADM1Code',
-            39: 'Actor1Geo_ADM2Code',
-            40: 'Actor1Geo_Lat',
-            41: 'Actor1Geo_Long',
-            42: 'Actor1Geo_FeatureID',
-            60: 'Source'
-        }
-        
-        # Keep only the columns we want (defined in new_headers)
-        columns_to_keep = list(new_headers.keys())
-        df = df[columns_to_keep]
-        
-        # Rename the columns
-        df.columns = new_headers.values()
-        
-        # Save the cleaned data to a new CSV file
+        df = read(column_types)
+    except pa.ArrowInvalid:
+        # A value that does not fit its dtype: read as text and coerce instead
+        rejected.clear()
+        df = _coerce_types(read({name: pa.string() for name in KEPT_COLUMNS}))
+    return df, len(rejected)
+
+C_ENGINE_OPTIONS = dict(
+    header=None,
+    names=ALL_FIELD_NAMES,
+    usecols=KEPT_COLUMNS,
+    delimiter='\t',
+    quoting=csv.QUOTE_NONE,
+    on_bad_lines='warn',
+    engine='c',
+)
+
+def _count_skipped_lines(caught):
+    # The C parser reports skipped lines as ParserWarnings, several per message
+    return sum(str(w.message).count('Skipping line') for w in caught)
+
+def _read_with_c_engine(input_file):
+    def read(dtype):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            df = pd.read_csv(input_file, dtype=dtype, **C_ENGINE_OPTIONS)
+        return df, _count_skipped_lines(caught)
+
+    try:
+        return read(_pandas_dtypes())
+    except (ValueError, TypeError):
+        # A value that does not fit its dtype: read as text and coerce instead
+        df, rejected = read(str)
+        return _coerce_types(df), rejected
+
+def _resolve_engine(engine):
+    if engine == 'auto':
+        return 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+    return engine
+
+def read_gdelt_export(input_file, engine='auto'):
+    """Read only the kept columns of a GDELT export, already typed.
+
+    `engine` is 'pyarrow' (multi-threaded columnar reader), 'c' (pandas C
+    parser) or 'auto' (pyarrow when installed). Malformed lines and rows
+    without an event ID or day are skipped.
+    Returns (DataFrame, number of rejected rows).
+    """
+    engine = _resolve_engine(engine)
+    if engine == 'pyarrow':
+        df, rejected = _read_with_pyarrow(input_file)
+    elif engine == 'c':
+        df, rejected = _read_with_c_engine(input_file)
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
+
+    df, invalid = _drop_invalid_rows(df)
+    return df, rejected + invalid
+
+def parquet_path(output_file):
+    """Parquet file written next to a cleaned CSV"""
+    return os.path.splitext(output_file)[0] + '.parquet'
+
+def write_cleaned(df, output_file, output_format='csv'):
+    """Write cleaned rows as 'csv', 'parquet' or 'both'; returns the paths written"""
+    written = []
+    if output_format in ('csv', 'both'):
         df.to_csv(output_file, index=False)
+        written.append(output_file)
+    if output_format in ('parquet', 'both'):
+        df.to_parquet(parquet_path(output_file), index=False)
+        written.append(parquet_path(output_file))
+    if not written:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return written
+
+def _iter_chunks_pyarrow(source, chunk_rows):
+    from pyarrow import csv as pa_csv
+    import pyarrow as pa
+
+    skipped = [0]
+
+    def skip_invalid_row(row):
+        skipped[0] += 1
+        return 'skip'
+
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(column_names=ALL_FIELD_NAMES,
+                                        block_size=chunk_rows * RAW_BYTES_PER_ROW),
+        parse_options=pa_csv.ParseOptions(delimiter='\t', quote_char=False,
+                                          invalid_row_handler=skip_invalid_row),
+        # Text first, then coerced per chunk: one bad value must not abort the stream
+        convert_options=pa_csv.ConvertOptions(include_columns=KEPT_COLUMNS,
+                                              column_types={name: pa.string() for name in KEPT_COLUMNS},
+                                              strings_can_be_null=True),
+    )
+    for batch in reader:
+        df = _coerce_types(batch.to_pandas())
+        rejected, skipped[0] = skipped[0], 0
+        yield df, rejected
+
+def _iter_chunks_c(source, chunk_rows):
+    with pd.read_csv(source, dtype=str, chunksize=chunk_rows, **C_ENGINE_OPTIONS) as reader:
+        while True:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always', pd.errors.ParserWarning)
+                try:
+                    df = reader.get_chunk()
+                except StopIteration:
+                    return
+            yield _coerce_types(df), _count_skipped_lines(caught)
+
+def chunk_rows_for(max_memory_mb):
+    """Rows per chunk that keep one chunk's working set within `max_memory_mb`"""
+    return max(MIN_CHUNK_ROWS, int(max_memory_mb * 1024 * 1024 // BYTES_PER_ROW))
+
+def iter_gdelt_chunks(source, chunk_rows=None, engine='auto', max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+    """Stream a GDELT export (path or binary file object) as typed chunks.
+
+    Only one chunk is held in memory at a time. Yields (DataFrame, number
+    of rows rejected in that chunk).
+    """
+    chunk_rows = chunk_rows or chunk_rows_for(max_memory_mb)
+    engine = _resolve_engine(engine)
+    if engine == 'pyarrow':
+        chunks = _iter_chunks_pyarrow(source, chunk_rows)
+    elif engine == 'c':
+        chunks = _iter_chunks_c(source, chunk_rows)
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
+
+    for df, rejected in chunks:
+        df, invalid = _drop_invalid_rows(df)
+        yield df, rejected + invalid
+
+class CleanedWriter:
+    """Append cleaned chunks to CSV and/or Parquet.
+
+    Chunks go to `.part` files that are renamed into place by close(), so a
+    half-written output is never visible under its final name.
+    """
+
+    def __init__(self, output_file, output_format='csv'):
+        if output_format not in ('csv', 'parquet', 'both'):
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.targets = []
+        if output_format in ('csv', 'both'):
+            self.targets.append(('csv', output_file))
+        if output_format in ('parquet', 'both'):
+            self.targets.append(('parquet', parquet_path(output_file)))
+        self._csv_started = False
+        self._parquet_writer = None
+        self._parquet_schema = None
+
+    def write(self, df):
+        for kind, path in self.targets:
+            if kind == 'csv':
+                df.to_csv(path + '.part', index=False, mode='a' if self._csv_started else 'w',
+                          header=not self._csv_started)
+                self._csv_started = True
+            else:
+                self._write_parquet(df, path + '.part')
+
+    def _write_parquet(self, df, part_path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._parquet_writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._parquet_schema = table.schema
+            self._parquet_writer = pq.ParquetWriter(part_path, table.schema)
+        else:
+            # Later chunks are cast to the first chunk's schema
+            table = pa.Table.from_pandas(df, schema=self._parquet_schema, preserve_index=False)
+        self._parquet_writer.write_table(table)
+
+    def close(self):
+        """Finish writing and publish the outputs; returns the paths written"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        written = []
+        for _, path in self.targets:
+            if os.path.exists(path + '.part'):
+                os.replace(path + '.part', path)
+                written.append(path)
+        return written
+
+    def abort(self):
+        """Discard partial output"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        for _, path in self.targets:
+            if os.path.exists(path + '.part'):
+                os.remove(path + '.part')
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def clean_gdelt_csv_chunked(input_file, output_file, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                            chunk_rows=None, engine='auto', output_format='csv'):
+    """Clean a GDELT export chunk by chunk, keeping memory bounded.
+
+    The chunk size comes from `max_memory_mb` unless `chunk_rows` is given.
+    Prints rows written and rejected per chunk and returns a summary dict.
+    """
+    chunk_rows = chunk_rows or chunk_rows_for(max_memory_mb)
+    writer = CleanedWriter(output_file, output_format)
+    summary = {'rows': 0, 'rejected': 0, 'chunks': 0, 'chunk_rows': chunk_rows}
+
+    try:
+        for df, rejected in iter_gdelt_chunks(input_file, chunk_rows=chunk_rows, engine=engine):
+            if len(df):
+                writer.write(df)
+            summary['chunks'] += 1
+            summary['rows'] += len(df)
+            summary['rejected'] += rejected
+            print(f"Chunk {summary['chunks']}: {len(df)} rows written, {rejected} rejected")
+    except Exception:
+        writer.abort()
+        raise
+
+    summary['outputs'] = writer.close()
+    summary['peak_rss_mb'] = _peak_rss_mb()
+    return summary
+
+def clean_gdelt_csv(input_file, output_file, engine='auto', output_format='csv', max_memory_mb=None):
+    try:
+        if max_memory_mb:
+            # Stream the file in chunks sized to the memory budget
+            summary = clean_gdelt_csv_chunked(input_file, output_file, max_memory_mb=max_memory_mb,
+                                              engine=engine, output_format=output_format)
+            print(f"Processed file: {os.path.basename(input_file)}")
+            print(f"Records processed: {summary['rows']} in {summary['chunks']} chunks "
+                  f"({summary['rejected']} rejected)")
+            return True
+
+        # Read just the columns we keep, with their final names and dtypes
+        df, rejected = read_gdelt_export(input_file, engine=engine)
+        
+        # Save the cleaned data (CSV, Parquet or both)
+        write_cleaned(df, output_file, output_format)
         
         print(f"Processed file: {os.path.basename(input_file)}")
         print(f"Records processed: {len(df)}")
+        if rejected:
+            print(f"Malformed lines skipped: {rejected}")
         return True
     
     except Exception as e:
         print(f"Error processing {input_file}: {str(e)}")
         return False
 
+def process_input_file(input_path):
+    """Clean one input file into OUTPUT_DIR and remove it on success"""
+    filename = os.path.basename(input_path)
+    current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    output_filename = f"cleaned_{current_time}_{filename}"
+    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    
+    print(f"\nProcessing: {filename}")
+    print(f"Started at: {current_time}")
+    
+    if clean_gdelt_csv(input_path, output_path, max_memory_mb=MAX_MEMORY_MB):
+        os.remove(input_path)
+        print(f"Successfully processed and removed: {filename}")
+        print(f"Cleaned file saved as: {output_filename}")
+        return True
+    
+    print(f"Failed to process: {filename}")
+    return False
+
 def process_single_file():
     """Process the first CSV file found in the input directory"""
-    for filename in os.listdir(INPUT_DIR):
-        if filename.endswith('.CSV'):
-            current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            input_path = os.path.join(INPUT_DIR, filename)
-            output_filename = f"cleaned_{current_time}_{filename}"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-            
-            print(f"\nProcessing: {filename}")
-            print(f"Started at: {current_time}")
-            
-            if clean_gdelt_csv(input_path, output_path):
-                os.remove(input_path)
-                print(f"Successfully processed and removed: {filename}")
-                print(f"Cleaned file saved as: {output_filename}")
-            else:
-                print(f"Failed to process: {filename}")
+    for filename in sorted(os.listdir(INPUT_DIR)):
+        if is_candidate(filename):
+            process_input_file(os.path.join(INPUT_DIR, filename))
             
             # Only process the first file found
             break
 
-def monitor_directory():
+def monitor_directory(workers=WATCH_WORKERS):
+    """Clean files as soon as they are completely written to INPUT_DIR.
+
+    Uses inotify (via watchdog) when available, polling otherwise; files
+    already present are processed on startup.
+    """
     # Create output directory if it doesn't exist
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-    
-    # First, process any file that's already there
-    process_single_file()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
     
-    # Then start the monitoring loop
-    while True:
-        try:
-            print("\nWaiting 15 minutes before next check...")
-            time.sleep(900)  # 900 seconds = 15 minutes
-            
-            # Get current timestamp
-            current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            
-            # Check for CSV files in input directory
-            for filename in os.listdir(INPUT_DIR):
-                if filename.endswith('.csv'):
-                    input_path = os.path.join(INPUT_DIR, filename)
-                    output_filename = f"cleaned_{current_time}_{filename}"
-                    output_path = os.path.join(OUTPUT_DIR, output_filename)
-                    
-                    print(f"\nProcessing: {filename}")
-                    print(f"Started at: {current_time}")
-                    
-                    if clean_gdelt_csv(input_path, output_path):
-                        os.remove(input_path)
-                        print(f"Successfully processed and removed: {filename}")
-                        print(f"Cleaned file saved as: {output_filename}")
-                    else:
-                        print(f"Failed to process: {filename}")
-            
-        except Exception as e:
-            print(f"Error in monitor_directory: {str(e)}")
-            print("Retrying in 15 minutes...")
-            time.sleep(900)
+    watcher = DirectoryWatcher(INPUT_DIR, process_input_file, workers=workers)
+    watcher.run_forever()
 
 if __name__ == "__main__":
     print("Starting directory monitor...")
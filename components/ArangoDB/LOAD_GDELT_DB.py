@@ -1,15 +1,10 @@
-from arango import ArangoClient
 from arango_datasets import Datasets
 import networkx as nx
 import matplotlib.pyplot as plt
-from config import ARANGO_HOST, ARANGO_USERNAME, ARANGO_PASSWORD
-
-# Connect to database
-db = ArangoClient(hosts=ARANGO_HOST).db(
-    username=ARANGO_USERNAME, 
-    password=ARANGO_PASSWORD, 
-    verify=True
-)
+from arango_pool import ARANGO_DB, get_db
+
+# Connect to database through the shared pool
+db = get_db(ARANGO_DB)
 
 # Connect to datasets
 datasets = Datasets(db)
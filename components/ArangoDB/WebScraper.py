@@ -60,10 +60,16 @@ def download_and_process_gdelt_file():
             
         print(f"Successfully downloaded {zip_filename}")
         
-        # Unzip the file
+        # Unzip each member to a temp_ file and rename it into place, so the
+        # cleaner's directory watcher never sees a partially written CSV
         print(f"Unzipping {zip_filename}...")
         with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-            zip_ref.extractall(save_path)
+            for member in zip_ref.namelist():
+                member_name = os.path.basename(member)
+                temp_member_path = os.path.join(save_path, "temp_" + member_name)
+                with zip_ref.open(member) as src, open(temp_member_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(temp_member_path, os.path.join(save_path, member_name))
         
         # Remove the temporary zip file
         os.remove(temp_zip_path)
@@ -77,14 +83,15 @@ def download_and_process_gdelt_file():
     except Exception as e:
         print(f"Error in GDELT update process: {str(e)}")
 
-# Schedule the job to run every 15 minutes
-schedule.every(15).minutes.do(download_and_process_gdelt_file)
+if __name__ == "__main__":
+    # Schedule the job to run every 15 minutes
+    schedule.every(15).minutes.do(download_and_process_gdelt_file)
 
-# Run once at startup
-download_and_process_gdelt_file()
+    # Run once at startup
+    download_and_process_gdelt_file()
 
-# Keep the script running
-print("GDELT automatic downloader started. Press Ctrl+C to stop.")
-while True:
-    schedule.run_pending()
-    time.sleep(1)
\ No newline at end of file
+    # Keep the script running
+    print("GDELT automatic downloader started. Press Ctrl+C to stop.")
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
\ No newline at end of file
@@ -0,0 +1,193 @@
+from arango import ArangoClient
+from arango.http import HTTPClient
+from arango.response import Response
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import os
+import threading
+import time
+from datetime import datetime
+from config import ARANGO_HOST, ARANGO_USERNAME, ARANGO_PASSWORD
+
+# Pool settings - override with environment variables
+POOL_CONNECTIONS = int(os.getenv("ARANGO_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("ARANGO_POOL_MAXSIZE", "16"))
+CONNECT_TIMEOUT = float(os.getenv("ARANGO_CONNECT_TIMEOUT", "5"))
+REQUEST_TIMEOUT = float(os.getenv("ARANGO_REQUEST_TIMEOUT", "60"))
+RETRY_ATTEMPTS = int(os.getenv("ARANGO_RETRY_ATTEMPTS", "3"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("ARANGO_HEALTH_CHECK_INTERVAL", "30"))
+# Database the GDELT graph lives in; loaders, indexes and rollups all target it
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+
+class PooledHTTPClient(HTTPClient):
+    """HTTP client that keeps a bounded pool of keep-alive connections per host"""
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 connect_timeout=CONNECT_TIMEOUT, request_timeout=REQUEST_TIMEOUT,
+                 retry_attempts=RETRY_ATTEMPTS):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, request_timeout)
+        self.retry_attempts = retry_attempts
+
+    def create_session(self, host):
+        retry = Retry(
+            total=self.retry_attempts,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
+        )
+        # block=True makes threads wait for a free connection instead of
+        # opening throwaway ones once the pool is exhausted
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+            pool_block=True,
+        )
+        session = Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def send_request(self, session, method, url, headers=None, params=None, data=None, auth=None):
+        response = session.request(
+            method=method,
+            url=url,
+            params=params,
+            data=data,
+            headers=headers,
+            auth=auth,
+            timeout=self.timeout,
+        )
+        return Response(
+            method=method,
+            url=response.url,
+            headers=response.headers,
+            status_code=response.status_code,
+            status_text=response.reason,
+            raw_body=response.text,
+        )
+
+
+class ArangoPool:
+    """Shared, thread-safe ArangoDB connection layer.
+
+    One ArangoClient (and so one set of pooled HTTP sessions) is created per
+    pool, and database handles are verified once and then reused by every
+    caller. A background thread pings the server so callers can check
+    `healthy` without paying for a round trip.
+    """
+
+    def __init__(self, hosts=ARANGO_HOST, username=ARANGO_USERNAME, password=ARANGO_PASSWORD,
+                 pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 connect_timeout=CONNECT_TIMEOUT, request_timeout=REQUEST_TIMEOUT,
+                 retry_attempts=RETRY_ATTEMPTS, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.hosts = hosts
+        self.username = username
+        self.password = password
+        self.health_check_interval = health_check_interval
+        self.client = ArangoClient(
+            hosts=hosts,
+            http_client=PooledHTTPClient(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                connect_timeout=connect_timeout,
+                request_timeout=request_timeout,
+                retry_attempts=retry_attempts,
+            ),
+        )
+        self._databases = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+        self.healthy = None
+        self.last_check = None
+        self.last_error = None
+
+    def db(self, name=ARANGO_DB):
+        """Return the shared handle for database `name`, verifying it on first use"""
+        database = self._databases.get(name)
+        if database is not None:
+            return database
+
+        with self._lock:
+            database = self._databases.get(name)
+            if database is None:
+                database = self.client.db(name, username=self.username,
+                                          password=self.password, verify=True)
+                self._databases[name] = database
+                self.healthy = True
+        return database
+
+    def check_health(self):
+        """Ping every open database handle and record the outcome"""
+        try:
+            for database in list(self._databases.values()):
+                database.version()
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            self.healthy = False
+            self.last_error = str(e)
+            print(f"[{datetime.now()}] ArangoDB health check failed: {self.last_error}")
+        self.last_check = time.time()
+        return self.healthy
+
+    def start_health_checks(self):
+        """Start the background health check thread (no-op if already running)"""
+        if self.health_check_interval <= 0:
+            return
+        with self._lock:
+            if self._health_thread is not None and self._health_thread.is_alive():
+                return
+            self._stop.clear()
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name="arango-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_check_interval):
+            self.check_health()
+
+    def status(self):
+        """Return a JSON-serializable summary of the pool state"""
+        return {
+            "hosts": self.hosts,
+            "databases": sorted(self._databases),
+            "healthy": self.healthy,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        """Stop health checks and release pooled connections"""
+        self._stop.set()
+        self.client.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(**settings):
+    """Create the process-wide pool once; later calls return the same pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ArangoPool(**settings)
+            _pool.start_health_checks()
+    return _pool
+
+
+def get_pool():
+    """Return the process-wide pool, creating it with default settings if needed"""
+    return _pool if _pool is not None else init_pool()
+
+
+def get_db(name=ARANGO_DB):
+    """Shortcut for get_pool().db(name)"""
+    return get_pool().db(name)
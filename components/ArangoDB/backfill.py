@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import requests
+from Clean_CSV import clean_gdelt_csv, parquet_path, OUTPUT_DIR
+
+GDELT_BASE_URL = "http://data.gdeltproject.org/gdeltv2"
+EXPORT_INTERVAL = timedelta(minutes=15)
+DEFAULT_WORKERS = 4
+
+
+class MissingFile(Exception):
+    """The source has no file for this timestamp (GDELT has occasional gaps)"""
+
+
+class HTTPSource:
+    """Download export files over HTTP (GDELT itself or a local stand-in)"""
+
+    def __init__(self, base_url=GDELT_BASE_URL, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def fetch(self, name, dest_path):
+        response = requests.get(f"{self.base_url}/{name}", stream=True, timeout=self.timeout)
+        if response.status_code == 404:
+            raise MissingFile(name)
+        response.raise_for_status()
+        with open(dest_path, 'wb') as f:
+            for block in response.iter_content(chunk_size=1 << 20):
+                f.write(block)
+
+    def read(self, name):
+        """Return the file's bytes without touching disk"""
+        response = requests.get(f"{self.base_url}/{name}", timeout=self.timeout)
+        if response.status_code == 404:
+            raise MissingFile(name)
+        response.raise_for_status()
+        return response.content
+
+    def latest(self):
+        """Name of the newest export file, from lastupdate.txt"""
+        response = requests.get(f"{self.base_url}/lastupdate.txt", timeout=self.timeout)
+        response.raise_for_status()
+        # First line: <size> <md5> <url of the export zip>
+        return os.path.basename(response.text.strip().split('\n')[0].split()[2])
+
+
+class LocalDirSource:
+    """Copy export files from a local directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, name, dest_path):
+        src_path = os.path.join(self.directory, name)
+        if not os.path.exists(src_path):
+            raise MissingFile(name)
+        shutil.copyfile(src_path, dest_path)
+
+    def read(self, name):
+        src_path = os.path.join(self.directory, name)
+        if not os.path.exists(src_path):
+            raise MissingFile(name)
+        with open(src_path, 'rb') as f:
+            return f.read()
+
+    def latest(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith('.export.CSV.zip'))
+        if not names:
+            raise MissingFile('no export files in ' + self.directory)
+        return names[-1]
+
+
+def source_from_arg(value):
+    """Build a source from a --source argument (URL or directory)"""
+    if value.startswith(('http://', 'https://')):
+        return HTTPSource(value)
+    return LocalDirSource(value)
+
+
+def export_file_names(start, end):
+    """Names of the 15-minute export files with timestamps in [start, end)"""
+    # Exports are stamped on the quarter hour
+    current = start.replace(minute=start.minute - start.minute % 15, second=0, microsecond=0)
+    if current < start:
+        current += EXPORT_INTERVAL
+    while current < end:
+        yield current.strftime("%Y%m%d%H%M%S") + ".export.CSV.zip"
+        current += EXPORT_INTERVAL
+
+
+class Manifest:
+    """Resumable progress record, persisted as JSON after every file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def is_settled(self, name, retry_failed=False):
+        status = self.entries.get(name, {}).get('status')
+        if status == 'failed':
+            return not retry_failed
+        return status in ('done', 'missing')
+
+    def record(self, name, entry):
+        self.entries[name] = entry
+        self.save()
+
+    def save(self):
+        # Write to a temp file and rename so a crash never leaves half a manifest
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.manifest_')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        counts = {}
+        for entry in self.entries.values():
+            counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        return counts
+
+
+def process_export_file(source, name, output_dir, output_format='csv', max_memory_mb=None):
+    """Download, unzip and clean one export file (runs in a worker process)"""
+    csv_name = name[:-len('.zip')]
+    output_path = os.path.join(output_dir, f"cleaned_{csv_name}")
+
+    with tempfile.TemporaryDirectory(prefix='gdelt_backfill_') as work_dir:
+        zip_path = os.path.join(work_dir, "temp_" + name)
+        try:
+            source.fetch(name, zip_path)
+        except MissingFile:
+            return {'status': 'missing'}
+
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            member = zip_ref.namelist()[0]
+            input_path = zip_ref.extract(member, work_dir)
+
+        if not clean_gdelt_csv(input_path, output_path, output_format=output_format,
+                               max_memory_mb=max_memory_mb):
+            return {'status': 'failed', 'error': 'cleaning failed'}
+
+    return {'status': 'done', 'output': parquet_path(output_path) if output_format == 'parquet' else output_path}
+
+
+def run_backfill(start, end, source, output_dir=OUTPUT_DIR, manifest_path=None,
+                 workers=DEFAULT_WORKERS, retry_failed=False, output_format='csv',
+                 max_memory_mb=None):
+    """Fetch and clean every export file in [start, end) with a process pool.
+
+    Progress is written to the manifest after each file, so re-running the
+    same command after an interruption only processes what is left.
+    Returns the manifest.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(manifest_path or os.path.join(output_dir, 'backfill_manifest.json'))
+
+    pending = [name for name in export_file_names(start, end)
+               if not manifest.is_settled(name, retry_failed)]
+    print(f"[{datetime.now()}] Backfill {start} -> {end}: {len(pending)} files to process "
+          f"({len(manifest.entries)} already in manifest)")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_export_file, source, name, output_dir,
+                            output_format, max_memory_mb): name
+            for name in pending
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {'status': 'failed', 'error': str(e)}
+            entry['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            manifest.record(name, entry)
+            print(f"[{done}/{len(pending)}] {name}: {entry['status']}")
+
+    print(f"Backfill finished: {manifest.summary()}")
+    return manifest
+
+
+def parse_time(value, end=False):
+    """Parse YYYY-MM-DD[THH:MM]; a bare --end date covers that whole day"""
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill GDELT 15-minute export files for a date range')
+    parser.add_argument('--start', required=True, help='First timestamp, YYYY-MM-DD[THH:MM]')
+    parser.add_argument('--end', required=True, help='End timestamp (exclusive), or a date to include that whole day')
+    parser.add_argument('--source', default=GDELT_BASE_URL, help='Base URL or local directory of export zips')
+    parser.add_argument('--output', default=OUTPUT_DIR, help='Directory for cleaned files')
+    parser.add_argument('--manifest', help='Manifest path (default: <output>/backfill_manifest.json)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Worker processes')
+    parser.add_argument('--retry-failed', action='store_true', help='Retry files that failed previously')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv',
+                        help='Cleaned output format')
+    parser.add_argument('--max-memory-mb', type=int,
+                        help='Clean each file in chunks within this memory budget (per worker)')
+    args = parser.parse_args()
+
+    run_backfill(
+        parse_time(args.start),
+        parse_time(args.end, end=True),
+        source_from_arg(args.source),
+        output_dir=args.output,
+        manifest_path=args.manifest,
+        workers=args.workers,
+        retry_failed=args.retry_failed,
+        output_format=args.format,
+        max_memory_mb=args.max_memory_mb,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import time
+import pandas as pd
+from Clean_CSV import GDELT_COLUMNS, GDELT_FIELD_COUNT, read_gdelt_export, write_cleaned
+
+# A day of GDELT 2.0 exports is roughly 100k-200k events
+DEFAULT_ROWS = 150000
+
+
+def baseline_clean_gdelt_csv(input_file, output_file):
+    """The original clean_gdelt_csv: python engine, all 61 columns as objects"""
+    df = pd.read_csv(input_file, header=None,
+                     delimiter='\t',
+                     on_bad_lines='warn',
+                     engine='python')
+    columns_to_keep = list(GDELT_COLUMNS.keys())
+    df = df[columns_to_keep]
+    df.columns = GDELT_COLUMNS.values()
+    df.to_csv(output_file, index=False)
+    return len(df)
+
+
+def write_synthetic_export(path, rows, seed=42):
+    """Write a tab-separated file shaped like a GDELT 2.0 export"""
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for i in range(rows):
+            fields = [''] * GDELT_FIELD_COUNT
+            fields[0] = str(1200000000 + i)
+            fields[1:5] = ['20250301', '202503', '2025', '2025.1644']
+            fields[5] = rng.choice(['USA', 'GBR', 'CHN', ''])
+            fields[6] = rng.choice(['UNITED STATES', 'POLICE', 'PRESIDENT', ''])
+            fields[16] = rng.choice(['GOV', 'MIL', 'BUS', ''])
+            fields[17] = rng.choice(['USA', 'FRA', 'IND', ''])
+            fields[25] = rng.choice(['0', '1'])
+            fields[26] = rng.choice(['010', '020', '042', '190', '1823'])
+            fields[27] = fields[26][:3]
+            fields[28] = fields[26][:2]
+            fields[29] = str(rng.randint(1, 4))
+            fields[30] = f"{rng.uniform(-10, 10):.1f}"
+            fields[31:34] = [str(rng.randint(1, 50)), str(rng.randint(1, 5)), str(rng.randint(1, 50))]
+            fields[34] = f"{rng.uniform(-10, 5):.6f}"
+            place = rng.randint(0, 5000)
+            fields[35] = str(rng.randint(1, 5))
+            fields[36] = f"Place {place}, Region, Country"
+            fields[37] = rng.choice(['US', 'UK', 'FR', 'CH', 'IN'])
+            fields[38] = 'US06'
+            fields[40] = f"{rng.uniform(-60, 70):.4f}"
+            fields[41] = f"{rng.uniform(-180, 180):.4f}"
+            fields[42] = str(place)
+            fields[59] = '20250301000000'
+            fields[60] = f"https://news.example.com/articles/{i}"
+            f.write('\t'.join(fields) + '\n')
+
+
+def timed(label, func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return label, best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GDELT export cleaning paths')
+    parser.add_argument('input', nargs='?', help='Real GDELT export (.CSV); synthesized if omitted')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help='Rows to synthesize')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant (best is reported)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_clean_') as work_dir:
+        input_file = args.input
+        if not input_file:
+            input_file = os.path.join(work_dir, 'synthetic.export.CSV')
+            print(f"Synthesizing {args.rows} rows...")
+            write_synthetic_export(input_file, args.rows)
+
+        size_mb = os.path.getsize(input_file) / 1e6
+        output_csv = os.path.join(work_dir, 'cleaned.csv')
+
+        def clean_with(engine, output_format):
+            df, _ = read_gdelt_export(input_file, engine)
+            write_cleaned(df, output_csv, output_format)
+            return len(df)
+
+        engines = ['c'] + (['pyarrow'] if importlib.util.find_spec('pyarrow') else [])
+        variants = [('baseline (python engine)',
+                     lambda: baseline_clean_gdelt_csv(input_file, output_csv))]
+        for engine in engines:
+            variants.append((f"{engine} -> csv", lambda e=engine: clean_with(e, 'csv')))
+            variants.append((f"{engine} -> parquet", lambda e=engine: clean_with(e, 'parquet')))
+            variants.append((f"{engine} read only",
+                             lambda e=engine: len(read_gdelt_export(input_file, e)[0])))
+
+        print(f"Input: {input_file} ({size_mb:.1f} MB)\n")
+        print(f"{'variant':<28}{'seconds':>10}{'rows/sec':>14}{'speedup':>10}")
+        baseline_seconds = None
+        rows = None
+        for label, func in variants:
+            label, seconds, result = timed(label, func, args.repeat)
+            if baseline_seconds is None:
+                baseline_seconds, rows = seconds, result
+            print(f"{label:<28}{seconds:>10.3f}{rows / seconds:>14,.0f}{baseline_seconds / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from bench_clean_csv import write_synthetic_export
+from bulk_loader import frame_to_documents
+from Clean_CSV import read_gdelt_export
+from compact_graph import CompactGraph
+from langchain import ARANGO_DB, graph_from_network_rows
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+
+
+def synthetic_network_rows(rows):
+    """NETWORK_GRAPH_QUERY-shaped rows for `rows` synthetic events, without a database"""
+    with tempfile.TemporaryDirectory(prefix='bench_compact_') as work_dir:
+        path = os.path.join(work_dir, 'synthetic.export.CSV')
+        write_synthetic_export(path, rows)
+        df, _ = read_gdelt_export(path)
+    documents = frame_to_documents(df)
+
+    targets = {}
+    for collection in ('Actors', 'Locations'):
+        for doc in documents[collection]:
+            targets[f"{collection}/{doc['_key']}"] = {**doc, '_id': f"{collection}/{doc['_key']}"}
+    relations = {}
+    for edge in documents['EventRelations']:
+        relations.setdefault(edge['_from'], []).append(
+            {'to': edge['_to'], 'type': edge['type'], 'target': targets.get(edge['_to'])}
+        )
+    return [
+        {'event': {**event, '_id': f"Events/{event['_key']}"},
+         'relations': relations.get(f"Events/{event['_key']}", [])}
+        for event in documents['Events']
+    ]
+
+
+def database_network_rows(db_name, rows):
+    from arango_pool import get_db
+    from langchain import GRAPH_BATCH_SIZE, NETWORK_GRAPH_QUERY, execute_aql_query
+
+    return execute_aql_query(get_db(db_name), NETWORK_GRAPH_QUERY, {"limit": rows},
+                             batch_size=GRAPH_BATCH_SIZE, use_cache=False)
+
+
+def networkx_stats(G):
+    """The degree statistics analyze_graph used to compute on NetworkX"""
+    degrees = dict(G.degree())
+    by_type = {}
+    for node, data in G.nodes(data=True):
+        node_type = data.get('type', 'Unknown')
+        if degrees[node] > by_type.get(node_type, (None, -1))[1]:
+            by_type[node_type] = (node, degrees[node])
+    return sum(degrees.values()) / len(degrees) if degrees else 0, by_type
+
+
+def measure(build, rows):
+    """(graph, build seconds, bytes still allocated by the graph)"""
+    gc.collect()
+    started = time.perf_counter()
+    graph = build(rows)
+    seconds = time.perf_counter() - started
+    del graph
+
+    # Build again under tracemalloc, which would distort the timing
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    graph = build(rows)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return graph, seconds, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare CompactGraph with NetworkX: memory and build time')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Event counts to test')
+    parser.add_argument('--db', nargs='?', const=ARANGO_DB,
+                        help='Read events from this database instead of generating them')
+    args = parser.parse_args()
+
+    print(f"{'events':>8}  {'variant':<10}{'nodes':>8}{'edges':>8}{'build s':>10}{'stats s':>10}"
+          f"{'MB':>9}{'B/node':>9}")
+    for size in args.sizes:
+        rows = database_network_rows(args.db, size) if args.db else synthetic_network_rows(size)
+
+        G, nx_seconds, nx_bytes = measure(graph_from_network_rows, rows)
+        started = time.perf_counter()
+        nx_average, _ = networkx_stats(G)
+        nx_stats_seconds = time.perf_counter() - started
+
+        C, compact_seconds, compact_bytes = measure(CompactGraph.from_network_rows, rows)
+        started = time.perf_counter()
+        stats = C.degree_stats()
+        compact_stats_seconds = time.perf_counter() - started
+
+        if (C.number_of_nodes(), C.number_of_edges()) != (G.number_of_nodes(), G.number_of_edges()) \
+                or abs(stats['average'] - nx_average) > 1e-9:
+            print(f"{size:>8}  graphs differ!")
+
+        for label, graph, seconds, stats_seconds, held in [
+            ('networkx', G, nx_seconds, nx_stats_seconds, nx_bytes),
+            ('compact', C, compact_seconds, compact_stats_seconds, compact_bytes),
+        ]:
+            nodes = graph.number_of_nodes()
+            print(f"{size:>8}  {label:<10}{nodes:>8}{graph.number_of_edges():>8}{seconds:>10.3f}"
+                  f"{stats_seconds:>10.4f}{held / 1e6:>9.1f}{held / max(nodes, 1):>9.0f}")
+        del G, C
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import os
+import tempfile
+import time
+import networkx as nx
+from arango import ArangoClient
+from arango_pool import PooledHTTPClient
+from bench_clean_csv import write_synthetic_export
+from bulk_loader import load_frame
+from Clean_CSV import read_gdelt_export
+from config import ARANGO_HOST, ARANGO_USERNAME, ARANGO_PASSWORD
+from indexes import ensure_collections
+from langchain import ARANGO_DB, get_network_graph, query_events
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+
+class CountingHTTPClient(PooledHTTPClient):
+    """Pooled HTTP client that counts the requests sent to the server"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+
+    def send_request(self, *args, **kwargs):
+        self.requests += 1
+        return super().send_request(*args, **kwargs)
+
+
+def baseline_get_network_graph(db, event_limit=100):
+    """The original get_network_graph: one relations query, then one request per new node"""
+    G = nx.Graph()
+    events = query_events(db, limit=event_limit)
+    for event in events:
+        G.add_node(event['_id'], type='event', **event)
+
+    relations_query = """
+    FOR event_id IN @event_ids
+        LET event_doc_id = CONCAT('Events/', event_id)
+        FOR edge IN EventRelations
+            FILTER edge._from == event_doc_id
+            LET target_node = DOCUMENT(edge._to)
+            RETURN {
+                from: edge._from,
+                to: edge._to,
+                type: edge.type,
+                target_type: PARSE_IDENTIFIER(edge._to).collection
+            }
+    """
+    cursor = db.aql.execute(relations_query, bind_vars={"event_ids": [e['_key'] for e in events]})
+    for relation in cursor:
+        if not G.has_node(relation['to']):
+            node_doc = list(db.aql.execute("RETURN DOCUMENT(@id)", bind_vars={"id": relation['to']}))
+            G.add_node(relation['to'], **{**(node_doc[0] or {}), 'type': relation['target_type']})
+        G.add_edge(relation['from'], relation['to'], type=relation['type'])
+    return G
+
+
+def seed_events(db, rows):
+    """Load `rows` synthetic events so every benchmark size has enough data"""
+    ensure_collections(db)
+    with tempfile.TemporaryDirectory(prefix='bench_graph_') as work_dir:
+        path = os.path.join(work_dir, 'synthetic.export.CSV')
+        write_synthetic_export(path, rows)
+        df, _ = read_gdelt_export(path)
+    load_frame(db, df)
+    print(f"Seeded {rows} events")
+
+
+def measure(http_client, func, db, size):
+    before = http_client.requests
+    started = time.perf_counter()
+    G = func(db, size)
+    elapsed = time.perf_counter() - started
+    return http_client.requests - before, elapsed, G
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark round trips and wall time of get_network_graph')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Event counts to test')
+    parser.add_argument('--seed-rows', type=int,
+                        help='Load this many synthetic events first (use a scratch database)')
+    parser.add_argument('--baseline-max', type=int,
+                        help='Skip the baseline above this many events (it needs one request per node)')
+    args = parser.parse_args()
+
+    http_client = CountingHTTPClient()
+    client = ArangoClient(hosts=ARANGO_HOST, http_client=http_client)
+    db = client.db(args.db, username=ARANGO_USERNAME, password=ARANGO_PASSWORD, verify=True)
+    if args.seed_rows:
+        seed_events(db, args.seed_rows)
+
+    print(f"{'events':>8}  {'variant':<10}{'requests':>10}{'seconds':>10}{'nodes':>8}{'edges':>8}")
+    for size in args.sizes:
+        variants = [('traversal', get_network_graph)]
+        if args.baseline_max is None or size <= args.baseline_max:
+            variants.insert(0, ('baseline', baseline_get_network_graph))
+        for label, func in variants:
+            requests, seconds, G = measure(http_client, func, db, size)
+            print(f"{size:>8}  {label:<10}{requests:>10}{seconds:>10.3f}"
+                  f"{G.number_of_nodes():>8}{G.number_of_edges():>8}")
+
+
+if __name__ == "__main__":
+    main()
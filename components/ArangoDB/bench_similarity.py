@@ -0,0 +1,80 @@
+import argparse
+import time
+from arango_pool import get_db
+from bench_network_graph import seed_events
+from langchain import ARANGO_DB, SIMILAR_EVENTS_QUERY
+from sampling import sample_event_keys
+from similarity_index import SimilarityIndex
+
+DEFAULT_TARGETS = 20
+DEFAULT_LIMIT = 5
+
+
+def aql_similar(db, key, limit):
+    """The AQL scan find_similar_events runs without an index: [(key, score)]"""
+    cursor = db.aql.execute(SIMILAR_EVENTS_QUERY, bind_vars={"event_id": key, "limit": limit})
+    return [(row['event']['_key'], float(row['similarity_score'])) for row in cursor]
+
+
+def check(index, key, expected, found):
+    """Problems with one target's results; ties may pick different events, scores may not differ"""
+    problems = []
+    expected_scores = [score for _, score in expected]
+    found_scores = [score for _, score in found]
+    if expected_scores != found_scores:
+        problems.append(f"{key}: top scores {found_scores} != AQL {expected_scores}")
+    # Score the events AQL picked with the index, to check both score alike
+    rescored = index.pair_scores(key, [k for k, _ in expected])
+    if rescored != expected_scores:
+        problems.append(f"{key}: index scores {rescored} for AQL's events, AQL says {expected_scores}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the similarity index with the AQL scan')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--seed-rows', type=int,
+                        help='Load this many synthetic events first (use a scratch database)')
+    parser.add_argument('--targets', type=int, default=DEFAULT_TARGETS, help='Random events to look up')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Similar events per lookup')
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if args.seed_rows:
+        seed_events(db, args.seed_rows)
+
+    started = time.perf_counter()
+    index = SimilarityIndex.from_db(db)
+    print(f"Indexed {len(index)} events in {time.perf_counter() - started:.2f}s")
+
+    keys = sample_event_keys(db, args.targets)
+
+    started = time.perf_counter()
+    expected = {key: aql_similar(db, key, args.limit) for key in keys}
+    aql_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    single = {key: index.similar(key, args.limit) for key in keys}
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = dict(zip(keys, index.similar_batch(keys, args.limit)))
+    batch_seconds = time.perf_counter() - started
+
+    problems = []
+    for key in keys:
+        problems += check(index, key, expected[key], single[key])
+        if batched[key] != single[key]:
+            problems.append(f"{key}: batched results differ from single lookups")
+
+    print(f"{'variant':<12}{'seconds':>10}{'ms/lookup':>12}")
+    for label, seconds in [('aql', aql_seconds), ('index', single_seconds), ('index batch', batch_seconds)]:
+        print(f"{label:<12}{seconds:>10.3f}{1000 * seconds / max(len(keys), 1):>12.2f}")
+
+    for problem in problems:
+        print(problem)
+    print(f"{len(keys)} lookups, {'all match' if not problems else f'{len(problems)} mismatches'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import hashlib
+import os
+import time
+import pandas as pd
+from arango_pool import get_db
+from event_schema import ACTOR_FIELDS, CSV_DTYPES, EVENT_FIELDS, LOCATION_FIELDS
+from indexes import ensure_collections
+from query_cache import bump_ingest_epoch
+from rollups import apply_rollups, combine_totals, export_batch_id, rollup_totals
+from sampling import random_values
+from similarity_index import SIMILARITY_INDEX_DIR, open_for_ingest
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+# Rows read from the CSV per chunk, and documents sent per import request
+CHUNK_ROWS = 50000
+BATCH_SIZE = 10000
+
+def derive_key(frame, columns):
+    """Deterministic `_key` per row, hashed from the given columns.
+
+    The same actor or location always maps to the same key, so repeated
+    rows collapse into one document no matter which file they came from.
+    """
+    values = frame[columns].astype(str).where(frame[columns].notna(), "")
+    return pd.Series(
+        [hashlib.md5("|".join(row).encode("utf-8")).hexdigest()[:20]
+         for row in values.itertuples(index=False, name=None)],
+        index=frame.index,
+    )
+
+
+def _records(frame):
+    """DataFrame -> list of dicts with JSON-friendly values (NaN/NA -> None)"""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def frame_to_documents(df):
+    """Derive Events, Actors, Locations and EventRelations documents from cleaned rows"""
+    df = df[df['GlobalEventID'].notna()]
+    event_keys = df['GlobalEventID'].astype(str)
+    event_ids = "Events/" + event_keys
+
+    # reindex: files cleaned before DateAdded was kept lack that column
+    events = df.reindex(columns=list(EVENT_FIELDS)).rename(columns=EVENT_FIELDS)
+    events.insert(0, '_key', event_keys)
+    # Sampling attributes (see sampling.py)
+    events['rnd'] = random_values(event_keys)
+    events['geoCountryCode'] = df['Actor1Geo_CountryCode']
+
+    # Actors: rows with at least one actor attribute
+    actor_columns = list(ACTOR_FIELDS)
+    has_actor = df[actor_columns].notna().any(axis=1)
+    actor_keys = derive_key(df[has_actor], actor_columns)
+    actors = df.loc[has_actor, actor_columns].rename(columns=ACTOR_FIELDS)
+    actors.insert(0, '_key', actor_keys)
+
+    # Locations: rows with a name or coordinates
+    location_columns = list(LOCATION_FIELDS)
+    has_location = df[['Actor1Geo_Fullname', 'Actor1Geo_Lat', 'Actor1Geo_Long']].notna().any(axis=1)
+    location_keys = derive_key(
+        df[has_location],
+        ['Actor1Geo_FeatureID', 'Actor1Geo_Fullname', 'Actor1Geo_Lat', 'Actor1Geo_Long'],
+    )
+    locations = df.loc[has_location, location_columns].rename(columns=LOCATION_FIELDS)
+    locations.insert(0, '_key', location_keys)
+
+    actor_edges = pd.DataFrame({
+        '_key': event_keys[has_actor] + "-actor",
+        '_from': event_ids[has_actor],
+        '_to': "Actors/" + actor_keys,
+        'type': 'HAS_ACTOR',
+    })
+    location_edges = pd.DataFrame({
+        '_key': event_keys[has_location] + "-location",
+        '_from': event_ids[has_location],
+        '_to': "Locations/" + location_keys,
+        'type': 'OCCURRED_AT',
+    })
+
+    return {
+        'Events': _records(events.drop_duplicates('_key', keep='last')),
+        'Actors': _records(actors.drop_duplicates('_key')),
+        'Locations': _records(locations.drop_duplicates('_key')),
+        'EventRelations': _records(
+            pd.concat([actor_edges, location_edges]).drop_duplicates('_key', keep='last')
+        ),
+    }
+
+
+def _import_counts(result):
+    # import_bulk returns a list of per-batch results when batch_size is set
+    results = result if isinstance(result, list) else [result]
+    counts = {'created': 0, 'updated': 0, 'errors': 0}
+    for entry in results:
+        for field in counts:
+            counts[field] += entry.get(field, 0)
+    return counts
+
+
+def write_documents(db, documents, batch_size=BATCH_SIZE):
+    """Upsert documents into their collections, vertices before edges.
+
+    Returns {collection: {created, updated, errors}}.
+    """
+    stats = {}
+    for collection_name in ('Events', 'Actors', 'Locations', 'EventRelations'):
+        docs = documents.get(collection_name)
+        if not docs:
+            continue
+        result = db.collection(collection_name).import_bulk(
+            docs,
+            on_duplicate='update',
+            batch_size=batch_size,
+        )
+        stats[collection_name] = _import_counts(result)
+    return stats
+
+
+def load_frame(db, df, batch_size=BATCH_SIZE):
+    """Load one chunk of cleaned rows; returns per-collection import counts"""
+    return write_documents(db, frame_to_documents(df), batch_size=batch_size)
+
+
+def _merge_stats(total, stats):
+    for collection_name, counts in stats.items():
+        merged = total.setdefault(collection_name, {'created': 0, 'updated': 0, 'errors': 0})
+        for field, value in counts.items():
+            merged[field] += value
+
+
+def read_cleaned_csv(path, chunk_rows=CHUNK_ROWS):
+    """Stream a cleaned GDELT file (CSV or Parquet) as DataFrame chunks"""
+    if path.lower().endswith('.parquet'):
+        return read_cleaned_parquet(path, chunk_rows)
+    return pd.read_csv(path, dtype=CSV_DTYPES, chunksize=chunk_rows, low_memory=False)
+
+
+def read_cleaned_parquet(path, chunk_rows=CHUNK_ROWS):
+    """Stream a cleaned Parquet file; the columns are already typed, nothing is re-parsed"""
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        df = batch.to_pandas()
+        yield df.astype({name: dtype for name, dtype in CSV_DTYPES.items() if name in df.columns})
+
+
+def load_cleaned_csv(db, path, chunk_rows=CHUNK_ROWS, batch_size=BATCH_SIZE, similarity_index=None):
+    """Load a cleaned GDELT CSV into the graph model in chunks.
+
+    With `similarity_index` (see similarity_index.open_for_ingest), each
+    chunk is appended to it and the index is saved once the file is in.
+    Returns a summary dict with row count, elapsed seconds, rows/sec and
+    per-collection import counts.
+    """
+    started = time.perf_counter()
+    rows = 0
+    totals = {}
+    rollups = []
+
+    for chunk in read_cleaned_csv(path, chunk_rows):
+        chunk_started = time.perf_counter()
+        _merge_stats(totals, load_frame(db, chunk, batch_size=batch_size))
+        rollups.append(rollup_totals(chunk))
+        if similarity_index is not None:
+            similarity_index.append_frame(chunk)
+        rows += len(chunk)
+
+        chunk_elapsed = time.perf_counter() - chunk_started
+        print(f"Loaded {len(chunk)} rows in {chunk_elapsed:.2f}s "
+              f"({len(chunk) / chunk_elapsed if chunk_elapsed else 0:.0f} rows/sec)")
+
+    # Once per file, so reloading it does not count its events again
+    apply_rollups(db, combine_totals(rollups), export_batch_id(path))
+    # Cached read results are stale now
+    epoch = bump_ingest_epoch(db)
+    if similarity_index is not None:
+        similarity_index.epoch = epoch
+        similarity_index.save(SIMILARITY_INDEX_DIR)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'file': os.path.basename(path),
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed else 0.0,
+        'collections': totals,
+    }
+    print(f"Finished {summary['file']}: {rows} rows in {elapsed:.2f}s "
+          f"({summary['rows_per_sec']:.0f} rows/sec)")
+    for collection_name, counts in totals.items():
+        print(f"- {collection_name}: {counts['created']} created, "
+              f"{counts['updated']} updated, {counts['errors']} errors")
+    return summary
+
+
+def cleaned_files(path):
+    """Expand a file or directory argument into cleaned CSV paths"""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(('.csv', '.parquet'))
+        )
+    return [path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load cleaned GDELT CSV or Parquet files into ArangoDB')
+    parser.add_argument('paths', nargs='+', help='Cleaned CSV/Parquet files or directories (e.g. ArangoDBOutput)')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows read per chunk')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Documents per import request')
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    ensure_collections(db)
+    similarity_index = open_for_ingest()
+
+    for path in args.paths:
+        for file_path in cleaned_files(path):
+            load_cleaned_csv(db, file_path, chunk_rows=args.chunk_rows, batch_size=args.batch_size,
+                             similarity_index=similarity_index)
+
+
+if __name__ == "__main__":
+    main()
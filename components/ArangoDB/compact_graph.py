@@ -0,0 +1,217 @@
+"""Columnar graph for large extracted subgraphs.
+
+A NetworkX graph keeps a dict per node and per edge, and every document
+attribute is splatted into them. That costs several KB per node once
+subgraphs reach tens of thousands of nodes. CompactGraph instead numbers
+the nodes 0..n-1 and stores:
+
+    nodes       one DataFrame column per attribute (nullable Int64/Float64,
+                categorical strings where values repeat)
+    edges       int32 source/target arrays plus a categorical edge type
+    indptr,     undirected CSR adjacency: the neighbors of node i are
+    indices     indices[indptr[i]:indptr[i + 1]]
+
+Like nx.Graph, it is undirected and keeps one edge per node pair, with
+the last edge's attributes winning. to_networkx() builds the equivalent
+nx.Graph when a NetworkX algorithm or drawing function needs it.
+"""
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+# Categorical strings when at most this share of the values are distinct
+CATEGORY_RATIO = 0.5
+
+
+def _column(column, records):
+    """Typed version of one attribute column built from JSON documents"""
+    if column.dtype.kind == "f":
+        # pandas turns integers with gaps into floats; the first value tells which it was
+        first = column.first_valid_index()
+        if first is not None and isinstance(records[first][column.name], int):
+            return column.astype("Int64")
+        return column.astype("Float64")
+    if column.dtype.kind in "iu":
+        return column.astype("Int64")
+    kind = pd.api.types.infer_dtype(column, skipna=True)
+    if column.dtype.kind == "b" or kind == "boolean":
+        return column.astype("boolean")
+    if kind == "string":
+        if column.nunique() <= len(column) * CATEGORY_RATIO:
+            return column.astype("category")
+        return column.astype("string")
+    # Lists, dicts or mixed types stay Python objects
+    return column
+
+
+def _frame(records, columns=()):
+    """DataFrame with one typed column per attribute seen in any record"""
+    frame = pd.DataFrame.from_records(records) if records else pd.DataFrame(index=pd.RangeIndex(0))
+    for name in columns:
+        if name not in frame:
+            frame[name] = pd.Series([None] * len(frame), dtype=object)
+    return pd.DataFrame({name: _column(frame[name], records) for name in frame.columns})
+
+
+def _attribute_dicts(frame):
+    """Row dicts without missing values, as NetworkX attribute dicts"""
+    values = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    return [{name: value for name, value in row.items() if value is not None} for row in values]
+
+
+def _types(frame):
+    # Untyped nodes and edges are counted as "Unknown"
+    return frame["type"].astype(object).fillna("Unknown")
+
+
+class CompactGraph:
+    """Undirected graph with integer node IDs, CSR adjacency and columnar attributes"""
+
+    def __init__(self, nodes, edges):
+        """`nodes` needs `_id` and `type` columns; `edges` needs integer
+        `source`/`target` columns (rows of `nodes`) and `type`."""
+        self.nodes = nodes
+        self.edges = edges
+        self._id_index = None
+
+        count = len(nodes)
+        source = edges["source"].to_numpy()
+        target = edges["target"].to_numpy()
+        # Each undirected edge appears once from either end
+        ends = np.concatenate([source, target])
+        others = np.concatenate([target, source])
+        order = np.argsort(ends, kind="stable")
+        self.indices = others[order]
+        self.edge_ids = np.concatenate([np.arange(len(source))] * 2)[order].astype(np.int32)
+        self.indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends, minlength=count), out=self.indptr[1:])
+
+    # Building
+
+    @classmethod
+    def from_records(cls, node_records, edge_records, node_types=None):
+        """Graph from node dicts (with `_id`) and edge dicts (`from`, `to`, `type`, optional `key`).
+
+        `node_types`, one per node record, overrides the records' `type`.
+        Edges may reference nodes that have no record; those get a bare node
+        typed by their collection, as the NetworkX builders do.
+        """
+        nodes = _frame(node_records, ("_id", "type"))
+        if node_types is not None:
+            nodes["type"] = pd.Categorical(node_types)
+        nodes = nodes.drop_duplicates("_id", keep="last").reset_index(drop=True)
+        edges = _frame(edge_records, ("from", "to", "type"))
+
+        ids = pd.Index(nodes["_id"].astype(object))
+        ends = pd.concat([edges["from"], edges["to"]], ignore_index=True).astype(object)
+        missing = pd.unique(ends[ids.get_indexer(ends) < 0])
+        if len(missing):
+            bare = _frame([{"_id": node_id, "type": node_id.split("/", 1)[0]} for node_id in missing])
+            nodes = pd.concat([nodes, bare], ignore_index=True)
+            ids = pd.Index(nodes["_id"].astype(object))
+        nodes["_id"] = nodes["_id"].astype("string")
+        nodes["type"] = nodes["type"].astype("category")
+
+        index_dtype = np.int32 if len(nodes) < 2 ** 31 else np.int64
+        source = ids.get_indexer(edges["from"].astype(object)).astype(index_dtype)
+        target = ids.get_indexer(edges["to"].astype(object)).astype(index_dtype)
+        pairs = pd.DataFrame({"low": np.minimum(source, target), "high": np.maximum(source, target)})
+        keep = ~pairs.duplicated(keep="last").to_numpy()
+
+        columns = {"source": source[keep], "target": target[keep],
+                   "type": edges["type"].astype("category").array[keep]}
+        if "key" in edges:
+            columns["key"] = edges["key"].array[keep]
+        return cls(nodes, pd.DataFrame(columns))
+
+    @classmethod
+    def from_subgraph(cls, subgraph):
+        """Graph from an extract_subgraph() result (see subgraph.py)"""
+        return cls.from_records(subgraph["nodes"], subgraph["edges"])
+
+    @classmethod
+    def from_network_rows(cls, rows):
+        """Graph from NETWORK_GRAPH_QUERY rows (see langchain.get_network_graph)"""
+        node_records, node_types, edge_records = [], [], []
+        for row in rows:
+            event = row["event"]
+            node_records.append(event)
+            node_types.append("event")
+            for relation in row["relations"]:
+                if relation["target"]:
+                    node_records.append(relation["target"])
+                    node_types.append(relation["to"].split("/", 1)[0])
+                edge_records.append({"from": event["_id"], "to": relation["to"], "type": relation["type"]})
+        return cls.from_records(node_records, edge_records, node_types)
+
+    @classmethod
+    def from_networkx(cls, G):
+        """Compact copy of a NetworkX graph whose nodes carry a `type` attribute"""
+        node_records = [{**data, "_id": node} for node, data in G.nodes(data=True)]
+        edge_records = [{**data, "from": u, "to": v} for u, v, data in G.edges(data=True)]
+        return cls.from_records(node_records, edge_records)
+
+    # Structure
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self.edges)
+
+    def node_index(self, node_ids):
+        """Integer IDs of `_id`s, -1 for unknown ones"""
+        if self._id_index is None:
+            self._id_index = pd.Index(self.nodes["_id"].astype(object))
+        return self._id_index.get_indexer(pd.Index(node_ids, dtype=object))
+
+    def degree(self):
+        """Degree of every node; a self-loop counts twice, as in NetworkX"""
+        return np.diff(self.indptr)
+
+    def neighbors(self, node):
+        """Integer IDs of the neighbors of `node` (an integer ID or an `_id`)"""
+        if isinstance(node, str):
+            node = self.node_index([node])[0]
+            if node < 0:
+                raise KeyError(node)
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    # Statistics
+
+    def node_type_counts(self):
+        return _types(self.nodes).value_counts().sort_index()
+
+    def edge_type_counts(self):
+        return _types(self.edges).value_counts().sort_index()
+
+    def degree_stats(self):
+        """Average degree and the most connected node of each type"""
+        degrees = self.degree()
+        frame = pd.DataFrame({"type": _types(self.nodes), "degree": degrees})
+        best = frame.groupby("type")["degree"].idxmax()
+        return {
+            "average": float(degrees.mean()) if len(degrees) else 0.0,
+            "max": int(degrees.max()) if len(degrees) else 0,
+            "most_connected": {
+                node_type: (self.nodes["_id"].iat[row], int(degrees[row]))
+                for node_type, row in best.items()
+            },
+        }
+
+    def memory_bytes(self):
+        """Approximate memory held by the graph's arrays and columns"""
+        return int(self.nodes.memory_usage(deep=True).sum() + self.edges.memory_usage(deep=True).sum()
+                   + self.indptr.nbytes + self.indices.nbytes + self.edge_ids.nbytes)
+
+    # Conversion
+
+    def to_networkx(self):
+        """The equivalent nx.Graph; `_id` is the node name rather than an attribute"""
+        G = nx.Graph()
+        ids = self.nodes["_id"].to_numpy(dtype=object)
+        G.add_nodes_from(zip(ids, _attribute_dicts(self.nodes.drop(columns="_id"))))
+        edge_attributes = _attribute_dicts(self.edges.drop(columns=["source", "target"]))
+        G.add_edges_from(zip(ids[self.edges["source"].to_numpy()],
+                             ids[self.edges["target"].to_numpy()], edge_attributes))
+        return G
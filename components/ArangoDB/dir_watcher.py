@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # polling fallback below
+    FileSystemEventHandler = object
+    Observer = None
+
+# A file must keep the same size and mtime this long before it is handed off
+SETTLE_SECONDS = 1.0
+POLL_INTERVAL = 2.0
+# Seconds between sweeps that forget handled files which no longer exist
+PRUNE_INTERVAL = 60.0
+
+
+def is_candidate(filename, extensions=('.csv',)):
+    """True for finished input files; skips temp_ downloads, dotfiles and .part files"""
+    name = os.path.basename(filename)
+    if name.startswith(('temp_', '.')) or name.endswith('.part'):
+        return False
+    return name.lower().endswith(extensions)
+
+
+class _EventForwarder(FileSystemEventHandler):
+    """Forward inotify (or other native) events for candidate files to the watcher"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notice(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notice(event.src_path)
+
+    def on_closed(self, event):
+        # IN_CLOSE_WRITE: the writer is done, so only a short settle pause is needed
+        if not event.is_directory:
+            self.watcher.notice(event.src_path, closed=True)
+
+    def on_moved(self, event):
+        # Atomic renames (temp file -> final name) arrive as moves
+        if not event.is_directory:
+            self.watcher.notice(event.dest_path, closed=True)
+
+
+class DirectoryWatcher:
+    """Hand completed files in a directory to a worker pool as soon as they land.
+
+    Uses inotify through `watchdog` when it is installed and falls back to
+    polling otherwise. Either way a file is only dispatched once its size
+    and mtime have stopped changing, so partially written files are never
+    picked up. `handler(path)` runs in a worker process and should return
+    True on success. A file is processed once per version: a failed file is
+    retried only after it changes.
+    """
+
+    def __init__(self, directory, handler, workers=2, extensions=('.csv',),
+                 settle_seconds=SETTLE_SECONDS, poll_interval=POLL_INTERVAL, use_events=None):
+        self.directory = directory
+        self.handler = handler
+        self.extensions = extensions
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_events = (Observer is not None) if use_events is None else use_events
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+        self._lock = threading.Lock()
+        self._pending = {}      # path -> (size, mtime, time of last change, closed)
+        self._in_flight = set()
+        self._handled = {}      # path -> (size, mtime) when it was last processed
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    def notice(self, path, closed=False):
+        """Record activity on `path`; it is dispatched once it has settled"""
+        if not is_candidate(path, self.extensions):
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        signature = (stat.st_size, stat.st_mtime)
+
+        with self._lock:
+            if path in self._in_flight or self._handled.get(path) == signature:
+                return
+            previous = self._pending.get(path)
+            if previous is None or previous[:2] != signature:
+                self._pending[path] = (*signature, time.monotonic(), closed)
+            elif closed:
+                self._pending[path] = (*signature, previous[2], True)
+
+    def _dispatch_settled(self):
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (size, mtime, changed_at, closed) in list(self._pending.items()):
+                # A close event still gets a short pause in case the writer reopens
+                wait = self.settle_seconds / 4 if closed else self.settle_seconds
+                if now - changed_at < wait:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    del self._pending[path]
+                    continue
+                if (stat.st_size, stat.st_mtime) != (size, mtime):
+                    self._pending[path] = (stat.st_size, stat.st_mtime, now, False)
+                    continue
+                del self._pending[path]
+                self._in_flight.add(path)
+                ready.append((path, (size, mtime)))
+
+        for path, signature in ready:
+            print(f"[{datetime.now()}] Dispatching {os.path.basename(path)}")
+            future = self.executor.submit(self.handler, path)
+            future.add_done_callback(
+                lambda f, p=path, s=signature: self._finished(p, s, f)
+            )
+
+    def _finished(self, path, signature, future):
+        try:
+            ok = future.result()
+        except Exception as e:
+            print(f"Error processing {path}: {str(e)}")
+            ok = False
+        with self._lock:
+            self._in_flight.discard(path)
+            # Remembered either way, so the same file version never runs twice
+            self._handled[path] = signature
+        if not ok:
+            print(f"Failed to process {os.path.basename(path)}; will retry if it changes")
+
+    def prune_handled(self):
+        """Forget handled files that are gone (processed inputs are removed); returns how many"""
+        with self._lock:
+            paths = list(self._handled)
+        gone = [path for path in paths if not os.path.exists(path)]
+        with self._lock:
+            for path in gone:
+                self._handled.pop(path, None)
+        return len(gone)
+
+    def scan(self):
+        """Notice every candidate file currently in the directory"""
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                self.notice(entry.path)
+
+    def _settle_loop(self):
+        tick = min(0.25, self.settle_seconds / 4)
+        pruned_at = time.monotonic()
+        while not self._stop.wait(tick):
+            self._dispatch_settled()
+            if time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                self.prune_handled()
+                pruned_at = time.monotonic()
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            self.scan()
+
+    def start(self):
+        """Pick up files already present, then start watching"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.scan()
+
+        if self.use_events:
+            self._observer = Observer()
+            self._observer.schedule(_EventForwarder(self), self.directory, recursive=False)
+            self._observer.start()
+            print(f"Watching {self.directory} for file events")
+        else:
+            self._threads.append(threading.Thread(target=self._poll_loop, daemon=True))
+            print(f"Polling {self.directory} every {self.poll_interval}s")
+
+        self._threads.append(threading.Thread(target=self._settle_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join()
+        self.executor.shutdown(wait=wait)
+
+    def run_forever(self):
+        """Start watching and block until interrupted"""
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        finally:
+            self.stop()
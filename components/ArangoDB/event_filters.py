@@ -0,0 +1,116 @@
+"""Parse /api/events filter parameters and compile them into AQL FILTERs.
+
+Every value reaches the database as a bind variable; only the fixed clause
+templates below are ever spliced into the query text.
+"""
+
+QUADCLASSES = (1, 2, 3, 4)
+
+# Filter name -> (AQL clause, stage). "event" clauses run before the
+# per-event traversals, "location" clauses right after the location lookup.
+# Countries match the event's geoCountryCode, a copy of its location's
+# country (see bulk_loader.frame_to_documents), so they use the
+# [geoCountryCode, rnd] index instead of a traversal per event.
+FILTER_CLAUSES = {
+    "countries": ("event.geoCountryCode IN @countries", "event"),
+    "quadclasses": ("event.quadClass IN @quadclasses", "event"),
+    "goldstein_min": ("event.goldsteinScale >= @goldstein_min", "event"),
+    "goldstein_max": ("event.goldsteinScale <= @goldstein_max", "event"),
+    "day_from": ("event.date >= @day_from", "event"),
+    "day_to": ("event.date <= @day_to", "event"),
+    "lat_min": ("location.latitude >= @lat_min", "location"),
+    "lat_max": ("location.latitude <= @lat_max", "location"),
+    "lon_min": ("location.longitude >= @lon_min", "location"),
+    "lon_max": ("location.longitude <= @lon_max", "location"),
+}
+
+
+def _split(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def _number(name, value):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def _day(name, value):
+    # GDELT days are YYYYMMDD integers
+    if len(value) != 8 or not value.isdigit():
+        raise ValueError(f"{name} must be a YYYYMMDD date")
+    return int(value)
+
+
+def parse_event_filters(args):
+    """Turn query-string arguments into a filters dict.
+
+    Supported parameters:
+        country       - comma-separated location country codes (FIPS 10-4, e.g. US,UK)
+        quadclass     - comma-separated quad classes 1-4
+        goldstein_min - minimum Goldstein score
+        goldstein_max - maximum Goldstein score
+        bbox          - minLat,minLon,maxLat,maxLon
+        day_from      - first event day, YYYYMMDD
+        day_to        - last event day, YYYYMMDD
+
+    Raises ValueError on malformed values.
+    """
+    filters = {}
+
+    if args.get("country"):
+        filters["countries"] = [code.upper() for code in _split(args["country"])]
+
+    if args.get("quadclass"):
+        try:
+            quadclasses = [int(q) for q in _split(args["quadclass"])]
+        except ValueError:
+            raise ValueError("quadclass must be a list of integers")
+        if any(q not in QUADCLASSES for q in quadclasses):
+            raise ValueError("quadclass values must be between 1 and 4")
+        filters["quadclasses"] = quadclasses
+
+    for name in ("goldstein_min", "goldstein_max"):
+        if args.get(name):
+            filters[name] = _number(name, args[name])
+
+    for name in ("day_from", "day_to"):
+        if args.get(name):
+            filters[name] = _day(name, args[name])
+
+    if args.get("bbox"):
+        parts = _split(args["bbox"])
+        if len(parts) != 4:
+            raise ValueError("bbox must be minLat,minLon,maxLat,maxLon")
+        lat_min, lon_min, lat_max, lon_max = [_number("bbox", p) for p in parts]
+        filters.update(lat_min=lat_min, lon_min=lon_min, lat_max=lat_max, lon_max=lon_max)
+
+    return filters
+
+
+def compile_event_filters(filters, event_var="event", location_var="location"):
+    """Compile a filters dict into AQL FILTER lines.
+
+    Returns (event_filters, location_filters, bind_vars), where each
+    *_filters value is a (possibly empty) string of FILTER lines. Event
+    clauses refer to `event_var` and location clauses to `location_var`,
+    so they can run inside a subquery.
+    """
+    stages = {"event": [], "location": []}
+    bind_vars = {}
+
+    for name, value in filters.items():
+        if name not in FILTER_CLAUSES:
+            raise ValueError(f"Unknown event filter: {name}")
+        if value is None or value == []:
+            continue
+        clause, stage = FILTER_CLAUSES[name]
+        if stage == "event":
+            clause = clause.replace("event.", f"{event_var}.")
+        else:
+            clause = clause.replace("location.", f"{location_var}.")
+        stages[stage].append(f"        FILTER {clause}")
+        bind_vars[name] = value
+
+    return "\n".join(stages["event"]), "\n".join(stages["location"]), bind_vars
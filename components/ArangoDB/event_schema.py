@@ -0,0 +1,92 @@
+"""Fields of the GDELT graph model, shared by the loader and the query builder.
+
+Maps each cleaned CSV column to the attribute it is stored under, and
+gives its type. Clean_CSV writes the float columns (FractionDate,
+GoldsteinScale, AvgTone and the coordinates) as floats. This module has
+no dependencies, so query_builder can import it without pulling in the
+loader.
+"""
+
+# Cleaned CSV column -> Events attribute
+EVENT_FIELDS = {
+    'Day': 'date',
+    'MonthYear': 'monthYear',
+    'Year': 'year',
+    'FractionDate': 'fractionDate',
+    'IsRootEvent': 'isRootEvent',
+    'EventCode': 'eventCode',
+    'EventBaseCode': 'baseCode',
+    'EventRootCode': 'rootCode',
+    'QuadClass': 'quadClass',
+    'GoldsteinScale': 'goldsteinScale',
+    'NumMentions': 'numMentions',
+    'NumSources': 'numSources',
+    'NumArticles': 'numArticles',
+    'AvgTone': 'avgTone',
+    'DateAdded': 'dateAdded',
+    'Source': 'source',
+}
+
+# Cleaned CSV column -> Actors attribute
+ACTOR_FIELDS = {
+    'Actor1Type1Code': 'type1Code',
+    'Actor1Type2Code': 'type2Code',
+    'Actor1Type3Code': 'type3Code',
+    'Actor1CountryCode': 'countryCode',
+}
+
+# Cleaned CSV column -> Locations attribute
+LOCATION_FIELDS = {
+    'Actor1Geo_Type': 'type',
+    'Actor1Geo_Fullname': 'fullname',
+    'Actor1Geo_CountryCode': 'countryCode',
+    'Actor1Geo_ADM1Code': 'adm1Code',
+    'Actor1Geo_ADM2Code': 'adm2Code',
+    'Actor1Geo_Lat': 'latitude',
+    'Actor1Geo_Long': 'longitude',
+    'Actor1Geo_FeatureID': 'featureID',
+}
+
+# Explicit dtypes for reading cleaned CSVs
+CSV_DTYPES = {
+    'GlobalEventID': str,
+    'Actor1Type1Code': str,
+    'Actor1Type2Code': str,
+    'Actor1Type3Code': str,
+    'Actor1CountryCode': str,
+    'Actor1Geo_Fullname': str,
+    'Actor1Geo_CountryCode': str,
+    'Actor1Geo_ADM1Code': str,
+    'Actor1Geo_ADM2Code': str,
+    'Actor1Geo_FeatureID': str,
+    'Source': str,
+    'Day': 'Int64',
+    'MonthYear': 'Int64',
+    'Year': 'Int64',
+    'IsRootEvent': 'Int64',
+    'EventCode': 'Int64',
+    'EventBaseCode': 'Int64',
+    'EventRootCode': 'Int64',
+    'QuadClass': 'Int64',
+    'FractionDate': 'float64',
+    'GoldsteinScale': 'float64',
+    'NumMentions': 'Int64',
+    'NumSources': 'Int64',
+    'NumArticles': 'Int64',
+    'AvgTone': 'float64',
+    'Actor1Geo_Type': 'Int64',
+    'Actor1Geo_Lat': 'float64',
+    'Actor1Geo_Long': 'float64',
+    'DateAdded': 'Int64',
+}
+
+# Python type of the values stored for each CSV dtype
+PYTHON_TYPES = {"Int64": int, "float64": float, str: str}
+
+# Events attributes the loader derives rather than copies (see sampling.py)
+DERIVED_EVENT_ATTRIBUTES = {"rnd": float, "geoCountryCode": str}
+
+
+def attribute_types(fields):
+    """Stored attribute -> Python type, for a column -> attribute mapping"""
+    return {attribute: PYTHON_TYPES[CSV_DTYPES[column]] for column, attribute in fields.items()}
@@ -0,0 +1,273 @@
+"""Graph statistics for a CompactGraph or for the whole database.
+
+Both entry points return the same JSON-serializable dict:
+
+    nodes, edges        totals
+    node_types,         counts per node type / edge type
+    edge_types
+    degree              per node type: nodes, mean, median, max and a
+                        histogram of [degree, nodes] pairs
+    hubs                per node type: the top-k nodes by degree, with
+                        their degree centrality
+    components          count, size of the largest, isolated nodes and
+                        the largest sizes
+    pagerank            the top-k nodes overall
+
+graph_stats() works on the arrays of a CompactGraph (see compact_graph.py).
+database_graph_stats() counts degrees with AQL COLLECT queries on the
+server. It computes components and PageRank in NumPy from the streamed
+edge list, because ArangoDB 3.12 removed Pregel. Its result is cached
+until the next ingest.
+"""
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from arango_pool import get_db
+from compact_graph import CompactGraph
+from query_cache import cache_key, get_cache
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+TOP_K = 10
+# Largest component sizes listed
+COMPONENT_SIZES = 10
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-6
+PAGERANK_MAX_ITERATIONS = 100
+
+EDGE_COLLECTION = "EventRelations"
+# The vertex collections EventRelations connects
+VERTEX_COLLECTIONS = ("Actors", "Events", "Locations")
+EDGE_BATCH_SIZE = 50000
+
+# Every edge counts once for each of its ends; vertices without edges never appear
+DEGREE_HISTOGRAM_QUERY = """
+FOR e IN EventRelations
+    FOR vertex IN [e._from, e._to]
+        COLLECT v = vertex WITH COUNT INTO degree
+        COLLECT type = PARSE_IDENTIFIER(v).collection, d = degree WITH COUNT INTO nodes
+        RETURN {type, degree: d, nodes}
+"""
+
+HUBS_QUERY = """
+FOR e IN EventRelations
+    FOR vertex IN [e._from, e._to]
+        FILTER STARTS_WITH(vertex, @prefix)
+        COLLECT v = vertex WITH COUNT INTO degree
+        SORT degree DESC
+        LIMIT @top_k
+        RETURN {id: v, degree}
+"""
+
+EDGE_TYPES_QUERY = """
+FOR e IN EventRelations
+    COLLECT type = e.type WITH COUNT INTO edges
+    RETURN {type, edges}
+"""
+
+EDGE_LIST_QUERY = """
+FOR e IN EventRelations
+    RETURN [e._from, e._to]
+"""
+
+
+def _degree_summary(degrees, counts):
+    """Summary of a degree distribution given as distinct degrees and their node counts"""
+    order = np.argsort(degrees)
+    degrees, counts = np.asarray(degrees)[order], np.asarray(counts)[order]
+    total = int(counts.sum())
+    if not total:
+        return {"nodes": 0, "mean": 0.0, "median": 0, "max": 0, "histogram": []}
+    median = degrees[np.searchsorted(np.cumsum(counts), (total + 1) // 2)]
+    return {
+        "nodes": total,
+        "mean": round(float((degrees * counts).sum() / total), 4),
+        "median": int(median),
+        "max": int(degrees[-1]),
+        "histogram": [[int(d), int(c)] for d, c in zip(degrees, counts)],
+    }
+
+
+def connected_components(count, source, target):
+    """Component label (its smallest node) for each of `count` nodes, by label propagation"""
+    labels = np.arange(count)
+    if not len(source):
+        return labels
+    while True:
+        previous = labels.copy()
+        lowest = np.minimum(labels[source], labels[target])
+        np.minimum.at(labels, source, lowest)
+        np.minimum.at(labels, target, lowest)
+        # Pointer jumping: follow labels to their root so long chains collapse quickly
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def _component_summary(labels):
+    sizes = np.bincount(labels, minlength=len(labels))
+    sizes = np.sort(sizes[sizes > 0])[::-1]
+    return {
+        "count": int(len(sizes)),
+        "largest": int(sizes[0]) if len(sizes) else 0,
+        "isolated": int((sizes == 1).sum()),
+        "sizes": sizes[:COMPONENT_SIZES].tolist(),
+    }
+
+
+def pagerank(count, source, target, damping=PAGERANK_DAMPING):
+    """PageRank of an undirected graph given as edge end arrays, by power iteration"""
+    if not count:
+        return np.zeros(0)
+    degree = np.bincount(source, minlength=count) + np.bincount(target, minlength=count)
+    dangling = degree == 0
+    scale = np.divide(1.0, degree, out=np.zeros(count), where=~dangling)
+    rank = np.full(count, 1.0 / count)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        share = rank * scale
+        spread = (np.bincount(target, weights=share[source], minlength=count)
+                  + np.bincount(source, weights=share[target], minlength=count))
+        updated = (1 - damping) / count + damping * (spread + rank[dangling].sum() / count)
+        converged = np.abs(updated - rank).sum() < PAGERANK_TOLERANCE
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def _top(values, k):
+    """Positions of the k largest values, largest first"""
+    k = min(k, len(values))
+    if not k:
+        return np.zeros(0, dtype=np.int64)
+    picked = np.argpartition(-values, k - 1)[:k]
+    return picked[np.argsort(-values[picked], kind="stable")]
+
+
+def _pagerank_top(ids, types, rank, top_k):
+    return [
+        {"id": str(ids[i]), "type": str(types[i]), "score": round(float(rank[i]), 8)}
+        for i in _top(rank, top_k)
+    ]
+
+
+def graph_stats(G, top_k=TOP_K):
+    """Statistics of a CompactGraph (a NetworkX graph is converted first)"""
+    if not isinstance(G, CompactGraph):
+        G = CompactGraph.from_networkx(G)
+
+    count = G.number_of_nodes()
+    degrees = G.degree()
+    types = G.nodes["type"].astype(object).fillna("Unknown").to_numpy()
+    ids = G.nodes["_id"].to_numpy(dtype=object)
+    source = G.edges["source"].to_numpy()
+    target = G.edges["target"].to_numpy()
+    centrality = degrees / (count - 1) if count > 1 else np.zeros(count)
+
+    degree, hubs = {}, {}
+    for node_type in sorted(set(types)):
+        rows = np.flatnonzero(types == node_type)
+        distinct, counts = np.unique(degrees[rows], return_counts=True)
+        degree[node_type] = _degree_summary(distinct, counts)
+        hubs[node_type] = [
+            {"id": str(ids[row]), "degree": int(degrees[row]),
+             "degree_centrality": round(float(centrality[row]), 6)}
+            for row in rows[_top(degrees[rows], top_k)]
+        ]
+
+    return {
+        "scope": "graph",
+        "nodes": count,
+        "edges": G.number_of_edges(),
+        "node_types": {str(k): int(v) for k, v in G.node_type_counts().items()},
+        "edge_types": {str(k): int(v) for k, v in G.edge_type_counts().items()},
+        "degree": degree,
+        "hubs": hubs,
+        "components": _component_summary(connected_components(count, source, target)),
+        "pagerank": _pagerank_top(ids, types, pagerank(count, source, target), top_k),
+    }
+
+
+def _edge_list(db):
+    """Streamed edge ends as integer arrays, plus the vertex ID for each integer"""
+    cursor = db.aql.execute(EDGE_LIST_QUERY, batch_size=EDGE_BATCH_SIZE, stream=True)
+    ends = [end for edge in cursor for end in edge]
+    codes, ids = pd.factorize(pd.Series(ends, dtype=object))
+    return codes[0::2], codes[1::2], ids.to_numpy(dtype=object)
+
+
+def database_graph_stats(db, top_k=TOP_K, components=True):
+    """Statistics of the whole stored graph, cached until new data is loaded.
+
+    `components=False` skips components and PageRank, which stream every
+    edge to this process.
+    """
+    def compute():
+        vertex_counts = {name: db.collection(name).count() for name in VERTEX_COLLECTIONS}
+        histogram = {}
+        for row in db.aql.execute(DEGREE_HISTOGRAM_QUERY):
+            histogram.setdefault(row["type"], {})[row["degree"]] = row["nodes"]
+
+        total = sum(vertex_counts.values())
+        degree, hubs = {}, {}
+        for name, vertices in vertex_counts.items():
+            counts = histogram.get(name, {})
+            # Vertices no edge touches have degree 0
+            isolated = vertices - sum(counts.values())
+            if isolated > 0:
+                counts[0] = isolated
+            degree[name] = _degree_summary(list(counts), list(counts.values()))
+            hubs[name] = [
+                {**hub, "degree_centrality": round(hub["degree"] / (total - 1), 6) if total > 1 else 0.0}
+                for hub in db.aql.execute(HUBS_QUERY, bind_vars={"prefix": f"{name}/", "top_k": top_k})
+            ]
+
+        stats = {
+            "scope": "database",
+            "nodes": total,
+            "edges": db.collection(EDGE_COLLECTION).count(),
+            "node_types": vertex_counts,
+            "edge_types": {row["type"] or "Unknown": row["edges"] for row in db.aql.execute(EDGE_TYPES_QUERY)},
+            "degree": degree,
+            "hubs": hubs,
+        }
+        if components:
+            source, target, ids = _edge_list(db)
+            labels = connected_components(len(ids), source, target)
+            summary = _component_summary(labels)
+            # Vertices without edges are components of their own
+            isolated = max(total - len(ids), 0)
+            summary["count"] += isolated
+            summary["isolated"] += isolated
+            if not summary["largest"] and isolated:
+                summary["largest"] = 1
+            stats["components"] = summary
+            types = np.array([vertex.split("/", 1)[0] for vertex in ids], dtype=object)
+            stats["pagerank"] = _pagerank_top(ids, types, pagerank(len(ids), source, target), top_k)
+        return stats
+
+    key = cache_key(db.name, "graph_stats", top_k, components)
+    return get_cache().get_or_compute(key, compute)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Graph statistics for the whole database')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--top-k', type=int, default=TOP_K, help='Hubs per node type and PageRank entries')
+    parser.add_argument('--no-components', action='store_true',
+                        help='Skip components and PageRank (they stream every edge)')
+    args = parser.parse_args()
+
+    stats = database_graph_stats(get_db(args.db), args.top_k, components=not args.no_components)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
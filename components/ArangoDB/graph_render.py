@@ -0,0 +1,388 @@
+"""Layouts and headless rendering for large graphs.
+
+nx.spring_layout is O(n^2) per iteration, and node-by-node drawing adds
+more Python work per node. Rendering a 20k-node extract that way takes
+minutes. This module works on the arrays of a CompactGraph instead:
+
+    type_layout     concentric rings, one per node type, with nodes of a
+                    connected component next to each other; O(n log n)
+    force_layout    Fruchterman-Reingold where repulsion comes from the
+                    centres of mass of a coarse grid (a one-level
+                    Barnes-Hut), so each iteration is O(n * cells + edges)
+
+render_graph draws every node type with one scatter call and every edge
+type with one LineCollection. It renders off-screen through the Agg
+canvas unless asked to show a window. export_layout writes the
+coordinates as columnar JSON for the frontend.
+"""
+import argparse
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from compact_graph import CompactGraph
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+# Below this many nodes "auto" keeps NetworkX's spring layout
+SPRING_MAX_NODES = 500
+FORCE_ITERATIONS = 50
+FORCE_TEMPERATURE = 0.1
+# Warm starts from earlier positions only need to settle the new nodes
+WARM_ITERATIONS = 15
+WARM_TEMPERATURE = 0.02
+# Grid cells per side for the repulsion approximation
+FORCE_GRID = 32
+
+DEFAULT_DPI = 150
+DEFAULT_LABELS = 5
+
+TYPE_COLORS = {
+    'event': 'tab:red',
+    'Events': 'tab:red',
+    'Actors': 'tab:blue',
+    'Locations': 'tab:green',
+    'Countries': 'tab:purple',
+    'QuadClasses': 'tab:orange',
+    'ActorType3Codes': 'tab:brown',
+}
+EDGE_STYLES = ['solid', 'dashed', 'dotted', 'dashdot']
+
+
+def _compact(G):
+    return G if isinstance(G, CompactGraph) else CompactGraph.from_networkx(G)
+
+
+def _types(G):
+    return G.nodes["type"].astype(object).fillna("Unknown").to_numpy()
+
+
+def _normalize(pos):
+    """Scale positions into [0, 1] x [0, 1], keeping the aspect ratio"""
+    if not len(pos):
+        return pos
+    pos = pos - pos.min(axis=0)
+    span = pos.max()
+    return pos / span if span > 0 else pos + 0.5
+
+
+def type_layout(G):
+    """Concentric rings by node type, the rarest type innermost"""
+    from graph_analytics import connected_components
+
+    G = _compact(G)
+    count = G.number_of_nodes()
+    pos = np.zeros((count, 2))
+    if not count:
+        return pos
+    types = _types(G)
+    labels = connected_components(count, G.edges["source"].to_numpy(), G.edges["target"].to_numpy())
+    names, sizes = np.unique(types, return_counts=True)
+    for ring, name in enumerate(names[np.argsort(sizes, kind="stable")]):
+        rows = np.flatnonzero(types == name)
+        # Neighbors in the same component end up side by side on the ring
+        rows = rows[np.argsort(labels[rows], kind="stable")]
+        angles = 2 * np.pi * np.arange(len(rows)) / len(rows)
+        radius = (ring + 1) / len(names)
+        pos[rows] = np.column_stack([np.cos(angles), np.sin(angles)]) * radius
+    return _normalize(pos)
+
+
+def _push(delta, mass, k):
+    """Repulsion k^2 * mass / d along `delta` (the last axis holds x, y)"""
+    distance2 = np.maximum((delta ** 2).sum(axis=-1), (0.01 * k) ** 2)
+    return (k * k * mass / distance2)[..., None] * delta
+
+
+def _repulsion(pos, k, grid, rows=None):
+    """Repulsive displacement of the nodes in `rows` (all by default), approximated on a grid of cells.
+
+    Cells further apart than their direct neighbors repel each other as
+    point masses at their centres of mass; every node gets its cell's share
+    of that. Each node is then pushed individually by the centres of mass
+    of its own cell and the eight around it. This is O(cells^2 + nodes).
+    Every node adds to the cells' masses, but only `rows` are pushed.
+    """
+    all_cells = np.clip((pos * grid).astype(np.int64), 0, grid - 1)
+    all_cell = all_cells[:, 0] * grid + all_cells[:, 1]
+    mass = np.bincount(all_cell, minlength=grid * grid).astype(float)
+    centres = np.zeros((grid * grid, 2))
+    occupied = mass > 0
+    for axis in (0, 1):
+        centres[occupied, axis] = (np.bincount(all_cell, weights=pos[:, axis], minlength=grid * grid)[occupied]
+                                   / mass[occupied])
+    if rows is not None:
+        pos, cells, cell = pos[rows], all_cells[rows], all_cell[rows]
+    else:
+        cells, cell = all_cells, all_cell
+
+    # Far field between occupied cells that are not neighbors
+    filled = np.flatnonzero(occupied)
+    far = (np.abs((filled // grid)[:, None] - (filled // grid)[None, :]) > 1) | \
+        (np.abs((filled % grid)[:, None] - (filled % grid)[None, :]) > 1)
+    delta = centres[filled][:, None, :] - centres[filled][None, :, :]
+    cell_push = np.zeros((grid * grid, 2))
+    cell_push[filled] = _push(delta, mass[filled][None, :] * far, k).sum(axis=1)
+    displacement = cell_push[cell]
+
+    # Near field from the 3 x 3 block of cells around each node
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            x, y = cells[:, 0] + dx, cells[:, 1] + dy
+            inside = (x >= 0) & (x < grid) & (y >= 0) & (y < grid)
+            other = np.where(inside, x * grid + y, 0)
+            # A node does not repel itself
+            weight = np.where(inside, mass[other] - (other == cell), 0)
+            displacement += _push(pos - centres[other], weight, k)
+    return displacement
+
+
+def force_layout(G, iterations=FORCE_ITERATIONS, pos=None, grid=FORCE_GRID, temperature=FORCE_TEMPERATURE,
+                 fixed=None):
+    """Force-directed layout with grid-approximated repulsion, positions in [0, 1].
+
+    `pos` is the starting position of every node (type_layout by default);
+    `temperature` caps how far a node may move in the first iteration.
+    Nodes where the boolean mask `fixed` is set keep their `pos` exactly;
+    only the others are pushed, and the layout is not rescaled.
+    """
+    G = _compact(G)
+    count = G.number_of_nodes()
+    if count < 2:
+        return np.full((count, 2), 0.5)
+    pinned = fixed is not None and bool(np.any(fixed))
+    if pinned:
+        pos = np.asarray(pos, dtype=float).copy()
+        free = np.flatnonzero(~np.asarray(fixed, dtype=bool))
+    else:
+        pos = _normalize(type_layout(G) if pos is None else np.asarray(pos, dtype=float).copy())
+        free = None
+    source = G.edges["source"].to_numpy()
+    target = G.edges["target"].to_numpy()
+    k = 1.0 / np.sqrt(count)
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        if free is not None and not len(free):
+            break
+        displacement = _repulsion(pos, k, grid, free)
+        # Attraction along edges: d^2 / k
+        delta = pos[source] - pos[target]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+        pull = delta * (distance / k)[:, None]
+        attraction = np.column_stack([
+            np.bincount(target, weights=pull[:, axis], minlength=count)
+            - np.bincount(source, weights=pull[:, axis], minlength=count)
+            for axis in (0, 1)
+        ])
+        moved = pos if free is None else pos[free]
+        displacement += attraction if free is None else attraction[free]
+        # Weak gravity keeps separate components from drifting apart
+        displacement -= (moved - 0.5) * (k * count ** 0.5)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        step = displacement * (np.minimum(length, temperature) / length)[:, None]
+        if free is None:
+            pos = _normalize(pos + step)
+        else:
+            # Pinned nodes keep the cached frame; new ones stay inside it
+            pos[free] = np.clip(moved + step, 0.0, 1.0)
+        temperature -= cooling
+    return pos
+
+
+def resolve_layout(G, layout):
+    """The layout "auto" stands for with this graph; other names are returned as they are"""
+    if layout == "auto":
+        return "spring" if G.number_of_nodes() <= SPRING_MAX_NODES else "force"
+    return layout
+
+
+def compute_layout(G, layout="auto", seed=42, pos=None, fixed=None):
+    """Positions (n x 2 array, rows in node order) for layout "auto", "spring", "force" or "type".
+
+    With `pos`, a starting position for every node, spring and force run a
+    short warm start from it instead of a full layout. Nodes where the
+    boolean mask `fixed` is set then stay where `pos` puts them.
+    """
+    G = _compact(G)
+    layout = resolve_layout(G, layout)
+    pinned = pos is not None and fixed is not None and bool(np.any(fixed))
+    if layout == "spring":
+        import networkx as nx
+
+        ids = G.nodes["_id"].to_numpy(dtype=object)
+        start = None if pos is None else dict(zip(ids, np.asarray(pos, dtype=float)))
+        # With fixed nodes spring_layout neither moves nor rescales them
+        spring = nx.spring_layout(G.to_networkx(), pos=start, seed=seed,
+                                  fixed=list(ids[np.asarray(fixed, dtype=bool)]) if pinned else None,
+                                  iterations=FORCE_ITERATIONS if pos is None else WARM_ITERATIONS)
+        spring = np.array([spring[node] for node in ids]).reshape(-1, 2)
+        return np.clip(spring, 0.0, 1.0) if pinned else _normalize(spring)
+    if layout == "force":
+        if pos is None:
+            return force_layout(G)
+        return force_layout(G, WARM_ITERATIONS, pos=pos, temperature=WARM_TEMPERATURE,
+                            fixed=fixed if pinned else None)
+    if layout == "type":
+        return type_layout(G)
+    raise ValueError(f"Unknown layout: {layout} (expected auto, spring, force or type)")
+
+
+def _label_rows(G, types, per_type):
+    """The `per_type` highest-degree nodes of each type"""
+    degrees = G.degree()
+    rows = []
+    for name in np.unique(types):
+        members = np.flatnonzero(types == name)
+        rows.extend(members[np.argsort(-degrees[members], kind="stable")[:per_type]])
+    return rows
+
+
+def default_label(node_type, attributes):
+    return str(attributes.get("_id", "")).split("/")[-1]
+
+
+def render_graph(G, output_file=None, layout="auto", pos=None, colors=None, labels=DEFAULT_LABELS,
+                 label_text=default_label, title="GDELT Event Network", dpi=DEFAULT_DPI,
+                 figsize=(20, 16), show=False):
+    """Draw a graph and save it to `output_file`; returns the positions used.
+
+    Nodes are drawn one scatter per type and edges one LineCollection per
+    edge type. `labels` is the number of highest-degree nodes labelled per
+    type, with text from `label_text(type, attributes)`. The figure is
+    rendered off-screen unless `show` is True.
+    """
+    G = _compact(G)
+    pos = compute_layout(G, layout) if pos is None else np.asarray(pos)
+    colors = {**TYPE_COLORS, **(colors or {})}
+    types = _types(G)
+
+    if show:
+        import matplotlib.pyplot as plt
+
+        figure = plt.figure(figsize=figsize)
+    else:
+        figure = Figure(figsize=figsize)
+        FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+
+    source = G.edges["source"].to_numpy()
+    target = G.edges["target"].to_numpy()
+    edge_types = G.edges["type"].astype(object).fillna("Unknown").to_numpy()
+    segments = np.stack([pos[source], pos[target]], axis=1)
+    edge_handles = []
+    for i, edge_type in enumerate(sorted(set(edge_types))):
+        style = EDGE_STYLES[i % len(EDGE_STYLES)]
+        axes.add_collection(LineCollection(segments[edge_types == edge_type], colors='gray',
+                                           linewidths=0.5, alpha=0.4, linestyles=style,
+                                           rasterized=True))
+        edge_handles.append(Line2D([0], [0], color='gray', lw=2, linestyle=style, label=edge_type))
+
+    # Larger graphs get smaller markers so they stay readable
+    scale = min(1.0, 30 / np.sqrt(max(len(types), 1)))
+    node_handles = []
+    for node_type in sorted(set(types)):
+        rows = types == node_type
+        size = 300 if node_type in ('event', 'Events') else 200
+        color = colors.get(node_type, 'tab:gray')
+        axes.scatter(pos[rows, 0], pos[rows, 1], s=size * scale, c=color, alpha=0.8, linewidths=0,
+                     rasterized=True)
+        node_handles.append(Line2D([0], [0], marker='o', color='w', markerfacecolor=color, markersize=10,
+                                   label=f"{node_type} ({rows.sum()})"))
+
+    if labels:
+        for row in _label_rows(G, types, labels):
+            attributes = {name: value for name, value in G.nodes.iloc[row].items()
+                          if not (pd.api.types.is_scalar(value) and pd.isna(value))}
+            axes.annotate(label_text(types[row], attributes), pos[row], fontsize=8, fontweight='bold',
+                          ha='center', va='center',
+                          bbox={"boxstyle": "round,pad=0.3", "facecolor": "white", "alpha": 0.6})
+
+    figure.text(0.02, 0.02,
+                f"Graph Statistics:\nNodes: {G.number_of_nodes()}\nEdges: {G.number_of_edges()}\n"
+                f"Node Types: {len(set(types))}\nEdge Types: {len(edge_handles)}",
+                fontsize=12, bbox={"boxstyle": "round,pad=0.5", "facecolor": "white", "alpha": 0.8})
+    node_legend = axes.legend(handles=node_handles, loc='upper right', title="Node Types")
+    if edge_handles:
+        axes.legend(handles=edge_handles, loc='upper left', title="Edge Types", fontsize=8)
+        axes.add_artist(node_legend)
+    axes.set_title(title, fontsize=20)
+    axes.set_xlim(-0.02, 1.02)
+    axes.set_ylim(-0.02, 1.02)
+    axes.axis('off')
+
+    if output_file:
+        figure.savefig(output_file, dpi=dpi, bbox_inches='tight')
+        print(f"Graph visualization saved to {output_file}")
+    if show:
+        import matplotlib.pyplot as plt
+
+        plt.show()
+    return pos
+
+
+def export_layout(G, pos, path):
+    """Write node positions, types and degrees plus the edge list as columnar JSON"""
+    G = _compact(G)
+    layout = {
+        "nodes": {
+            "id": G.nodes["_id"].astype(object).tolist(),
+            "type": _types(G).tolist(),
+            "x": np.round(pos[:, 0], 5).tolist(),
+            "y": np.round(pos[:, 1], 5).tolist(),
+            "degree": G.degree().tolist(),
+        },
+        "edges": {
+            "source": G.edges["source"].tolist(),
+            "target": G.edges["target"].tolist(),
+            "type": G.edges["type"].astype(object).fillna("Unknown").tolist(),
+        },
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".layout_")
+    with os.fdopen(fd, "w") as f:
+        json.dump(layout, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    print(f"Layout saved to {path}")
+
+
+def main():
+    from arango_pool import get_db
+    from sampling import sample_event_keys
+    from subgraph import extract_subgraph
+    import time
+
+    parser = argparse.ArgumentParser(description='Lay out and render a sampled GDELT subgraph headlessly')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--events', type=int, default=75, help='Events to sample')
+    parser.add_argument('--layout', choices=['auto', 'spring', 'force', 'type'], default='auto')
+    parser.add_argument('--output', default='gdelt_graph.png', help='Image file ("" to skip drawing)')
+    parser.add_argument('--json', metavar='FILE', help='Also write the layout as JSON')
+    parser.add_argument('--labels', type=int, default=DEFAULT_LABELS, help='Labelled nodes per type')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI)
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    started = time.perf_counter()
+    G = CompactGraph.from_subgraph(extract_subgraph(db, sample_event_keys(db, args.events)))
+    print(f"Extracted {G.number_of_nodes()} nodes, {G.number_of_edges()} edges "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    pos = compute_layout(G, args.layout)
+    print(f"Layout in {time.perf_counter() - started:.2f}s")
+    if args.json:
+        export_layout(G, pos, args.json)
+    if args.output:
+        started = time.perf_counter()
+        render_graph(G, args.output, pos=pos, labels=args.labels, dpi=args.dpi)
+        print(f"Rendered in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+from arango_pool import get_db
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+# Collections of the GDELT graph model
+COLLECTIONS = {
+    "Events": "document",
+    "Actors": "document",
+    "Locations": "document",
+    "EventRelations": "edge",
+    # Pre-aggregated time series (see rollups.py)
+    "EventRollups": "document",
+    "RollupBatches": "document",
+    # Shared markers such as the ingest epoch (see query_cache.py)
+    "Meta": "document",
+}
+
+# (collection, index type, fields) for every attribute the hot queries filter on
+INDEXES = [
+    ("Events", "persistent", ["eventCode"]),
+    ("Events", "persistent", ["quadClass", "goldsteinScale"]),
+    ("Events", "persistent", ["goldsteinScale"]),
+    ("Events", "persistent", ["date"]),
+    # Incremental similarity index updates (see similarity_index.py)
+    ("Events", "persistent", ["dateAdded"]),
+    # Random sampling: range scans over rnd, overall and per stratum
+    ("Events", "persistent", ["rnd"]),
+    ("Events", "persistent", ["quadClass", "rnd"]),
+    ("Events", "persistent", ["geoCountryCode", "rnd"]),
+    ("Actors", "persistent", ["type3Code"]),
+    ("Actors", "persistent", ["countryCode"]),
+    ("Locations", "persistent", ["countryCode"]),
+    ("Locations", "geo", ["latitude", "longitude"]),
+    ("EventRelations", "persistent", ["type"]),
+    # Vertex-centric index: lets traversals jump straight to one edge type
+    ("EventRelations", "persistent", ["_from", "type"]),
+    # Rollup time series: one cell type, optionally one value, a bucket range
+    ("EventRollups", "persistent", ["granularity", "dimension", "value", "bucket"]),
+]
+
+# Representative forms of the project's queries, checked with EXPLAIN
+KNOWN_QUERIES = {
+    "query_events(eventCode)": (
+        "FOR doc IN Events FILTER doc.eventCode == @eventCode LIMIT 10 RETURN doc",
+        {"eventCode": 20},
+    ),
+    "query_events(quadClass, goldstein)": (
+        "FOR doc IN Events FILTER doc.quadClass == @quadClass AND doc.goldsteinScale > @score "
+        "LIMIT 10 RETURN doc",
+        {"quadClass": 4, "score": 5},
+    ),
+    "query_actors(type3Code)": (
+        "FOR doc IN Actors FILTER doc.type3Code == @code LIMIT 10 RETURN doc",
+        {"code": "GOV"},
+    ),
+    "query_actors(countryCode)": (
+        "FOR doc IN Actors FILTER doc.countryCode == @code LIMIT 10 RETURN doc",
+        {"code": "USA"},
+    ),
+    "query_locations(countryCode)": (
+        "FOR doc IN Locations FILTER doc.countryCode == @code LIMIT 10 RETURN doc",
+        {"code": "US"},
+    ),
+    "locations near point": (
+        "FOR doc IN Locations FILTER DISTANCE(doc.latitude, doc.longitude, @lat, @lon) < @radius "
+        "RETURN doc",
+        {"lat": 38.9, "lon": -77.0, "radius": 50000},
+    ),
+    "query_events_with_relations": (
+        "LET event = DOCUMENT(CONCAT('Events/', @event_id)) "
+        "FOR edge IN EventRelations FILTER edge._from == event._id AND edge.type == 'HAS_ACTOR' "
+        "RETURN edge._to",
+        {"event_id": "1"},
+    ),
+    "get_network_graph traversal": (
+        "FOR event IN Events LIMIT @limit "
+        "FOR target, edge IN 1..1 OUTBOUND event EventRelations RETURN {to: edge._to, type: edge.type}",
+        {"limit": 100},
+    ),
+    "sample (uniform)": (
+        "FOR event IN Events FILTER event.rnd >= @rnd_start SORT event.rnd LIMIT 75 RETURN event._key",
+        {"rnd_start": 0.5},
+    ),
+    "sample (quadClass stratum)": (
+        "FOR event IN Events FILTER event.quadClass == @stratum FILTER event.rnd >= @rnd_start "
+        "SORT event.rnd LIMIT 75 RETURN event._key",
+        {"stratum": 1, "rnd_start": 0.5},
+    ),
+    # langchain.SIMILAR_EVENTS_QUERY: a full scan with a computed SORT that
+    # no index can serve; normally similarity_index.py answers instead
+    "find_similar_events (AQL fallback)": (
+        "LET event = DOCUMENT(CONCAT('Events/', @event_id)) "
+        "FOR e IN Events FILTER e._id != event._id "
+        "LET similarity = ((e.eventCode == event.eventCode ? 1 : 0) + (e.quadClass == event.quadClass ? 1 : 0) "
+        "+ (ABS(e.goldsteinScale - event.goldsteinScale) < 1 ? 1 : 0) "
+        "+ (ABS(e.avgTone - event.avgTone) < 5 ? 1 : 0)) "
+        "SORT similarity DESC LIMIT @limit RETURN {event: e, similarity_score: similarity}",
+        {"event_id": "1", "limit": 5},
+    ),
+    "get_event_time_distribution": (
+        "FOR r IN EventRollups FILTER r.granularity == @granularity AND r.dimension == @dimension "
+        "FILTER r.value == @value FILTER r.bucket >= @start AND r.bucket <= @end "
+        "SORT r.bucket LIMIT 30 RETURN r",
+        {"granularity": "event_day", "dimension": "all", "value": "*", "start": 0, "end": 99999999},
+    ),
+    "/api/events quadclass + goldstein": (
+        "FOR event IN Events FILTER event.quadClass IN @quadclasses "
+        "FILTER event.goldsteinScale >= @goldstein_min RETURN event._key",
+        {"quadclasses": [3, 4], "goldstein_min": 5},
+    ),
+    "/api/events day range": (
+        "FOR event IN Events FILTER event.date >= @day_from FILTER event.date <= @day_to "
+        "RETURN event._key",
+        {"day_from": 20250101, "day_to": 20250107},
+    ),
+}
+
+
+def index_name(collection, fields):
+    """Stable index name, so re-running the bootstrap finds the same index"""
+    return "idx_{}_{}".format(collection.lower(), "_".join(f.strip("_") for f in fields))
+
+
+def ensure_collections(db):
+    """Create any missing collection of the GDELT model; returns the created names"""
+    created = []
+    for name, kind in COLLECTIONS.items():
+        if not db.has_collection(name):
+            db.create_collection(name, edge=(kind == "edge"))
+            created.append(name)
+    return created
+
+
+def ensure_indexes(db, in_background=True):
+    """Create every index in INDEXES that does not exist yet.
+
+    Index creation in ArangoDB is idempotent, so this is safe to run on
+    every deploy. Returns one {collection, name, type, fields, created}
+    dict per index.
+    """
+    results = []
+    for collection_name, index_type, fields in INDEXES:
+        collection = db.collection(collection_name)
+        name = index_name(collection_name, fields)
+
+        if index_type == "geo":
+            index = collection.add_geo_index(fields, geo_json=False, name=name,
+                                             in_background=in_background)
+        else:
+            index = collection.add_persistent_index(fields, sparse=False, name=name,
+                                                    in_background=in_background)
+
+        results.append({
+            "collection": collection_name,
+            "name": name,
+            "type": index_type,
+            "fields": fields,
+            "created": bool(index.get("new", False)),
+        })
+    return results
+
+
+def _plan_indexes(nodes):
+    """Collect every index referenced by an execution plan's nodes"""
+    used = []
+    for node in nodes:
+        indexes = node.get("indexes")
+        if isinstance(indexes, dict):
+            # Traversal nodes list their edge indexes under "base"/"levels"
+            used.extend(indexes.get("base", []))
+            for level in indexes.get("levels", {}).values():
+                used.extend(level)
+        elif indexes:
+            used.extend(indexes)
+
+        subquery = node.get("subquery")
+        if subquery:
+            used.extend(_plan_indexes(subquery.get("nodes", [])))
+    return used
+
+
+def explain_query(db, query, bind_vars=None):
+    """Return the indexes the optimizer picks for a query"""
+    plan = db.aql.explain(query, bind_vars=bind_vars or {})
+    indexes = _plan_indexes(plan.get("nodes", []))
+    return [
+        {"name": index.get("name"), "type": index.get("type"), "fields": index.get("fields", [])}
+        for index in indexes
+    ]
+
+
+def index_report(db, queries=None):
+    """EXPLAIN each known query and report whether it uses a secondary index"""
+    report = {}
+    for label, (query, bind_vars) in (queries or KNOWN_QUERIES).items():
+        try:
+            indexes = explain_query(db, query, bind_vars)
+            report[label] = {
+                "uses_index": any(i["type"] not in ("primary", "edge") for i in indexes),
+                "indexes": indexes,
+            }
+        except Exception as e:
+            report[label] = {"uses_index": False, "error": str(e)}
+    return report
+
+
+def bootstrap(db, in_background=True):
+    """Create missing collections and indexes, then report index usage"""
+    created = ensure_collections(db)
+    if created:
+        print(f"Created collections: {', '.join(created)}")
+
+    for index in ensure_indexes(db, in_background=in_background):
+        status = "created" if index["created"] else "exists"
+        print(f"- {index['collection']}.{index['name']} ({index['type']}): {status}")
+
+    return index_report(db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create the GDELT collections and indexes')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--report-only', action='store_true',
+                        help='Only report which known queries use an index')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    report = index_report(db) if args.report_only else bootstrap(db)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("\nIndex usage by query:")
+    for label, entry in report.items():
+        if "error" in entry:
+            print(f"- {label}: error ({entry['error']})")
+        else:
+            names = ", ".join(i["name"] for i in entry["indexes"]) or "none"
+            print(f"- {label}: {'yes' if entry['uses_index'] else 'NO'} [{names}]")
+
+
+if __name__ == "__main__":
+    main()
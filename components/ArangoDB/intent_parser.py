@@ -0,0 +1,299 @@
+"""Keyword intent parser for natural-language event queries.
+
+Turns questions like "material conflict in the US above 5 in the last
+7 days" into the filters dict of event_filters.parse_event_filters, so
+they run as the /api/events AQL filters on indexed data. No LLM is
+involved and no events leave the database unfiltered. The rules are
+the ones app/api/natural-language-query/route.js used to apply in the
+browser, plus time ranges:
+
+    countries       country names, "us"/"uk" after a preposition, and
+                    "europe" for the European country list
+    quadclasses     cooperation/conflict, narrowed by verbal/material
+    goldstein_*     above/over/greater than/at least N, below/under/less
+                    than/at most N, between A and B; bounds at the edge of
+                    the -10..10 scale are dropped
+    day_from/to     today, yesterday, last/past N days/weeks/months, this
+                    week/month/year, since/before/on YYYY-MM-DD, in YYYY
+
+PHRASE_CORPUS lists phrases with the filters each one must produce;
+`python intent_parser.py --check` verifies the parser against it.
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import date, timedelta
+from event_filters import compile_event_filters
+
+GOLDSTEIN_MIN = -10
+GOLDSTEIN_MAX = 10
+
+# Location country codes come from GDELT's Actor1Geo_CountryCode, which uses
+# FIPS 10-4 codes, not ISO 3166 (the UK is UK, Germany GM, China CH)
+EUROPEAN_COUNTRIES = ['GM', 'FR', 'UK', 'IT', 'SP', 'NL', 'BE', 'AU', 'SZ', 'SW', 'DA', 'NO', 'FI',
+                      'PO', 'EI', 'GR', 'PL']
+
+COUNTRY_NAMES = {
+    'united states': 'US', 'usa': 'US', 'u.s.': 'US', 'us': 'US',
+    'united kingdom': 'UK', 'great britain': 'UK', 'britain': 'UK', 'uk': 'UK',
+    'canada': 'CA', 'germany': 'GM', 'france': 'FR', 'italy': 'IT', 'spain': 'SP',
+    'netherlands': 'NL', 'belgium': 'BE', 'austria': 'AU', 'switzerland': 'SZ', 'sweden': 'SW',
+    'denmark': 'DA', 'norway': 'NO', 'finland': 'FI', 'portugal': 'PO', 'ireland': 'EI',
+    'greece': 'GR', 'poland': 'PL', 'russia': 'RS', 'ukraine': 'UP', 'china': 'CH', 'india': 'IN',
+    'japan': 'JA', 'mexico': 'MX', 'brazil': 'BR', 'australia': 'AS', 'israel': 'IS', 'iran': 'IR',
+}
+REGIONS = {'europe': EUROPEAN_COUNTRIES}
+# Names that are also ordinary words ("show us ...") only count after one of these
+PREPOSITIONS = r"(?:in|from|within|inside|across|and|or)\s+(?:the\s+)?"
+PREPOSITION_ONLY = {'us'}
+
+NUMBER = r"(-?\d+(?:\.\d+)?)"
+# A number followed by a time unit is a time range, not a score
+NOT_TIME = r"(?!\s*(?:days?|weeks?|months?|years?|hours?)\b)"
+GOLDSTEIN_BETWEEN = re.compile(rf"\bbetween\s+{NUMBER}\s+and\s+{NUMBER}{NOT_TIME}")
+GOLDSTEIN_MIN_PATTERN = re.compile(
+    rf"(?:\b(?:above|over|greater than|more than|higher than|at least)\s+|>=?\s*){NUMBER}{NOT_TIME}")
+GOLDSTEIN_MAX_PATTERN = re.compile(
+    rf"(?:\b(?:below|under|less than|lower than|at most)\s+|<=?\s*){NUMBER}{NOT_TIME}")
+
+DATE = r"(\d{4})-?(\d{2})-?(\d{2})"
+UNIT_DAYS = {'day': 1, 'week': 7, 'month': 30, 'year': 365}
+
+
+def _day(value):
+    """A date as a GDELT YYYYMMDD integer"""
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def countries_in(text):
+    """Country codes named in lower-case `text`, in order of first mention"""
+    codes = []
+    for region, members in REGIONS.items():
+        if re.search(rf"\b{region}\b", text):
+            codes.extend(members)
+    for name, code in COUNTRY_NAMES.items():
+        prefix = PREPOSITIONS if name in PREPOSITION_ONLY else ""
+        if re.search(rf"(?<![\w.]){prefix}{re.escape(name)}(?![\w.])", text):
+            codes.append(code)
+    # Keep the first mention's order, drop repeats
+    return list(dict.fromkeys(codes))
+
+
+def event_types(text):
+    """Which of cooperation/conflict/verbal/material the text mentions"""
+    return {
+        'cooperation': bool(re.search(r"\bcooperat", text)),
+        'conflict': bool(re.search(r"\bconflict", text)),
+        'verbal': bool(re.search(r"\bverbal", text)),
+        'material': bool(re.search(r"\bmaterial", text)),
+    }
+
+
+def _quadclasses(types):
+    # quadclass: 1 = Verbal Cooperation, 2 = Material Cooperation,
+    # 3 = Verbal Conflict, 4 = Material Conflict
+    if types['cooperation'] and not types['conflict']:
+        return [1] if types['verbal'] else [2] if types['material'] else [1, 2]
+    if types['conflict'] and not types['cooperation']:
+        return [3] if types['verbal'] else [4] if types['material'] else [3, 4]
+    if types['verbal'] and not types['material']:
+        return [1, 3]
+    if types['material'] and not types['verbal']:
+        return [2, 4]
+    return None
+
+
+def _goldstein(text):
+    low, high = GOLDSTEIN_MIN, GOLDSTEIN_MAX
+    between = GOLDSTEIN_BETWEEN.search(text)
+    if between:
+        low, high = sorted(float(value) for value in between.groups())
+    else:
+        above = GOLDSTEIN_MIN_PATTERN.search(text)
+        below = GOLDSTEIN_MAX_PATTERN.search(text)
+        if above:
+            low = float(above.group(1))
+        if below:
+            high = float(below.group(1))
+    bounds = {}
+    if low > GOLDSTEIN_MIN:
+        bounds['goldstein_min'] = min(low, GOLDSTEIN_MAX)
+    if high < GOLDSTEIN_MAX:
+        bounds['goldstein_max'] = max(high, GOLDSTEIN_MIN)
+    return bounds
+
+
+def _days(text, today):
+    """day_from/day_to for the time phrase in `text`, relative to `today`"""
+    if re.search(r"\btoday\b", text):
+        return {'day_from': _day(today), 'day_to': _day(today)}
+    if re.search(r"\byesterday\b", text):
+        yesterday = today - timedelta(days=1)
+        return {'day_from': _day(yesterday), 'day_to': _day(yesterday)}
+
+    recent = re.search(r"\b(?:last|past)\s+(?:(\d+)\s+)?(day|week|month|year)s?\b", text)
+    if recent:
+        days = int(recent.group(1) or 1) * UNIT_DAYS[recent.group(2)]
+        # "last 7 days" is today and the six days before it
+        return {'day_from': _day(today - timedelta(days=days - 1))}
+    current = re.search(r"\bthis\s+(week|month|year)\b", text)
+    if current:
+        start = {
+            'week': today - timedelta(days=today.weekday()),
+            'month': today.replace(day=1),
+            'year': today.replace(month=1, day=1),
+        }[current.group(1)]
+        return {'day_from': _day(start)}
+
+    days = {}
+    on = re.search(rf"\bon\s+{DATE}\b", text)
+    if on:
+        day = int("".join(on.groups()))
+        return {'day_from': day, 'day_to': day}
+    since = re.search(rf"\b(?:since|after|from)\s+{DATE}\b", text)
+    if since:
+        days['day_from'] = int("".join(since.groups()))
+    until = re.search(rf"\b(?:before|until|to)\s+{DATE}\b", text)
+    if until:
+        days['day_to'] = int("".join(until.groups()))
+    year = re.search(r"\b(?:in|during)\s+((?:19|20)\d{2})\b(?!-?\d)", text)
+    if year and not days:
+        days = {'day_from': int(year.group(1)) * 10000 + 101, 'day_to': int(year.group(1)) * 10000 + 1231}
+    return days
+
+
+def parse_query(query, today=None):
+    """Parse a question into {"filters": ..., "event_types": ...}.
+
+    "filters" has the keys of event_filters.parse_event_filters and can be
+    compiled with compile_event_filters; "event_types" records which
+    event-type words appeared, for describe_results.
+    """
+    text = " " + query.lower().strip() + " "
+    today = today or date.today()
+    types = event_types(text)
+
+    filters = {}
+    countries = countries_in(text)
+    if countries:
+        filters['countries'] = countries
+    quadclasses = _quadclasses(types)
+    if quadclasses:
+        filters['quadclasses'] = quadclasses
+    filters.update(_goldstein(text))
+    filters.update(_days(text, today))
+    return {'filters': filters, 'event_types': types}
+
+
+def _number_text(value):
+    return f"{value:g}"
+
+
+def describe_results(intent, count, truncated=False):
+    """One-paragraph answer for `count` events matching a parsed query"""
+    filters, types = intent['filters'], intent['event_types']
+    if count == 0:
+        return "I couldn't find any events matching your criteria."
+    if not filters:
+        return "Showing all events. You can be more specific with your query to filter the results."
+
+    found = f"{count}{'+' if truncated else ''} events"
+    countries = filters.get('countries')
+    if countries == EUROPEAN_COUNTRIES:
+        message = f"Found {found} in Europe."
+    elif countries and len(countries) == 1:
+        place = {'US': 'the United States', 'UK': 'the United Kingdom'}.get(countries[0], countries[0])
+        message = f"Found {found} in {place}."
+    elif countries:
+        message = f"Found {found} in {', '.join(countries)}."
+    else:
+        message = f"Found {found} matching your criteria."
+
+    for kind, other in (('cooperation', 'conflict'), ('conflict', 'cooperation')):
+        if types[kind] and not types[other]:
+            message += f" These are {kind} events"
+            message += " of the verbal type." if types['verbal'] else \
+                " of the material type." if types['material'] else "."
+
+    if 'goldstein_min' in filters or 'goldstein_max' in filters:
+        message += (f" Goldstein scores are between {_number_text(filters.get('goldstein_min', GOLDSTEIN_MIN))}"
+                    f" and {_number_text(filters.get('goldstein_max', GOLDSTEIN_MAX))}.")
+    if 'day_from' in filters or 'day_to' in filters:
+        message += f" Dates from {filters.get('day_from', 'the start')} to {filters.get('day_to', 'today')}."
+    return message
+
+
+# Fixed "today" for the corpus's relative time phrases
+CORPUS_TODAY = date(2025, 3, 15)
+
+PHRASE_CORPUS = [
+    ("conflict events in the US above 5",
+     {'countries': ['US'], 'quadclasses': [3, 4], 'goldstein_min': 5.0}),
+    ("Show me events in us", {'countries': ['US']}),
+    ("show us the latest events", {}),
+    ("verbal cooperation in the united kingdom", {'countries': ['UK'], 'quadclasses': [1]}),
+    ("material conflict in UK below -5", {'countries': ['UK'], 'quadclasses': [4], 'goldstein_max': -5.0}),
+    ("cooperation in canada", {'countries': ['CA'], 'quadclasses': [1, 2]}),
+    ("events in europe", {'countries': EUROPEAN_COUNTRIES}),
+    ("conflict between russia and ukraine", {'countries': ['RS', 'UP'], 'quadclasses': [3, 4]}),
+    ("verbal events", {'quadclasses': [1, 3]}),
+    ("material events greater than 2", {'quadclasses': [2, 4], 'goldstein_min': 2.0}),
+    ("cooperation and conflict in france", {'countries': ['FR']}),
+    ("events with goldstein between -3 and 4.5", {'goldstein_min': -3.0, 'goldstein_max': 4.5}),
+    ("events with a score of at least 7 and at most 9", {'goldstein_min': 7.0, 'goldstein_max': 9.0}),
+    ("goldstein > 3", {'goldstein_min': 3.0}),
+    ("events above -10", {}),
+    ("events above 12", {'goldstein_min': 10}),
+    ("conflict today", {'quadclasses': [3, 4], 'day_from': 20250315, 'day_to': 20250315}),
+    ("cooperation yesterday in germany",
+     {'countries': ['GM'], 'quadclasses': [1, 2], 'day_from': 20250314, 'day_to': 20250314}),
+    ("events in the last 7 days", {'day_from': 20250309}),
+    ("conflict over the past week", {'quadclasses': [3, 4], 'day_from': 20250309}),
+    ("events in the past 2 weeks above 1", {'day_from': 20250302, 'goldstein_min': 1.0}),
+    ("events this month", {'day_from': 20250301}),
+    ("events this year in china", {'countries': ['CH'], 'day_from': 20250101}),
+    ("events in switzerland and austria", {'countries': ['AU', 'SZ']}),
+    ("cooperation in australia", {'countries': ['AS'], 'quadclasses': [1, 2]}),
+    ("events since 2025-03-01", {'day_from': 20250301}),
+    ("events from 20250301 to 20250310", {'day_from': 20250301, 'day_to': 20250310}),
+    ("events on 2025-03-02 in the usa",
+     {'countries': ['US'], 'day_from': 20250302, 'day_to': 20250302}),
+    ("conflict in 2024", {'quadclasses': [3, 4], 'day_from': 20240101, 'day_to': 20241231}),
+    ("more than 3 days ago", {}),
+]
+
+
+def check_corpus(corpus=PHRASE_CORPUS, today=CORPUS_TODAY):
+    """Phrases whose parsed filters differ from the expected ones: [(phrase, expected, got)]"""
+    failures = []
+    for phrase, expected in corpus:
+        got = parse_query(phrase, today)['filters']
+        if got != expected:
+            failures.append((phrase, expected, got))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse natural-language event queries into AQL filters')
+    parser.add_argument('query', nargs='*', help='Query text')
+    parser.add_argument('--check', action='store_true', help='Verify the parser against PHRASE_CORPUS')
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check_corpus()
+        for phrase, expected, got in failures:
+            print(f"{phrase!r}: expected {expected}, got {got}")
+        print(f"{len(PHRASE_CORPUS) - len(failures)}/{len(PHRASE_CORPUS)} phrases parsed as expected")
+        sys.exit(1 if failures else 0)
+
+    if args.query:
+        intent = parse_query(" ".join(args.query))
+        event_filters, location_filters, bind_vars = compile_event_filters(intent['filters'])
+        print(json.dumps(intent, indent=2))
+        print("\n".join(filter(None, [event_filters, location_filters])))
+        print(json.dumps(bind_vars))
+
+
+if __name__ == "__main__":
+    main()
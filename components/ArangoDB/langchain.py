@@ -1,15 +1,22 @@
 import argparse
-from arango import ArangoClient
 import pandas as pd
 import networkx as nx
-import matplotlib.pyplot as plt
-from langchain_community.chains.graph_qa.arangodb import ArangoGraphQAChain
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 import os
 import json
 import re
+import sys
 from functools import wraps
+from arango.exceptions import ArangoError, ArangoServerError
+from arango_pool import init_pool
+from compact_graph import CompactGraph
+from graph_render import export_layout, render_graph
+from layout_cache import get_layout_cache
+from nl_service import get_nl_service
+from query_builder import build_query
+from query_cache import cache_key, cached_query, get_cache
+from rollups import query_rollups
+from similarity_index import get_similarity_index
 
 # Load environment variables for API keys
 load_dotenv()
@@ -19,13 +26,12 @@ ARANGO_HOST = os.getenv("ARANGO_HOST", "http://localhost:8529")
 ARANGO_USERNAME = os.getenv("ARANGO_USERNAME", "root")
 ARANGO_PASSWORD = os.getenv("ARANGO_PASSWORD", "")
 ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
 def connect_to_arango():
     """Establish connection to ArangoDB and return the database object"""
     try:
-        client = ArangoClient(hosts=ARANGO_HOST)
-        db = client.db(ARANGO_DB, username=ARANGO_USERNAME, password=ARANGO_PASSWORD, verify=True)
+        pool = init_pool(hosts=ARANGO_HOST, username=ARANGO_USERNAME, password=ARANGO_PASSWORD)
+        db = pool.db(ARANGO_DB)
         print(f"Successfully connected to ArangoDB: {ARANGO_DB}")
         return db
     except Exception as e:
@@ -33,108 +39,134 @@ def connect_to_arango():
         return None
 
 def get_collections_info(db):
-    """Get information about all collections in the database"""
-    collections = {}
-    for collection in db.collections():
-        if not collection['name'].startswith('_'):
-            collections[collection['name']] = {
-                'type': collection['type'],
-                'count': db.collection(collection['name']).count()
-            }
-    return collections
+    """Get information about all collections in the database (cached until new data is loaded)"""
+    def collect():
+        collections = {}
+        for collection in db.collections():
+            if not collection['name'].startswith('_'):
+                collections[collection['name']] = {
+                    'type': collection['type'],
+                    'count': db.collection(collection['name']).count()
+                }
+        return collections
 
-def execute_aql_query(db, query, bind_vars=None):
-    """Execute an AQL query and return the results"""
-    try:
-        cursor = db.aql.execute(query, bind_vars=bind_vars)
-        results = [doc for doc in cursor]
-        return results
-    except Exception as e:
-        print(f"Error executing AQL query: {str(e)}")
-        return []
+    return get_cache().get_or_compute(cache_key(db.name, 'collections_info'), collect)
 
-def query_events(db, limit=10, filters=None):
-    """Query events with optional filters"""
-    bind_vars = {"@collection": "Events", "limit": limit}
-    filter_clause = ""
+class QueryError(Exception):
+    """An AQL query failed; a failed query is never reported as an empty result"""
+
+    def __init__(self, message, query=None, bind_vars=None):
+        super().__init__(message)
+        self.query = query
+        self.bind_vars = bind_vars
+
+class InvalidQueryError(QueryError):
+    """The server rejected the query text, its bind variables or a collection name"""
+
+class CursorExpiredError(QueryError):
+    """The server dropped the cursor (its ttl passed) before every batch was read"""
+
+class DatabaseUnavailableError(QueryError):
+    """The server could not be reached or is not serving requests"""
+
+# ArangoDB error numbers for parse errors, bind parameter errors and unknown collections
+INVALID_QUERY_ERRORS = {1203, 1501, 1502, 1550, 1551, 1552, 1553}
+CURSOR_NOT_FOUND = 1600
+
+# Default rows per cursor fetch for streamed queries
+QUERY_BATCH_SIZE = 1000
+
+def _query_error(error, query, bind_vars):
+    """Map a driver or network error to the matching QueryError subclass"""
+    if isinstance(error, ArangoServerError):
+        if error.error_code in INVALID_QUERY_ERRORS:
+            error_class = InvalidQueryError
+        elif error.error_code == CURSOR_NOT_FOUND:
+            error_class = CursorExpiredError
+        elif error.http_code == 503:
+            error_class = DatabaseUnavailableError
+        else:
+            error_class = QueryError
+    elif isinstance(error, OSError):
+        # requests' connection errors are OSErrors
+        error_class = DatabaseUnavailableError
+    else:
+        error_class = QueryError
+    return error_class(str(error), query, bind_vars)
+
+def iter_aql_query(db, query, bind_vars=None, batch_size=QUERY_BATCH_SIZE, ttl=None, stream=True):
+    """Execute a read-only AQL query and yield its rows one at a time
     
-    if filters:
-        filter_conditions = []
-        for key, value in filters.items():
-            if key in bind_vars:
-                # Avoid name collisions in bind variables
-                bind_key = f"{key}_{len(bind_vars)}"
-            else:
-                bind_key = key
-            bind_vars[bind_key] = value
-            filter_conditions.append(f"doc.{key} == @{bind_key}")
-        
-        if filter_conditions:
-            filter_clause = "FILTER " + " AND ".join(filter_conditions)
+    Rows arrive from the server `batch_size` at a time, so memory stays
+    bounded however large the result. With `stream=True` the server also
+    produces rows lazily instead of building the whole result first. `ttl`
+    is how long (seconds) the server keeps the cursor between fetches.
+    Abandoning the generator early releases the server-side cursor.
     
-    query = f"""
-    FOR doc IN @@collection
-    {filter_clause}
-    LIMIT @limit
-    RETURN doc
+    Raises a QueryError subclass if the query fails, including partway through.
     """
+    try:
+        cursor = db.aql.execute(query, bind_vars=bind_vars, batch_size=batch_size,
+                                ttl=ttl, stream=stream)
+    except (ArangoError, OSError) as e:
+        raise _query_error(e, query, bind_vars) from e
     
-    return execute_aql_query(db, query, bind_vars)
+    try:
+        while True:
+            try:
+                doc = next(cursor)
+            except StopIteration:
+                return
+            except (ArangoError, OSError) as e:
+                raise _query_error(e, query, bind_vars) from e
+            yield doc
+    finally:
+        try:
+            cursor.close(ignore_missing=True)
+        except (ArangoError, OSError):
+            # The query already finished or failed; nothing left to free
+            pass
 
-def query_actors(db, limit=10, filters=None):
-    """Query actors with optional filters"""
-    bind_vars = {"@collection": "Actors", "limit": limit}
-    filter_clause = ""
-    
-    if filters:
-        filter_conditions = []
-        for key, value in filters.items():
-            if key in bind_vars:
-                bind_key = f"{key}_{len(bind_vars)}"
-            else:
-                bind_key = key
-            bind_vars[bind_key] = value
-            filter_conditions.append(f"doc.{key} == @{bind_key}")
-        
-        if filter_conditions:
-            filter_clause = "FILTER " + " AND ".join(filter_conditions)
+def execute_aql_query(db, query, bind_vars=None, batch_size=None, use_cache=True):
+    """Execute a read-only AQL query and return the results as a list
     
-    query = f"""
-    FOR doc IN @@collection
-    {filter_clause}
-    LIMIT @limit
-    RETURN doc
+    Raises a QueryError subclass if the query fails. Use iter_aql_query
+    for results too large to hold in memory.
     """
-    
-    return execute_aql_query(db, query, bind_vars)
+    if use_cache:
+        try:
+            return cached_query(db, query, bind_vars, batch_size=batch_size)
+        except (ArangoError, OSError) as e:
+            raise _query_error(e, query, bind_vars) from e
+    return list(iter_aql_query(db, query, bind_vars, batch_size=batch_size, stream=False))
 
-def query_locations(db, limit=10, filters=None):
-    """Query locations with optional filters"""
-    bind_vars = {"@collection": "Locations", "limit": limit}
-    filter_clause = ""
+def query_documents(db, collection, limit=10, filters=None, fields=None, sort=None):
+    """Query a collection with validated filters, an optional projection and sort order.
     
-    if filters:
-        filter_conditions = []
-        for key, value in filters.items():
-            if key in bind_vars:
-                bind_key = f"{key}_{len(bind_vars)}"
-            else:
-                bind_key = key
-            bind_vars[bind_key] = value
-            filter_conditions.append(f"doc.{key} == @{bind_key}")
-        
-        if filter_conditions:
-            filter_clause = "FILTER " + " AND ".join(filter_conditions)
-    
-    query = f"""
-    FOR doc IN @@collection
-    {filter_clause}
-    LIMIT @limit
-    RETURN doc
+    See query_builder for the filter syntax (equality, ranges, IN, prefix, near).
+    Raises ValueError for unknown attributes or mistyped values.
     """
-    
+    query, bind_vars = build_query(collection, filters, fields=fields, sort=sort, limit=limit)
     return execute_aql_query(db, query, bind_vars)
 
+def iter_documents(db, collection, limit=10, filters=None, fields=None, sort=None,
+                   batch_size=QUERY_BATCH_SIZE, ttl=None):
+    """Like query_documents, but streams the rows instead of returning a list"""
+    query, bind_vars = build_query(collection, filters, fields=fields, sort=sort, limit=limit)
+    return iter_aql_query(db, query, bind_vars, batch_size=batch_size, ttl=ttl)
+
+def query_events(db, limit=10, filters=None, fields=None, sort=None):
+    """Query events with optional filters"""
+    return query_documents(db, "Events", limit, filters, fields, sort)
+
+def query_actors(db, limit=10, filters=None, fields=None, sort=None):
+    """Query actors with optional filters"""
+    return query_documents(db, "Actors", limit, filters, fields, sort)
+
+def query_locations(db, limit=10, filters=None, fields=None, sort=None):
+    """Query locations with optional filters"""
+    return query_documents(db, "Locations", limit, filters, fields, sort)
+
 def query_events_with_relations(db, event_id, limit=10):
     """Get an event and its related actors and locations"""
     query = """
@@ -165,137 +197,139 @@ def query_events_with_relations(db, event_id, limit=10):
     
     return execute_aql_query(db, query, {"event_id": event_id})
 
-def get_network_graph(db, event_limit=100):
-    """Create a NetworkX graph from ArangoDB data"""
+# Events plus their outbound edges and neighbor documents, in one traversal
+NETWORK_GRAPH_QUERY = """
+WITH Events, Actors, Locations, EventRelations
+FOR event IN Events
+    LIMIT @limit
+    LET relations = (
+        FOR target, edge IN 1..1 OUTBOUND event EventRelations
+            RETURN {to: edge._to, type: edge.type, target: target}
+    )
+    RETURN {event: event, relations: relations}
+"""
+
+# Rows per cursor fetch; a 10k-event graph arrives in a handful of round trips
+GRAPH_BATCH_SIZE = 2000
+
+def graph_from_network_rows(rows):
+    """Build a NetworkX graph from NETWORK_GRAPH_QUERY rows"""
     # Initialize a NetworkX Graph
     G = nx.Graph()
     
-    # Get a limited number of events
-    events = query_events(db, limit=event_limit)
-    
-    # Add event nodes
-    for event in events:
+    for row in rows:
+        event = row['event']
         G.add_node(event['_id'], type='event', **event)
-    
-    # Get relations for these events
-    event_ids = [event['_key'] for event in events]
-    relations_query = """
-    FOR event_id IN @event_ids
-        LET event_doc_id = CONCAT('Events/', event_id)
         
-        FOR edge IN EventRelations
-            FILTER edge._from == event_doc_id
-            LET target_node = DOCUMENT(edge._to)
+        for relation in row['relations']:
+            # Node type is the collection name (Actors, Locations)
+            target_type = relation['to'].split('/', 1)[0]
+            if not G.has_node(relation['to']):
+                # Dangling edges (target deleted) still get a bare node
+                target = relation['target'] or {}
+                G.add_node(relation['to'], **{**target, 'type': target_type})
             
-            RETURN {
-                from: edge._from,
-                to: edge._to,
-                type: edge.type,
-                target_type: PARSE_IDENTIFIER(edge._to).collection
-            }
-    """
-    
-    relations = execute_aql_query(db, relations_query, {"event_ids": event_ids})
-    
-    # Add related nodes and edges
-    for relation in relations:
-        # Add the target node if not already in the graph
-        if not G.has_node(relation['to']):
-            # Get the full node document
-            node_query = "RETURN DOCUMENT(@id)"
-            node_doc = execute_aql_query(db, node_query, {"id": relation['to']})
-            if node_doc:
-                G.add_node(relation['to'], type=relation['target_type'], **node_doc[0])
-            else:
-                # Fallback if can't get the complete document
-                G.add_node(relation['to'], type=relation['target_type'])
-        
-        # Add the edge
-        G.add_edge(relation['from'], relation['to'], type=relation['type'])
+            G.add_edge(event['_id'], relation['to'], type=relation['type'])
     
     return G
 
-def visualize_graph(G, output_file=None):
-    """Visualize a NetworkX graph"""
-    plt.figure(figsize=(12, 8))
-    
-    # Create node colors based on type
-    node_colors = []
-    for node in G.nodes():
-        node_type = G.nodes[node].get('type', '')
-        if node_type == 'event':
-            node_colors.append('red')
-        elif node_type == 'Actors':
-            node_colors.append('blue')
-        elif node_type == 'Locations':
-            node_colors.append('green')
-        else:
-            node_colors.append('gray')
-    
-    # Create a spring layout for the graph
-    pos = nx.spring_layout(G, seed=42)
-    
-    # Draw the network
-    nx.draw(G, pos, node_color=node_colors, with_labels=False, node_size=50, alpha=0.7)
+def get_network_graph(db, event_limit=100, compact=False):
+    """Create a NetworkX graph from ArangoDB data
     
-    # Draw a smaller set of node labels for readability
-    labels = {node: node.split('/')[-1] for node in list(G.nodes())[:20]}
-    nx.draw_networkx_labels(G, pos, labels=labels, font_size=8)
-    
-    # Add a legend
-    legend_elements = [
-        plt.Line2D([0], [0], marker='o', color='w', label='Event', markerfacecolor='red', markersize=10),
-        plt.Line2D([0], [0], marker='o', color='w', label='Actor', markerfacecolor='blue', markersize=10),
-        plt.Line2D([0], [0], marker='o', color='w', label='Location', markerfacecolor='green', markersize=10)
-    ]
-    plt.legend(handles=legend_elements)
-    
-    plt.title('GDELT Event Network')
-    
-    if output_file:
-        plt.savefig(output_file)
-        print(f"Graph visualization saved to {output_file}")
-    else:
-        plt.show()
+    With compact=True, returns a CompactGraph instead (see compact_graph.py),
+    which needs far less memory for large graphs.
+    """
+    rows = execute_aql_query(db, NETWORK_GRAPH_QUERY, {"limit": event_limit},
+                             batch_size=GRAPH_BATCH_SIZE)
+    if compact:
+        return CompactGraph.from_network_rows(rows)
+    return graph_from_network_rows(rows)
 
-def find_similar_events(db, event_id, limit=5):
-    """Find events similar to a given event"""
-    query = """
-    LET event = DOCUMENT(CONCAT('Events/', @event_id))
+def visualize_graph(G, output_file=None, layout="auto", layout_file=None, layout_cache=None):
+    """Visualize a NetworkX graph or CompactGraph
     
-    FOR e IN Events
-        FILTER e._id != event._id
-        LET similarity = (
-            (e.eventCode == event.eventCode ? 1 : 0) + 
-            (e.quadClass == event.quadClass ? 1 : 0) +
-            (ABS(e.goldsteinScale - event.goldsteinScale) < 1 ? 1 : 0) +
-            (ABS(e.avgTone - event.avgTone) < 5 ? 1 : 0)
-        )
-        SORT similarity DESC
-        LIMIT @limit
-        RETURN {
-            event: e,
-            similarity_score: similarity
-        }
+    Large graphs get the force layout from graph_render.py instead of
+    spring_layout. With an output file the figure is rendered off-screen;
+    without one it is shown. layout_file also saves the positions as JSON.
+    A LayoutCache (see layout_cache.py) reuses the previous run's positions.
     """
+    G = G if isinstance(G, CompactGraph) else CompactGraph.from_networkx(G)
+    pos = layout_cache.layout(G, layout) if layout_cache else None
+    pos = render_graph(G, output_file, layout=layout, pos=pos, figsize=(12, 8),
+                       colors={'event': 'red', 'Actors': 'blue', 'Locations': 'green'},
+                       show=not output_file)
+    if layout_file:
+        export_layout(G, pos, layout_file)
+
+SIMILAR_EVENTS_QUERY = """
+LET event = DOCUMENT(CONCAT('Events/', @event_id))
+
+FOR e IN Events
+    FILTER e._id != event._id
+    LET similarity = (
+        (e.eventCode == event.eventCode ? 1 : 0) + 
+        (e.quadClass == event.quadClass ? 1 : 0) +
+        (ABS(e.goldsteinScale - event.goldsteinScale) < 1 ? 1 : 0) +
+        (ABS(e.avgTone - event.avgTone) < 5 ? 1 : 0)
+    )
+    SORT similarity DESC
+    LIMIT @limit
+    RETURN {
+        event: e,
+        similarity_score: similarity
+    }
+"""
+
+def find_similar_events(db, event_id, limit=5, index=None):
+    """Find events similar to a given event
     
-    return execute_aql_query(db, query, {"event_id": event_id, "limit": limit})
+    Scored by the in-memory similarity index (see similarity_index.py) when
+    one has been built and holds every ingested event, otherwise by a full
+    scan in AQL. Both give the same scores.
+    """
+    if index is None:
+        index = get_similarity_index()
+    if index is None or not len(index) or not index.is_current(db):
+        return execute_aql_query(db, SIMILAR_EVENTS_QUERY, {"event_id": event_id, "limit": limit})
+
+    events = db.collection("Events")
+    if index.rows_for([event_id])[0] >= 0:
+        matches = index.similar(event_id, limit)
+    else:
+        # Loaded after the index was last updated
+        event = events.get(event_id)
+        if event is None:
+            return []
+        matches = index.similar_to([event], limit)[0]
+
+    documents = {doc["_key"]: doc for doc in events.get_many([key for key, _ in matches])}
+    return [
+        {"event": documents[key], "similarity_score": score}
+        for key, score in matches if key in documents
+    ]
 
 def get_event_time_distribution(db, timespan=30):
     """Get event distribution over time"""
-    query = """
-    FOR e IN Events
-        COLLECT day = e.date
-        WITH COUNT INTO count
-        SORT day
-        LIMIT @timespan
-        RETURN {
-            day: day,
-            count: count
-        }
-    """
-    
-    results = execute_aql_query(db, query, {"timespan": timespan})
+    # Daily counts are pre-aggregated at ingest (see rollups.py)
+    results = [
+        {"day": row["bucket"], "count": row["count"]}
+        for row in query_rollups(db, "event_day", "all", limit=timespan)
+    ]
+
+    if not results:
+        # Rollups not built yet (run rollups.py --rebuild); count from Events
+        query = """
+        FOR e IN Events
+            COLLECT day = e.date
+            WITH COUNT INTO count
+            SORT day
+            LIMIT @timespan
+            RETURN {
+                day: day,
+                count: count
+            }
+        """
+        results = execute_aql_query(db, query, {"timespan": timespan})
     
     # Convert to pandas DataFrame for easier manipulation
     if results:
@@ -303,44 +337,47 @@ def get_event_time_distribution(db, timespan=30):
         return df
     return pd.DataFrame()
 
-def natural_language_query(db, query_text):
-    """Use LangChain and ArangoGraphQAChain to process natural language queries"""
+def natural_language_query(db, query_text, service=None):
+    """Use LangChain and ArangoGraphQAChain to process natural language queries
+    
+    The schema, LLM and chain are built once per database and shared
+    between calls (see nl_service.py); pass `service` to use another one,
+    e.g. with a fake LLM.
+    """
     try:
-        # Check if OpenAI API key is set
-        if not OPENAI_API_KEY:
-            return {"error": "OpenAI API key not set. Please set the OPENAI_API_KEY environment variable."}
-        
-        llm = ChatOpenAI(temperature=0, model_name="gpt-4")
-        
-        # Create a Graph object for ArangoGraphQAChain
-        # Note: This is a simplified version, you may need to customize the graph schema
-        from langchain_community.graphs import ArangoGraph
-        arango_graph = ArangoGraph(db)
-        
-        # Create the chain
-        chain = ArangoGraphQAChain.from_llm(
-            llm=llm,
-            graph=arango_graph,
-            verbose=True,
-            allow_dangerous_requests=True
-        )
-        
-        # Execute the query
-        result = chain.invoke({"query": query_text})
-        return result
+        service = service or get_nl_service(db)
+        return service.query(query_text)
     except Exception as e:
         print(f"Error processing natural language query: {str(e)}")
         return {"error": str(e)}
 
+# CLI command -> (collection, label for each printed document)
+DOCUMENT_COMMANDS = {
+    'events': ('Events', 'Event'),
+    'actors': ('Actors', 'Actor'),
+    'locations': ('Locations', 'Location'),
+}
+
 def main():
     parser = argparse.ArgumentParser(description='GDELT Database Query Tool')
-    parser.add_argument('command', choices=['events', 'actors', 'locations', 'graph', 'nl-query'], 
+    parser.add_argument('command', choices=['events', 'actors', 'locations', 'similar', 'graph', 'nl-query'], 
                         help='Command to execute')
     parser.add_argument('--limit', type=int, default=10, help='Maximum number of results')
-    parser.add_argument('--filters', type=str, help='JSON string of filters, e.g., \'{"eventCode": 20}\' for events')
+    parser.add_argument('--filters', type=str, help='JSON string of filters, e.g., \'{"eventCode": 20}\' or \'{"goldsteinScale": {"gte": 5}}\' for events')
+    parser.add_argument('--fields', type=str, help='Comma-separated attributes to return, e.g. eventCode,goldsteinScale')
+    parser.add_argument('--sort', type=str, help='Comma-separated sort attributes; prefix with - for descending')
     parser.add_argument('--event-id', type=str, help='Event ID for relations or similar events')
     parser.add_argument('--output', type=str, help='Output file for graph visualization')
+    parser.add_argument('--layout', choices=['auto', 'spring', 'force', 'type'], default='auto',
+                        help='Graph layout; auto uses spring for small graphs and force beyond that')
+    parser.add_argument('--layout-json', type=str, help='Also save the graph layout as JSON for the frontend')
+    parser.add_argument('--layout-cache', type=str,
+                        help='Layout cache file; reuses positions from earlier runs (see layout_cache.py)')
     parser.add_argument('--query', type=str, help='Natural language query text')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='Print events/actors/locations as one JSON document per line')
+    parser.add_argument('--batch-size', type=int, default=QUERY_BATCH_SIZE,
+                        help='Rows fetched from the server per round trip')
     
     args = parser.parse_args()
     
@@ -359,42 +396,54 @@ def main():
             return
     
     # Execute the requested command
-    if args.command == 'events':
-        results = query_events(db, args.limit, filters)
-        print(f"\nEvents (limit: {args.limit}):")
-        for i, result in enumerate(results):
-            print(f"\n--- Event {i+1} ---")
-            print(json.dumps(result, indent=2))
-    
-    elif args.command == 'actors':
-        results = query_actors(db, args.limit, filters)
-        print(f"\nActors (limit: {args.limit}):")
-        for i, result in enumerate(results):
-            print(f"\n--- Actor {i+1} ---")
-            print(json.dumps(result, indent=2))
-    
-    elif args.command == 'locations':
-        results = query_locations(db, args.limit, filters)
-        print(f"\nLocations (limit: {args.limit}):")
-        for i, result in enumerate(results):
-            print(f"\n--- Location {i+1} ---")
-            print(json.dumps(result, indent=2))
-    
-    elif args.command == 'graph':
-        print("Generating graph visualization...")
-        G = get_network_graph(db, args.limit)
-        print(f"Graph created with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges")
-        visualize_graph(G, args.output)
-    
-    elif args.command == 'nl-query':
-        if not args.query:
-            print("Error: --query parameter is required for nl-query command")
-            return
+    try:
+        if args.command in DOCUMENT_COMMANDS:
+            collection, label = DOCUMENT_COMMANDS[args.command]
+            # Streamed, so a large --limit never holds the whole result in memory
+            results = iter_documents(db, collection, args.limit, filters, args.fields, args.sort,
+                                     batch_size=args.batch_size)
+            if args.ndjson:
+                for result in results:
+                    sys.stdout.write(json.dumps(result) + "\n")
+            else:
+                print(f"\n{collection} (limit: {args.limit}):")
+                for i, result in enumerate(results):
+                    print(f"\n--- {label} {i+1} ---")
+                    print(json.dumps(result, indent=2))
+    
+        elif args.command == 'similar':
+            if not args.event_id:
+                print("Error: --event-id parameter is required for similar command")
+                return
+            results = find_similar_events(db, args.event_id, args.limit)
+            print(f"\nEvents similar to {args.event_id} (limit: {args.limit}):")
+            for i, result in enumerate(results):
+                print(f"\n--- Score {result['similarity_score']} ---")
+                print(json.dumps(result['event'], indent=2))
+    
+        elif args.command == 'graph':
+            print("Generating graph visualization...")
+            G = get_network_graph(db, args.limit, compact=True)
+            print(f"Graph created with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges")
+            layout_cache = get_layout_cache(args.layout_cache) if args.layout_cache else None
+            visualize_graph(G, args.output, layout=args.layout, layout_file=args.layout_json,
+                            layout_cache=layout_cache)
+    
+        elif args.command == 'nl-query':
+            if not args.query:
+                print("Error: --query parameter is required for nl-query command")
+                return
         
-        print(f"Processing natural language query: {args.query}")
-        result = natural_language_query(db, args.query)
-        print("\nQuery Result:")
-        print(json.dumps(result, indent=2))
+            print(f"Processing natural language query: {args.query}")
+            result = natural_language_query(db, args.query)
+            print("\nQuery Result:")
+            print(json.dumps(result, indent=2))
+    except ValueError as e:
+        # Unknown attribute or mistyped filter value
+        print(f"Error: {str(e)}")
+    except QueryError as e:
+        print(f"Query failed ({type(e).__name__}): {str(e)}", file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
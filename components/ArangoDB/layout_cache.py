@@ -0,0 +1,215 @@
+"""Node positions kept between visualize_graph runs.
+
+Every 15-minute refresh extracts a subgraph that mostly overlaps the
+previous one, yet each run laid it out from scratch. LayoutCache keeps the
+last positions keyed by node `_id` in one .npz file and reuses them:
+
+    hit     the subgraph's fingerprint (its node IDs and edges) matches
+            the last run: the stored positions are returned as they are
+    warm    at least WARM_START_RATIO of the nodes have stored positions:
+            those stay where they were; new nodes start next to their
+            placed neighbors and a short warm start
+            (graph_render.WARM_ITERATIONS) moves only them
+    full    otherwise a full layout is computed
+
+Positions of nodes that drop out of the subgraph are kept, up to
+MAX_CACHED_NODES, so events that come back land where they were.
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from compact_graph import CompactGraph
+from graph_render import compute_layout, resolve_layout
+
+LAYOUT_CACHE_PATH = os.getenv("LAYOUT_CACHE_PATH", "layout_cache.npz")
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+# Share of nodes that need stored positions for a warm start
+WARM_START_RATIO = 0.5
+MAX_CACHED_NODES = 500000
+# Rounds of placing new nodes at the mean of their already placed neighbors
+SEED_ROUNDS = 3
+
+
+def subgraph_fingerprint(G, layout):
+    """Hash of the layout name and a CompactGraph's node IDs and edges, independent of their order"""
+    ids = G.nodes["_id"].to_numpy(dtype=object)
+    source = ids[G.edges["source"].to_numpy()].astype(str)
+    target = ids[G.edges["target"].to_numpy()].astype(str)
+    low, high = np.where(source < target, source, target), np.where(source < target, target, source)
+    pairs = np.char.add(np.char.add(low, "|"), high)
+    digest = hashlib.sha1(layout.encode())
+    for values in (np.sort(ids.astype(str)), np.sort(pairs)):
+        digest.update("\n".join(values).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def seed_positions(G, pos, seed=42):
+    """Fill the NaN rows of `pos` (n x 2): next to placed neighbors, else at random"""
+    pos = np.array(pos, dtype=float)
+    count = len(pos)
+    source = G.edges["source"].to_numpy()
+    target = G.edges["target"].to_numpy()
+    rng = np.random.default_rng(seed)
+    jitter = 0.5 / np.sqrt(max(count, 1))
+    for _ in range(SEED_ROUNDS):
+        placed = ~np.isnan(pos[:, 0])
+        if placed.all():
+            break
+        # Each edge end with a position pulls the other end
+        ends = np.concatenate([source[placed[target]], target[placed[source]]])
+        others = np.concatenate([target[placed[target]], source[placed[source]]])
+        neighbors = np.bincount(ends, minlength=count)
+        ready = (neighbors > 0) & ~placed
+        if not ready.any():
+            break
+        for axis in (0, 1):
+            sums = np.bincount(ends, weights=pos[others, axis], minlength=count)
+            pos[ready, axis] = sums[ready] / neighbors[ready]
+        pos[ready] += rng.uniform(-jitter, jitter, size=(int(ready.sum()), 2))
+    missing = np.isnan(pos[:, 0])
+    pos[missing] = rng.uniform(0, 1, size=(int(missing.sum()), 2))
+    return pos
+
+
+class LayoutCache:
+    """Node positions by `_id`, persisted to one .npz file"""
+
+    def __init__(self, path=LAYOUT_CACHE_PATH, max_nodes=MAX_CACHED_NODES):
+        self.path = path
+        self.max_nodes = max_nodes
+        self.ids = np.zeros(0, dtype=object)
+        self.positions = np.zeros((0, 2))
+        self.layout_name = None
+        self.fingerprint = None
+        # What the last layout() call did: mode, reused and new node counts, seconds
+        self.last = None
+        self._index = None
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            self.ids = data["ids"].astype(object)
+            self.positions = data["positions"].astype(float)
+            self.layout_name = str(data["layout"])
+            self.fingerprint = str(data["fingerprint"])
+        self._index = None
+
+    def save(self):
+        """Write the cache; the file is replaced atomically"""
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".layout_cache_", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, ids=self.ids.astype(str), positions=self.positions.astype(np.float32),
+                     layout=self.layout_name or "", fingerprint=self.fingerprint or "")
+        os.replace(tmp_path, self.path)
+
+    def positions_for(self, node_ids):
+        """Stored position of each `_id`, NaN for unknown nodes"""
+        if self._index is None:
+            self._index = pd.Index(self.ids)
+        rows = self._index.get_indexer(pd.Index(node_ids, dtype=object))
+        pos = np.full((len(rows), 2), np.nan)
+        known = rows >= 0
+        pos[known] = self.positions[rows[known]]
+        return pos
+
+    def update(self, node_ids, pos, layout, fingerprint):
+        """Store positions for `node_ids`, keeping other nodes' positions up to max_nodes"""
+        node_ids = np.asarray(node_ids, dtype=object)
+        keep = ~pd.Index(self.ids).isin(node_ids) if self.layout_name == layout else np.zeros(len(self.ids), bool)
+        self.ids = np.concatenate([node_ids, self.ids[keep]])[:self.max_nodes]
+        self.positions = np.concatenate([pos, self.positions[keep]])[:self.max_nodes]
+        self.layout_name = layout
+        self.fingerprint = fingerprint
+        self._index = None
+
+    def layout(self, G, layout="auto", save=True):
+        """Positions for G (rows in node order), reusing stored ones where possible"""
+        G = G if isinstance(G, CompactGraph) else CompactGraph.from_networkx(G)
+        started = time.perf_counter()
+        layout = resolve_layout(G, layout)
+        ids = G.nodes["_id"].to_numpy(dtype=object)
+        fingerprint = subgraph_fingerprint(G, layout)
+
+        with self._lock:
+            stored = self.positions_for(ids) if self.layout_name == layout else np.full((len(ids), 2), np.nan)
+            known = int((~np.isnan(stored[:, 0])).sum())
+            if fingerprint == self.fingerprint and known == len(ids):
+                self.last = {"mode": "hit", "reused": known, "new": 0,
+                             "seconds": time.perf_counter() - started}
+                return stored
+
+        # type_layout is cheap and deterministic, so it is never warm-started
+        if layout != "type" and ids.size and known >= WARM_START_RATIO * len(ids):
+            mode = "warm"
+            pos = compute_layout(G, layout, pos=seed_positions(G, stored), fixed=~np.isnan(stored[:, 0]))
+        else:
+            mode = "full"
+            pos = compute_layout(G, layout)
+
+        with self._lock:
+            self.update(ids, pos, layout, fingerprint)
+            if save:
+                self.save()
+            reused = known if mode == "warm" else 0
+            self.last = {"mode": mode, "reused": reused, "new": len(ids) - reused,
+                         "seconds": time.perf_counter() - started}
+        return pos
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_layout_cache(path=LAYOUT_CACHE_PATH):
+    """The process-wide LayoutCache for `path`"""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LayoutCache(path)
+        return _caches[path]
+
+
+def main():
+    from arango_pool import get_db
+    from graph_render import export_layout, render_graph
+    from sampling import sample_event_keys
+    from subgraph import extract_subgraph
+
+    parser = argparse.ArgumentParser(description='Lay out a sampled subgraph, reusing cached positions')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--events', type=int, default=75, help='Events to sample')
+    parser.add_argument('--layout', choices=['auto', 'spring', 'force', 'type'], default='auto')
+    parser.add_argument('--path', default=LAYOUT_CACHE_PATH, help='Layout cache file')
+    parser.add_argument('--output', help='Also render the graph to this image')
+    parser.add_argument('--json', metavar='FILE', help='Also write the layout as JSON')
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    G = CompactGraph.from_subgraph(extract_subgraph(db, sample_event_keys(db, args.events)))
+    cache = get_layout_cache(args.path)
+    pos = cache.layout(G, args.layout)
+    last = cache.last
+    print(f"{last['mode']} layout of {G.number_of_nodes()} nodes ({last['reused']} reused, "
+          f"{last['new']} new) in {last['seconds']:.2f}s; {len(cache)} positions cached")
+    if args.json:
+        export_layout(G, pos, args.json)
+    if args.output:
+        render_graph(G, args.output, pos=pos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Cache of natural-language questions and the AQL generated for them.
+
+Analysts ask the same questions again and again, and each one paid a full
+LLM round trip through ArangoGraphQAChain. NLQueryCache maps a question to
+the AQL the chain generated and ran for it. A hit runs that AQL directly
+and skips the LLM.
+
+    exact       the normalized question (lower case, no punctuation or
+                filler words) was asked before
+    semantic    with an embeddings model, the closest stored question by
+                cosine similarity, if at least SIMILARITY_THRESHOLD. Both
+                questions must contain the same numbers, countries and
+                event types (see question_entities), because "above 5"
+                and "above 6", or "in the us" and "in the uk", embed
+                almost identically but need different AQL.
+
+Only validated AQL is stored: the chain executed it, it has no
+data-modification keyword and db.aql.validate() parses it. Every entry
+records the schema fingerprint it was generated against (see
+nl_service.schema_fingerprint) and is dropped once the schema changes.
+New data does not invalidate entries; the AQL reads current data each
+time. Entries are kept in one JSON file that survives restarts; it is
+rewritten at most once per SAVE_DELAY seconds, not on every store.
+"""
+import atexit
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from intent_parser import countries_in, event_types
+
+NL_CACHE_PATH = os.getenv("NL_CACHE_PATH", "nl_cache.json")
+NL_CACHE_MAX_ENTRIES = int(os.getenv("NL_CACHE_MAX_ENTRIES", "1000"))
+SIMILARITY_THRESHOLD = float(os.getenv("NL_CACHE_SIMILARITY", "0.95"))
+# OpenAI embedding model for semantic matches; unset means exact matches only
+NL_CACHE_EMBEDDINGS = os.getenv("NL_CACHE_EMBEDDINGS", "")
+# Seconds a store waits for others before the file is rewritten
+SAVE_DELAY = float(os.getenv("NL_CACHE_SAVE_DELAY", "5"))
+
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "me", "show", "list", "find", "give", "get", "please", "all",
+    "what", "which", "are", "is", "there", "any", "of", "can", "you",
+})
+NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# Generated AQL must only read
+WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|REPLACE|REMOVE|UPSERT)\b", re.IGNORECASE)
+
+
+def normalize_question(question):
+    """Lower case, punctuation and filler words removed, numbers kept (with their sign)"""
+    words = re.findall(r"-?\d+(?:\.\d+)?|[a-z]+", question.lower())
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+def question_entities(normalized):
+    """What a semantic match must share with the question: its numbers,
+    country codes and event types (see intent_parser)"""
+    return [
+        NUMBER.findall(normalized),
+        sorted(countries_in(normalized)),
+        sorted(kind for kind, present in event_types(normalized).items() if present),
+    ]
+
+
+def is_read_only(aql):
+    return not WRITE_KEYWORDS.search(aql)
+
+
+class NLQueryCache:
+    """Normalized question -> validated AQL, optionally matched by embedding"""
+
+    def __init__(self, path=NL_CACHE_PATH, embeddings=None, threshold=SIMILARITY_THRESHOLD,
+                 max_entries=NL_CACHE_MAX_ENTRIES, save_delay=SAVE_DELAY):
+        """`embeddings` is any object with embed_query(text) -> list of floats
+        (a LangChain Embeddings model); without it only exact matches hit."""
+        self.path = path
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.save_delay = save_delay
+        self._entries = OrderedDict()   # normalized question -> entry dict
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._stats = {"lookups": 0, "hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0,
+                       "rejected": 0, "invalidated": 0, "evictions": 0,
+                       "seconds_saved": 0.0, "hit_seconds": 0.0}
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Persistence
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except ValueError:
+            return
+        for entry in entries:
+            self._entries[entry["question"]] = entry
+
+    def save(self):
+        """Write every entry to `path`; the file is replaced atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            self._save_timer = None
+            entries = list(self._entries.values())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".nl_cache_")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def _schedule_save(self):
+        """Save after save_delay seconds, once for every store in between"""
+        if not self.path:
+            return
+        if self.save_delay <= 0:
+            self.save()
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write a pending save now"""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    # Lookup
+
+    def _semantic_match(self, vector, entities, fingerprint):
+        """Closest entry for the same schema and entities, and its similarity"""
+        candidates = [entry for entry in self._entries.values()
+                      if entry.get("embedding") and entry["schema"] == fingerprint
+                      and (entry.get("entities") or question_entities(entry["question"])) == entities]
+        if not candidates:
+            return None, 0.0
+        matrix = np.array([entry["embedding"] for entry in candidates], dtype=float)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+        scores = matrix @ vector / np.where(norms > 0, norms, 1)
+        best = int(np.argmax(scores))
+        return candidates[best], float(scores[best])
+
+    def _invalidate(self, fingerprint):
+        # Entries generated against another schema may reference what no longer exists
+        stale = [key for key, entry in self._entries.items() if entry["schema"] != fingerprint]
+        for key in stale:
+            del self._entries[key]
+        self._stats["invalidated"] += len(stale)
+
+    def lookup(self, question, fingerprint):
+        """The cached entry for `question` under schema `fingerprint`, or None.
+
+        The entry carries its "aql" and "match" ("exact" or "semantic").
+        """
+        normalized = normalize_question(question)
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._invalidate(fingerprint)
+            entry = self._entries.get(normalized)
+        match = "exact"
+        if entry is None and self.embeddings is not None:
+            # Embedding may be a network call; do it outside the lock
+            vector = np.asarray(self.embeddings.embed_query(normalized), dtype=float)
+            with self._lock:
+                entry, similarity = self._semantic_match(vector, question_entities(normalized), fingerprint)
+            match = "semantic"
+            if similarity < self.threshold:
+                entry = None
+
+        with self._lock:
+            if entry is None or entry["question"] not in self._entries:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(entry["question"])
+            entry["hits"] = entry.get("hits", 0) + 1
+            self._stats["semantic_hits" if match == "semantic" else "hits"] += 1
+            return {**entry, "match": match}
+
+    def record_hit(self, entry, seconds):
+        """Count the time a hit took against the LLM time it saved"""
+        with self._lock:
+            self._stats["hit_seconds"] += seconds
+            self._stats["seconds_saved"] += max(entry["llm_seconds"] - seconds, 0.0)
+
+    def discard(self, question):
+        """Drop the entry a lookup returned, e.g. because its AQL failed"""
+        with self._lock:
+            self._entries.pop(question, None)
+
+    # Storing
+
+    def store(self, question, aql, fingerprint, llm_seconds, db=None):
+        """Cache the AQL the chain generated and ran for `question`; False if it was rejected.
+
+        With `db`, the AQL must also pass db.aql.validate().
+        """
+        aql = aql.strip()
+        valid = bool(aql) and is_read_only(aql)
+        if valid and db is not None:
+            try:
+                db.aql.validate(aql)
+            except Exception:
+                valid = False
+        if not valid:
+            with self._lock:
+                self._stats["rejected"] += 1
+            return False
+
+        normalized = normalize_question(question)
+        entry = {
+            "question": normalized,
+            "entities": question_entities(normalized),
+            "aql": aql,
+            "schema": fingerprint,
+            "llm_seconds": round(llm_seconds, 4),
+            "created": time.time(),
+            "hits": 0,
+        }
+        if self.embeddings is not None:
+            entry["embedding"] = [float(x) for x in self.embeddings.embed_query(normalized)]
+        with self._lock:
+            self._entries[normalized] = entry
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._stats["stores"] += 1
+        self._schedule_save()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._schedule_save()
+
+    def stats(self):
+        """Return a JSON-serializable summary: hit rate and LLM time saved"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        hits = stats["hits"] + stats["semantic_hits"]
+        stats["hit_rate"] = round(hits / stats["lookups"], 4) if stats["lookups"] else None
+        stats["avg_hit_ms"] = round(1000 * stats["hit_seconds"] / hits, 2) if hits else None
+        stats["seconds_saved"] = round(stats["seconds_saved"], 3)
+        stats["hit_seconds"] = round(stats["hit_seconds"], 3)
+        stats.update(path=self.path, semantic=self.embeddings is not None, threshold=self.threshold)
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def default_embeddings():
+    """OpenAIEmbeddings with NL_CACHE_EMBEDDINGS, or None when that is unset"""
+    if not NL_CACHE_EMBEDDINGS:
+        return None
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model=NL_CACHE_EMBEDDINGS)
+
+
+def get_nl_cache():
+    """Return the process-wide question cache, created with the environment settings"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = NLQueryCache(embeddings=default_embeddings())
+            # Write stores still waiting for their delayed save
+            atexit.register(_cache.flush)
+    return _cache
@@ -0,0 +1,252 @@
+"""Long-lived natural-language query service around ArangoGraphQAChain.
+
+natural_language_query used to build a ChatOpenAI client, an ArangoGraph
+and an ArangoGraphQAChain on every call. Building the ArangoGraph alone
+introspects and samples every collection. NLQueryService builds all three
+once and shares them between requests:
+
+    schema      generated once. It is regenerated only when the schema
+                fingerprint changes: the non-system collections with their
+                types and whether they are empty (the only things
+                ArangoGraph.generate_schema depends on besides the sampled
+                document), plus the named graphs. The fingerprint is checked
+                at most every SCHEMA_CHECK_INTERVAL seconds.
+    chain       one ArangoGraphQAChain; it reads the schema from the shared
+                ArangoGraph, so a refresh needs no new chain
+    llm         any LangChain language model. ChatOpenAI (NL_MODEL) is the
+                default; tests can pass langchain_core's FakeListLLM and
+                run without a network or API key
+
+With a cache (see nl_cache.py), a question asked before runs its stored
+AQL directly and skips the LLM.
+
+Queries may run concurrently; at most NL_MAX_CONCURRENCY run against the
+LLM at once. LangChain is imported lazily, so importing this module (as
+runQuery does) does not require it.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from nl_cache import get_nl_cache
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+NL_MODEL = os.getenv("NL_MODEL", "gpt-4")
+NL_MAX_CONCURRENCY = int(os.getenv("NL_MAX_CONCURRENCY", "4"))
+SCHEMA_CHECK_INTERVAL = float(os.getenv("NL_SCHEMA_CHECK_INTERVAL", "60"))
+
+# Results the chain passes to the LLM; ArangoGraphQAChain's own default
+TOP_K = 10
+
+
+def default_llm():
+    """ChatOpenAI with NL_MODEL; raises ValueError without an API key"""
+    # Read when called, after langchain.py has loaded .env
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("OpenAI API key not set. Please set the OPENAI_API_KEY environment variable.")
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(temperature=0, model_name=NL_MODEL)
+
+
+def shared_schema_graph(db):
+    """An ArangoGraph over `db` that leaves generating its schema to the caller.
+
+    ArangoGraph(db) generates the schema twice, since set_db() and __init__
+    both call set_schema() without one. This subclass keeps an empty schema
+    for those calls; NLQueryService then generates it once and passes it
+    to set_schema().
+    """
+    from langchain_community.graphs import ArangoGraph
+
+    class SharedSchemaGraph(ArangoGraph):
+        def set_schema(self, schema=None):
+            super().set_schema({"Graph Schema": [], "Collection Schema": []} if schema is None else schema)
+
+    return SharedSchemaGraph(db)
+
+
+def schema_fingerprint(db):
+    """What the generated schema depends on, apart from the sampled documents"""
+    collections = sorted(
+        (collection["name"], collection["type"], db.collection(collection["name"]).count() > 0)
+        for collection in db.collections()
+        if not collection["system"]
+    )
+    graphs = sorted(graph["name"] for graph in db.graphs())
+    return json.dumps([collections, graphs])
+
+
+class NLQueryService:
+    """One schema, LLM and chain shared by every natural-language query on a database"""
+
+    def __init__(self, db, llm=None, max_concurrency=NL_MAX_CONCURRENCY,
+                 schema_check_interval=SCHEMA_CHECK_INTERVAL, verbose=False, cache=None, **chain_options):
+        """`llm` defaults to default_llm(); `cache` is an NLQueryCache or None;
+        `chain_options` go to ArangoGraphQAChain.from_llm"""
+        self.db = db
+        self.llm = llm
+        self.cache = cache
+        self.verbose = verbose
+        self.schema_check_interval = schema_check_interval
+        self.chain_options = {"top_k": TOP_K, "return_aql_query": True, "return_aql_result": True,
+                              **chain_options}
+        self._graph = None
+        self._chain = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats = {"queries": 0, "errors": 0, "schema_builds": 0, "schema_seconds": 0.0,
+                       "query_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    # Schema and chain
+
+    def _build_schema(self):
+        started = time.perf_counter()
+        if self._graph is None:
+            self._graph = shared_schema_graph(self.db)
+        self._graph.set_schema(self._graph.generate_schema())
+        with self._stats_lock:
+            self._stats["schema_builds"] += 1
+            self._stats["schema_seconds"] += time.perf_counter() - started
+
+    def refresh_schema(self, force=False):
+        """Regenerate the schema if the collections changed (or `force`); True if it was"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._graph is not None and now - self._checked_at < self.schema_check_interval:
+                return False
+            fingerprint = schema_fingerprint(self.db)
+            self._checked_at = now
+            if not force and self._graph is not None and fingerprint == self._fingerprint:
+                return False
+            self._build_schema()
+            self._fingerprint = fingerprint
+            return True
+
+    @property
+    def fingerprint(self):
+        """Fingerprint of the current schema (see schema_fingerprint)"""
+        self.refresh_schema()
+        return self._fingerprint
+
+    @property
+    def schema(self):
+        self.refresh_schema()
+        return self._graph.schema
+
+    @property
+    def chain(self):
+        """The shared ArangoGraphQAChain, built on first use"""
+        self.refresh_schema()
+        with self._lock:
+            if self._chain is None:
+                from langchain_community.chains.graph_qa.arangodb import ArangoGraphQAChain
+
+                if self.llm is None:
+                    self.llm = default_llm()
+                self._chain = ArangoGraphQAChain.from_llm(
+                    llm=self.llm,
+                    graph=self._graph,
+                    verbose=self.verbose,
+                    allow_dangerous_requests=True,
+                    **self.chain_options,
+                )
+            return self._chain
+
+    # Queries
+
+    def _cached_query(self, query_text):
+        """Run the cached AQL for a question asked before; None on a miss"""
+        entry = self.cache.lookup(query_text, self.fingerprint)
+        if entry is None:
+            return None
+        started = time.perf_counter()
+        try:
+            rows = self._graph.query(entry["aql"], self.chain_options["top_k"])
+        except Exception:
+            # Stored AQL that no longer runs is regenerated by the LLM
+            self.cache.discard(entry["question"])
+            return None
+        self.cache.record_hit(entry, time.perf_counter() - started)
+        # No LLM call, so there is no text answer; a stored one could
+        # describe rows that have changed since
+        return {"query": query_text, "result": None, "aql_query": entry["aql"], "aql_result": rows,
+                "cached": True, "match": entry["match"]}
+
+    def query(self, query_text):
+        """Answer a question.
+
+        Returns the same fields whether or not the cache answered it:
+        "result" (the LLM's text answer, None on a cache hit), "aql_query",
+        "aql_result" (the rows) and "cached", plus "match" ("exact" or
+        "semantic") on a hit.
+        """
+        if self.cache is not None:
+            result = self._cached_query(query_text)
+            if result is not None:
+                return result
+        chain = self.chain
+        started = time.perf_counter()
+        try:
+            with self._slots:
+                result = chain.invoke({"query": query_text})
+        except Exception:
+            with self._stats_lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            with self._stats_lock:
+                self._stats["queries"] += 1
+                self._stats["query_seconds"] += seconds
+        if self.cache is not None and result.get("aql_query"):
+            self.cache.store(query_text, result["aql_query"], self._fingerprint, seconds, db=self.db)
+        return {**result, "cached": False}
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["schema_collections"] = len(self._graph.schema["Collection Schema"]) if self._graph else 0
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_nl_service(db, llm=None):
+    """The process-wide NLQueryService for `db`'s database, using the shared question cache.
+
+    `llm` is only used when the service is first created.
+    """
+    with _services_lock:
+        if db.name not in _services:
+            _services[db.name] = NLQueryService(db, llm=llm, cache=get_nl_cache())
+        return _services[db.name]
+
+
+def main():
+    from arango_pool import get_db
+
+    parser = argparse.ArgumentParser(description='Answer natural-language questions about the GDELT graph')
+    parser.add_argument('questions', nargs='*', help='Questions to answer in turn')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--schema', action='store_true', help='Print the cached schema')
+    args = parser.parse_args()
+
+    service = get_nl_service(get_db(args.db))
+    if args.schema:
+        print(json.dumps(service.schema, indent=2, default=str))
+    for question in args.questions:
+        print(json.dumps(service.query(question), indent=2, default=str))
+    print(json.dumps(service.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
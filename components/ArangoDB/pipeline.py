@@ -0,0 +1,217 @@
+import argparse
+import io
+import os
+import queue
+import threading
+import time
+import zipfile
+from datetime import datetime
+from arango_pool import get_db
+from backfill import GDELT_BASE_URL, Manifest, MissingFile, source_from_arg
+from bulk_loader import ARANGO_DB, BATCH_SIZE, _merge_stats, frame_to_documents, write_documents
+from Clean_CSV import DEFAULT_MAX_MEMORY_MB, CleanedWriter, iter_gdelt_chunks
+from indexes import ensure_collections
+from query_cache import bump_ingest_epoch
+from rollups import apply_rollups, combine_totals, export_batch_id, rollup_totals
+from similarity_index import SIMILARITY_INDEX_DIR, open_for_ingest
+
+# Parsed chunks allowed to wait for the database before parsing pauses
+QUEUE_CHUNKS = 2
+UPDATE_MINUTES = 15
+
+_DONE = object()
+
+
+class _Failed:
+    """Carries an exception from the parse thread to the load loop"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _put(chunks, item, stop):
+    # Blocks while the queue is full (backpressure), but gives up once the loader has stopped
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _parse_stage(stream, chunks, stop, chunk_rows, engine, max_memory_mb, writer):
+    """Parse the CSV stream into graph documents and hand them to the load loop"""
+    try:
+        for df, rejected in iter_gdelt_chunks(stream, chunk_rows=chunk_rows, engine=engine,
+                                              max_memory_mb=max_memory_mb):
+            if writer is not None and len(df):
+                writer.write(df)
+            item = (len(df), rejected, frame_to_documents(df), rollup_totals(df))
+            if not _put(chunks, item, stop):
+                return
+        _put(chunks, _DONE, stop)
+    except Exception as e:
+        _put(chunks, _Failed(e), stop)
+
+
+def run_pipeline(name, source, db, archive_dir=None, archive_format='csv', chunk_rows=None,
+                 batch_size=BATCH_SIZE, engine='auto', max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                 queue_chunks=QUEUE_CHUNKS, similarity_index=None):
+    """Download, unzip, clean and load one export file in a single pass.
+
+    The zip is held in memory and its CSV member is parsed straight from the
+    decompression stream. A parse thread turns each chunk into documents
+    while this thread writes the previous chunk to the database. At most
+    `queue_chunks` parsed chunks wait for the database; beyond that parsing
+    pauses. Nothing touches disk unless `archive_dir` is given, in which
+    case the downloaded zip and the cleaned rows are kept there.
+
+    `source` is anything with read(name) -> bytes (see backfill.py) and `db`
+    anything with collection(name).import_bulk(...) and aql.execute(...)
+    (for the rollups, see rollups.py). With `similarity_index` (see
+    similarity_index.open_for_ingest), the loaded events are appended to it
+    and it is saved once the file is in. Returns a summary dict.
+    """
+    started = time.perf_counter()
+    payload = source.read(name)
+    summary = {'file': name, 'rows': 0, 'rejected': 0, 'chunks': 0, 'collections': {}, 'archived': []}
+
+    writer = None
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+        zip_path = os.path.join(archive_dir, name)
+        with open(zip_path + '.part', 'wb') as f:
+            f.write(payload)
+        os.replace(zip_path + '.part', zip_path)
+        summary['archived'].append(zip_path)
+        writer = CleanedWriter(os.path.join(archive_dir, f"cleaned_{name[:-len('.zip')]}"), archive_format)
+
+    chunks = queue.Queue(maxsize=queue_chunks)
+    stop = threading.Event()
+    rollups = []
+
+    with zipfile.ZipFile(io.BytesIO(payload)) as zip_ref, \
+            zip_ref.open(zip_ref.namelist()[0]) as stream:
+        parser = threading.Thread(
+            target=_parse_stage,
+            args=(stream, chunks, stop, chunk_rows, engine, max_memory_mb, writer),
+            daemon=True,
+        )
+        parser.start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failed):
+                    raise item.error
+                rows, rejected, documents, totals = item
+                _merge_stats(summary['collections'], write_documents(db, documents, batch_size=batch_size))
+                rollups.append(totals)
+                if similarity_index is not None:
+                    similarity_index.append_documents(documents['Events'])
+                summary['chunks'] += 1
+                summary['rows'] += rows
+                summary['rejected'] += rejected
+        except BaseException:
+            stop.set()
+            parser.join()
+            if writer is not None:
+                writer.abort()
+            raise
+        parser.join()
+
+    if writer is not None:
+        summary['archived'].extend(writer.close())
+    # Once every event is written, and once per file however often it is rerun
+    apply_rollups(db, combine_totals(rollups), export_batch_id(name))
+    # Cached read results are stale now
+    epoch = bump_ingest_epoch(db)
+    if similarity_index is not None:
+        similarity_index.epoch = epoch
+        similarity_index.save(SIMILARITY_INDEX_DIR)
+
+    elapsed = time.perf_counter() - started
+    summary['seconds'] = round(elapsed, 3)
+    summary['rows_per_sec'] = round(summary['rows'] / elapsed, 1) if elapsed else 0.0
+    print(f"[{datetime.now()}] {name}: {summary['rows']} rows loaded in {elapsed:.2f}s "
+          f"({summary['rows_per_sec']:.0f} rows/sec, {summary['rejected']} rejected)")
+    return summary
+
+
+def run_files(names, source, db, manifest=None, **options):
+    """Run the pipeline for each file, skipping files the manifest has settled"""
+    summaries = []
+    for name in names:
+        if manifest is not None and manifest.is_settled(name):
+            print(f"{name} already loaded, skipping")
+            continue
+        try:
+            summary = run_pipeline(name, source, db, **options)
+            entry = {'status': 'done', 'rows': summary['rows'], 'rejected': summary['rejected']}
+            summaries.append(summary)
+        except MissingFile:
+            entry = {'status': 'missing'}
+        except Exception as e:
+            print(f"Error loading {name}: {str(e)}")
+            entry = {'status': 'failed', 'error': str(e)}
+        if manifest is not None:
+            entry['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            manifest.record(name, entry)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Download, clean and load GDELT export files in one pass')
+    parser.add_argument('names', nargs='*', help='Export zip names, e.g. 20250301000000.export.CSV.zip')
+    parser.add_argument('--latest', action='store_true', help='Load the newest export file')
+    parser.add_argument('--every', type=int, nargs='?', const=UPDATE_MINUTES,
+                        help=f'With --latest, keep running and check every N minutes (default {UPDATE_MINUTES})')
+    parser.add_argument('--source', default=GDELT_BASE_URL, help='Base URL or local directory of export zips')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--archive', metavar='DIR', help='Also keep the zip and the cleaned rows in DIR')
+    parser.add_argument('--archive-format', choices=['csv', 'parquet', 'both'], default='csv',
+                        help='Format of archived cleaned rows')
+    parser.add_argument('--manifest', help='Manifest of loaded files, so reruns skip them')
+    parser.add_argument('--engine', choices=['auto', 'pyarrow', 'c'], default='auto', help='CSV parser')
+    parser.add_argument('--max-memory-mb', type=int, default=DEFAULT_MAX_MEMORY_MB,
+                        help='Memory budget that sets the chunk size')
+    parser.add_argument('--chunk-rows', type=int, help='Rows per chunk (overrides --max-memory-mb)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Documents per import request')
+    parser.add_argument('--queue-chunks', type=int, default=QUEUE_CHUNKS,
+                        help='Parsed chunks that may wait for the database')
+    args = parser.parse_args()
+    if not args.names and not args.latest:
+        parser.error('give export file names or --latest')
+
+    source = source_from_arg(args.source)
+    db = get_db(args.db)
+    ensure_collections(db)
+    manifest = Manifest(args.manifest) if args.manifest else None
+    options = dict(archive_dir=args.archive, archive_format=args.archive_format,
+                   chunk_rows=args.chunk_rows, batch_size=args.batch_size, engine=args.engine,
+                   max_memory_mb=args.max_memory_mb, queue_chunks=args.queue_chunks,
+                   similarity_index=open_for_ingest())
+
+    run_files(args.names, source, db, manifest, **options)
+    if not args.latest:
+        return
+
+    # Without a manifest, remember the last file loaded so the loop does not reload it
+    last_loaded = None
+    while True:
+        try:
+            name = source.latest()
+            if name != last_loaded:
+                run_files([name], source, db, manifest, **options)
+                last_loaded = name
+        except Exception as e:
+            print(f"Error in GDELT update check: {str(e)}")
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Typed AQL builder for filtered, projected, sorted document queries.
+
+Attribute names are checked against SCHEMA before they reach the query
+text. Values always travel as bind variables. The query text depends
+only on the query's shape (collection, predicate fields and operators,
+projection, sort), so it is compiled once per shape and reused. Because
+the text is identical every time, ArangoDB's own query plan cache can
+match it too.
+
+Filters are given as a dict. A plain value means equality, and a dict
+of operators means anything else:
+
+    {"eventCode": 20}
+    {"goldsteinScale": {"gte": 5, "lt": 10}}
+    {"countryCode": {"in": ["US", "UK"]}}
+    {"fullname": {"prefix": "Washington"}}
+    {"near": {"lat": 38.9, "lon": -77.0, "radius": 50000}}    (Locations; metres)
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from event_schema import ACTOR_FIELDS, DERIVED_EVENT_ATTRIBUTES, EVENT_FIELDS, LOCATION_FIELDS, attribute_types
+
+# Collection -> attribute -> Python type of its stored values
+SCHEMA = {
+    "Events": {**attribute_types(EVENT_FIELDS), **DERIVED_EVENT_ATTRIBUTES},
+    "Actors": attribute_types(ACTOR_FIELDS),
+    "Locations": attribute_types(LOCATION_FIELDS),
+}
+for _attributes in SCHEMA.values():
+    _attributes.update({"_key": str, "_id": str})
+
+# Collections with a geo index on (latitude, longitude)
+GEO_COLLECTIONS = {"Locations"}
+
+COMPARISONS = {"eq": "==", "ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+OPERATORS = set(COMPARISONS) | {"in", "prefix"}
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """One filter condition: `field` `op` `value`"""
+    field: str
+    op: str
+    value: object
+
+
+@dataclass(frozen=True)
+class Near:
+    """Geo filter: within `radius` metres of (lat, lon)"""
+    lat: float
+    lon: float
+    radius: float
+
+
+def _check_collection(collection):
+    if collection not in SCHEMA:
+        raise ValueError(f"Unknown collection: {collection} (expected one of {', '.join(SCHEMA)})")
+    return SCHEMA[collection]
+
+
+def _check_field(collection, field):
+    attributes = _check_collection(collection)
+    if field not in attributes:
+        raise ValueError(f"Unknown attribute for {collection}: {field}")
+    return attributes[field]
+
+
+def _coerce(collection, field, value):
+    expected = _check_field(collection, field)
+    if value is None:
+        return None
+    if expected is float and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if expected is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    if not isinstance(value, expected) or isinstance(value, bool):
+        raise ValueError(f"{collection}.{field} expects {expected.__name__}, got {value!r}")
+    return value
+
+
+def _prefix_upper_bound(prefix):
+    # Smallest string greater than every string starting with `prefix`
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def parse_filters(collection, filters):
+    """Turn a filters dict into validated Predicate/Near objects"""
+    predicates = []
+    for field, spec in (filters or {}).items():
+        if field == "near":
+            if collection not in GEO_COLLECTIONS:
+                raise ValueError(f"near is only supported on {', '.join(sorted(GEO_COLLECTIONS))}")
+            try:
+                predicates.append(Near(float(spec["lat"]), float(spec["lon"]), float(spec["radius"])))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("near expects {\"lat\": ..., \"lon\": ..., \"radius\": metres}")
+            continue
+
+        if not isinstance(spec, dict):
+            spec = {"eq": spec}
+        for op, value in spec.items():
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator for {field}: {op}")
+            if op == "in":
+                if not isinstance(value, list):
+                    raise ValueError(f"{field}.in expects a list")
+                value = [_coerce(collection, field, item) for item in value]
+            elif op == "prefix":
+                if _check_field(collection, field) is not str or not isinstance(value, str) or not value:
+                    raise ValueError(f"{field}.prefix expects a non-empty string on a string attribute")
+            else:
+                value = _coerce(collection, field, value)
+            predicates.append(Predicate(field, op, value))
+    return predicates
+
+
+def parse_sort(collection, sort):
+    """'field' or '-field' (descending), comma-separated -> ((field, descending), ...)"""
+    if not sort:
+        return ()
+    keys = sort.split(",") if isinstance(sort, str) else sort
+    parsed = []
+    for key in keys:
+        key = key.strip()
+        descending = key.startswith("-")
+        field = key.lstrip("-")
+        _check_field(collection, field)
+        parsed.append((field, descending))
+    return tuple(parsed)
+
+
+def parse_fields(collection, fields):
+    """Projection list (or comma-separated string) -> validated tuple, or None for whole documents"""
+    if not fields:
+        return None
+    fields = fields.split(",") if isinstance(fields, str) else fields
+    fields = tuple(field.strip() for field in fields)
+    for field in fields:
+        _check_field(collection, field)
+    return fields
+
+
+@lru_cache(maxsize=256)
+def compile_query(collection, shape, fields, sort):
+    """Query text for one query shape; `shape` is a tuple of (field, op) or 'near'"""
+    lines = [f"FOR doc IN {collection}"]
+    for i, part in enumerate(shape):
+        if part == "near":
+            lines.append(f"    FILTER DISTANCE(doc.latitude, doc.longitude, @p{i}_lat, @p{i}_lon) <= @p{i}_radius")
+            continue
+        field, op = part
+        if op == "in":
+            lines.append(f"    FILTER doc.`{field}` IN @p{i}")
+        elif op == "prefix":
+            # A range, so a persistent index on the attribute can serve it
+            lines.append(f"    FILTER doc.`{field}` >= @p{i}_from AND doc.`{field}` < @p{i}_to")
+        else:
+            lines.append(f"    FILTER doc.`{field}` {COMPARISONS[op]} @p{i}")
+    if sort:
+        lines.append("    SORT " + ", ".join(
+            f"doc.`{field}` {'DESC' if descending else 'ASC'}" for field, descending in sort
+        ))
+    lines.append("    LIMIT @limit")
+    if fields:
+        projected = dict.fromkeys(("_key",) + fields)
+        lines.append("    RETURN {" + ", ".join(f"`{field}`: doc.`{field}`" for field in projected) + "}")
+    else:
+        lines.append("    RETURN doc")
+    return "\n".join(lines)
+
+
+def build_query(collection, filters=None, fields=None, sort=None, limit=10):
+    """Validate a query and return (aql, bind_vars).
+
+    `filters` is a filters dict (see module docstring) or a list of
+    Predicate/Near. `fields` limits the returned attributes (`_key` is
+    always included). `sort` is 'field' or '-field', comma-separated.
+    """
+    _check_collection(collection)
+    predicates = filters if isinstance(filters, list) else parse_filters(collection, filters)
+
+    shape = []
+    bind_vars = {"limit": int(limit)}
+    for i, predicate in enumerate(predicates):
+        if isinstance(predicate, Near):
+            shape.append("near")
+            bind_vars.update({f"p{i}_lat": predicate.lat, f"p{i}_lon": predicate.lon,
+                              f"p{i}_radius": predicate.radius})
+            continue
+        shape.append((predicate.field, predicate.op))
+        if predicate.op == "prefix":
+            bind_vars[f"p{i}_from"] = predicate.value
+            bind_vars[f"p{i}_to"] = _prefix_upper_bound(predicate.value)
+        else:
+            bind_vars[f"p{i}"] = predicate.value
+
+    query = compile_query(collection, tuple(shape), parse_fields(collection, fields),
+                          parse_sort(collection, sort))
+    return query, bind_vars
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+# Cache settings - override with environment variables
+CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "900"))
+# Results longer than this are served but not cached
+CACHE_MAX_ROWS = int(os.getenv("QUERY_CACHE_MAX_ROWS", "50000"))
+# Total JSON size of the in-memory entries; least recently used ones go first
+CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+CACHE_DIR = os.getenv("QUERY_CACHE_DIR") or None
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+# Loaders bump a counter in this document after committing data; cached
+# results from before the change are then stale in every process on any host
+META_COLLECTION = "Meta"
+INGEST_EPOCH_KEY = "ingest_epoch"
+# Seconds between reads of the epoch; each read is one database round trip
+EPOCH_CHECK_INTERVAL = float(os.getenv("QUERY_CACHE_EPOCH_INTERVAL", "5"))
+
+BUMP_EPOCH_QUERY = """
+UPSERT {_key: @key}
+    INSERT {_key: @key, epoch: 1}
+    UPDATE {epoch: OLD.epoch + 1}
+    IN @@collection
+    RETURN NEW.epoch
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Collapse whitespace so formatting differences share a cache entry"""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def cache_key(*parts):
+    """Stable hash of the query text, bind vars and any other key parts"""
+    payload = json.dumps(
+        [normalize_query(p) if isinstance(p, str) else p for p in parts],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def read_ingest_epoch(db):
+    """The ingest epoch stored in `db`, or None before the first bump"""
+    if not db.has_collection(META_COLLECTION):
+        return None
+    document = db.collection(META_COLLECTION).get(INGEST_EPOCH_KEY)
+    return document["epoch"] if document else None
+
+
+def bump_ingest_epoch(db):
+    """Record that new data was committed to `db`; call after every ingestion batch"""
+    if not db.has_collection(META_COLLECTION):
+        db.create_collection(META_COLLECTION)
+    cursor = db.aql.execute(BUMP_EPOCH_QUERY, bind_vars={"key": INGEST_EPOCH_KEY, "@collection": META_COLLECTION})
+    return next(cursor)
+
+
+def _json_size(value):
+    """Length of `value` as JSON, the measure max_bytes bounds"""
+    return len(json.dumps(value, default=str))
+
+
+class QueryCache:
+    """Result cache for read queries.
+
+    Entries live in an in-process LRU bounded by `max_entries` and by
+    `max_bytes`, the total JSON size of the cached values (a proxy for
+    their memory; the Python objects take a few times more) and, when
+    `disk_dir` is set, in a JSON file per entry that survives restarts and
+    is shared between worker processes. An entry is stale once its TTL
+    has passed or once a loader has bumped the ingest epoch since it was
+    stored. The epoch is read through `epoch_db`, a callable returning the
+    database handle; without it only the TTL applies.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, disk_dir=CACHE_DIR,
+                 max_rows=CACHE_MAX_ROWS, max_bytes=CACHE_MAX_BYTES, epoch_db=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_rows = max_rows
+        self.epoch_db = epoch_db
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()   # key -> (epoch, expires_at, value)
+        self._sizes = {}                # key -> JSON size of the value
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._epoch = None
+        # Read on first use, not at construction (the database may not be up yet)
+        self._epoch_checked = float("-inf")
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                       "evictions": 0, "expired": 0, "invalidated": 0, "uncacheable": 0}
+
+    def current_epoch(self):
+        """The ingest epoch, re-read from the database at most once per EPOCH_CHECK_INTERVAL"""
+        now = time.monotonic()
+        with self._lock:
+            if self.epoch_db is None or now - self._epoch_checked < EPOCH_CHECK_INTERVAL:
+                return self._epoch
+            # One reader per interval; the others keep using the current epoch
+            self._epoch_checked = now
+        try:
+            epoch = read_ingest_epoch(self.epoch_db())
+        except Exception:
+            # Database unreachable: keep serving under the last known epoch
+            return self._epoch
+        with self._lock:
+            if epoch != self._epoch:
+                # New data: drop everything at once instead of entry by entry
+                self._stats["invalidated"] += len(self._entries)
+                self._drop_all()
+                self._epoch = epoch
+        return self._epoch
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + ".json")
+
+    def _read_disk(self, key):
+        try:
+            with open(self._disk_path(key)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return entry["epoch"], entry["expires_at"], entry["value"]
+
+    def _write_disk(self, key, entry):
+        epoch, expires_at, value = entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, prefix=".entry_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                # Wall-clock expiry on disk; the in-memory tier uses monotonic time
+                json.dump({"epoch": epoch, "expires_at": time.time() + (expires_at - time.monotonic()),
+                           "value": value}, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except (TypeError, ValueError):
+            # Not JSON-serializable: keep it in memory only
+            os.remove(tmp_path)
+
+    def get(self, key):
+        """Return (True, value) for a fresh entry, (False, None) otherwise"""
+        epoch = self.current_epoch()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == epoch and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return True, entry[2]
+                self._drop(key)
+                self._stats["expired"] += 1
+
+        if self.disk_dir:
+            entry = self._read_disk(key)
+            if entry is not None and entry[0] == epoch and entry[1] > time.time():
+                # Promote to memory with the remaining lifetime
+                self._remember(key, (entry[0], now + entry[1] - time.time(), entry[2]), _json_size(entry[2]))
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                return True, entry[2]
+            if entry is not None:
+                # Stale on disk too; drop the file so the tier does not grow forever
+                try:
+                    os.remove(self._disk_path(key))
+                except FileNotFoundError:
+                    pass
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return False, None
+
+    def _drop(self, key):
+        # Caller holds the lock
+        del self._entries[key]
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def _drop_all(self):
+        self._entries.clear()
+        self._sizes.clear()
+        self._bytes = 0
+
+    def _remember(self, key, entry, size):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def put(self, key, value, ttl=None, epoch=None):
+        """Store `value`; lists longer than max_rows are not cached.
+
+        Pass the `epoch` read before the query ran, so a result computed
+        across an ingest is not stored as current.
+        """
+        size = None if isinstance(value, list) and len(value) > self.max_rows else _json_size(value)
+        if size is None or size > self.max_bytes:
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            return False
+        entry = (self.current_epoch() if epoch is None else epoch, time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._remember(key, entry, size)
+        if self.disk_dir:
+            self._write_disk(key, entry)
+        with self._lock:
+            self._stats["stores"] += 1
+        return True
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for `key`, computing and storing it on a miss"""
+        found, value = self.get(key)
+        if found:
+            return value
+        epoch = self.current_epoch()
+        value = compute()
+        self.put(key, value, ttl, epoch)
+        return value
+
+    def iter_and_store(self, key, rows, ttl=None):
+        """Pass `rows` through, caching them once the iteration completes.
+
+        An abandoned iteration (client disconnect) or a result longer than
+        max_rows stores nothing.
+        """
+        epoch = self.current_epoch()
+        collected = []
+        for row in rows:
+            if collected is not None:
+                collected.append(row)
+                if len(collected) > self.max_rows:
+                    collected = None
+            yield row
+        if collected is not None:
+            self.put(key, collected, ttl, epoch)
+        else:
+            with self._lock:
+                self._stats["uncacheable"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._drop_all()
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def stats(self):
+        """Return a JSON-serializable summary of cache activity"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else None
+        stats.update(max_entries=self.max_entries, max_bytes=self.max_bytes, ttl=self.ttl,
+                     disk_dir=self.disk_dir, epoch=self._epoch)
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(epoch_db=None):
+    """Return the process-wide cache, created with the environment settings.
+
+    `epoch_db` (see QueryCache) is only used when the cache is first
+    created; it defaults to the ARANGO_DB database of the shared pool.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if epoch_db is None:
+                from arango_pool import get_db
+
+                epoch_db = partial(get_db, ARANGO_DB)
+            _cache = QueryCache(epoch_db=epoch_db)
+    return _cache
+
+
+def cached_query(db, query, bind_vars=None, ttl=None, **execute_args):
+    """Run a read-only AQL query through the cache and return its rows as a list"""
+    key = cache_key(db.name, query, bind_vars or {})
+    return get_cache().get_or_compute(
+        key, lambda: list(db.aql.execute(query, bind_vars=bind_vars, **execute_args)), ttl
+    )
@@ -0,0 +1,301 @@
+"""Pre-aggregated event counts and means per time bucket.
+
+Each EventRollups document holds the totals for one (granularity,
+dimension, value, bucket) cell: the event count, plus the sums and counts
+behind the mean Goldstein score and the mean tone. Loaders add each
+file's totals once its events are written. Queries read a handful of
+rollup documents through an index and never touch Events.
+
+Granularities:
+    15min, hour, day - from dateAdded, when GDELT recorded the event
+    event_day        - from date, the day the event happened (the old
+                       get_event_time_distribution semantics)
+
+Dimensions: all, quadClass, country (the event location's country).
+
+Each file's totals are applied at most once, under a batch ID recorded
+in RollupBatches by the same statement that adds them, so re-running a
+load (or two loaders applying one file at once) does not double count.
+"""
+import argparse
+import os
+import re
+import pandas as pd
+from arango.exceptions import AQLQueryExecuteError
+from arango_pool import get_db
+from query_cache import bump_ingest_epoch, cached_query
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+ROLLUP_COLLECTION = "EventRollups"
+BATCH_COLLECTION = "RollupBatches"
+
+# ArangoDB error codes apply_rollups handles
+WRITE_CONFLICT = 1200
+UNIQUE_CONSTRAINT_VIOLATED = 1210
+APPLY_ATTEMPTS = 3
+
+# GDELT export stamp (YYYYMMDDHHMMSS) in a file name, e.g. 20250301121500.export.CSV.zip
+EXPORT_STAMP = re.compile(r"(?<!\d)(\d{14})\.export", re.IGNORECASE)
+# "cleaned_" plus the watcher's optional cleaning timestamp (see Clean_CSV.process_input_file)
+CLEANED_PREFIX = re.compile(r"^cleaned_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}_)?")
+
+GRANULARITIES = ("15min", "hour", "day", "event_day")
+
+# Dimension name -> Events attribute; "all" aggregates everything
+DIMENSIONS = {
+    "all": None,
+    "quadClass": "quadClass",
+    "country": "geoCountryCode",
+}
+
+# The same dimensions as cleaned-file columns, for totals computed at ingest
+FRAME_DIMENSIONS = {
+    "all": None,
+    "quadClass": "QuadClass",
+    "country": "Actor1Geo_CountryCode",
+}
+
+CELL_COLUMNS = ["granularity", "dimension", "value", "bucket"]
+
+ALL_VALUE = "*"
+
+# Bucket expressions over Events, for rebuilding rollups from stored events.
+# Buckets are sortable integers: YYYYMMDDHHMM, YYYYMMDDHH, YYYYMMDD.
+AQL_BUCKETS = {
+    "15min": "e.dateAdded == null ? null : FLOOR(e.dateAdded / 100) - FLOOR(e.dateAdded / 100) % 100 % 15",
+    "hour": "e.dateAdded == null ? null : FLOOR(e.dateAdded / 10000)",
+    "day": "e.dateAdded == null ? null : FLOOR(e.dateAdded / 1000000)",
+    "event_day": "e.date",
+}
+
+# The marker insert fails on a batch applied before, which aborts the whole
+# statement, so totals and marker are written together or not at all
+APPLY_QUERY = """
+LET marker = (INSERT {_key: @batch} INTO RollupBatches RETURN NEW._key)
+FOR r IN @rows
+    UPSERT {_key: r._key}
+    INSERT r
+    UPDATE {
+        count: OLD.count + r.count,
+        goldsteinSum: OLD.goldsteinSum + r.goldsteinSum,
+        goldsteinCount: OLD.goldsteinCount + r.goldsteinCount,
+        toneSum: OLD.toneSum + r.toneSum,
+        toneCount: OLD.toneCount + r.toneCount
+    }
+    IN EventRollups
+    COLLECT WITH COUNT INTO updated
+    RETURN updated
+"""
+
+REBUILD_QUERY = """
+FOR e IN Events
+    LET bucket = {bucket}
+    FILTER bucket != null
+    COLLECT b = bucket, v = {value}
+    AGGREGATE count = LENGTH(1),
+              goldsteinSum = SUM(e.goldsteinScale),
+              goldsteinCount = SUM(e.goldsteinScale == null ? 0 : 1),
+              toneSum = SUM(e.avgTone),
+              toneCount = SUM(e.avgTone == null ? 0 : 1)
+    LET value = v == null ? "{all}" : TO_STRING(v)
+    INSERT {{
+        _key: CONCAT_SEPARATOR(":", @granularity, @dimension, value, b),
+        granularity: @granularity, dimension: @dimension, value: value, bucket: b,
+        count, goldsteinSum, goldsteinCount, toneSum, toneCount
+    }} INTO EventRollups OPTIONS {{overwriteMode: "replace"}}
+"""
+
+ROLLUP_QUERY = """
+FOR r IN EventRollups
+    FILTER r.granularity == @granularity AND r.dimension == @dimension
+    {value_filter}
+    FILTER r.bucket >= @start AND r.bucket <= @end
+    SORT r.bucket
+    LIMIT @limit
+    RETURN {{
+        bucket: r.bucket,
+        value: r.value,
+        count: r.count,
+        goldsteinMean: r.goldsteinCount ? r.goldsteinSum / r.goldsteinCount : null,
+        toneMean: r.toneCount ? r.toneSum / r.toneCount : null
+    }}
+"""
+
+
+def _buckets(df):
+    """Bucket columns for a cleaned frame (DateAdded, Day)"""
+    added = pd.to_numeric(df["DateAdded"], errors="coerce").astype("Int64")
+    minutes = added // 100
+    return {
+        "15min": minutes - minutes % 100 % 15,
+        "hour": added // 10000,
+        "day": added // 1000000,
+        "event_day": pd.to_numeric(df["Day"], errors="coerce").astype("Int64"),
+    }
+
+
+def rollup_totals(df):
+    """Per-cell totals for a chunk of cleaned rows, as a DataFrame"""
+    # Files cleaned before DateAdded was kept only feed event_day
+    df = df.reindex(columns=["GlobalEventID", "Day", "DateAdded", "GoldsteinScale", "AvgTone",
+                             "QuadClass", "Actor1Geo_CountryCode"])
+    df = df[df["GlobalEventID"].notna()].drop_duplicates("GlobalEventID", keep="last")
+    buckets = _buckets(df)
+    goldstein = pd.to_numeric(df["GoldsteinScale"], errors="coerce")
+    tone = pd.to_numeric(df["AvgTone"], errors="coerce")
+    base = pd.DataFrame({
+        "count": 1,
+        "goldsteinSum": goldstein.fillna(0.0),
+        "goldsteinCount": goldstein.notna().astype("int64"),
+        "toneSum": tone.fillna(0.0),
+        "toneCount": tone.notna().astype("int64"),
+    }, index=df.index)
+
+    frames = []
+    for granularity in GRANULARITIES:
+        for dimension, column in FRAME_DIMENSIONS.items():
+            cells = base.assign(
+                granularity=granularity,
+                dimension=dimension,
+                value=ALL_VALUE if column is None else df[column].astype("string"),
+                bucket=buckets[granularity],
+            ).dropna(subset=["value", "bucket"])
+            if len(cells):
+                frames.append(cells.groupby(CELL_COLUMNS, as_index=False).sum())
+    return combine_totals(frames)
+
+
+def combine_totals(frames):
+    """Sum several rollup_totals() results, e.g. every chunk of one file"""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=CELL_COLUMNS)
+    return pd.concat(frames, ignore_index=True).groupby(CELL_COLUMNS, as_index=False).sum()
+
+
+def _rollup_documents(totals):
+    totals = totals.astype({"bucket": "int64", "count": "int64",
+                            "goldsteinCount": "int64", "toneCount": "int64"})
+    keys = (totals["granularity"] + ":" + totals["dimension"] + ":"
+            + totals["value"].astype(str) + ":" + totals["bucket"].astype(str))
+    return totals.assign(_key=keys).astype(object).to_dict("records")
+
+
+def apply_rollups(db, totals, batch_id):
+    """Add one batch of rollup totals, unless `batch_id` was applied before.
+
+    Returns the number of rollup documents touched (0 for a repeat batch).
+    """
+    if totals is None or not len(totals):
+        return 0
+    bind_vars = {"batch": batch_id, "rows": _rollup_documents(totals)}
+    for attempt in range(APPLY_ATTEMPTS):
+        try:
+            return next(db.aql.execute(APPLY_QUERY, bind_vars=bind_vars), 0)
+        except AQLQueryExecuteError as error:
+            if error.error_code == UNIQUE_CONSTRAINT_VIOLATED:
+                # Marker exists: the batch was applied before
+                return 0
+            # Another loader is applying the same batch; retry to see its marker
+            if error.error_code != WRITE_CONFLICT or attempt == APPLY_ATTEMPTS - 1:
+                raise
+
+
+def export_batch_id(path):
+    """Batch ID shared by every form of one export file.
+
+    The ID comes from the file's 14-digit export stamp, so
+    cleaned_20250301000000.export.CSV, the watcher's
+    cleaned_2026-10-17_04-00-00_20250301000000.export.CSV, their .parquet
+    twins and 20250301000000.export.CSV.zip all map to
+    20250301000000.export. Loading one export through the watcher, the
+    loader or the pipeline, or cleaning it twice, applies it once.
+    Files without a stamp fall back to their name without the cleaning
+    prefixes and suffixes.
+    """
+    name = os.path.basename(path)
+    stamped = EXPORT_STAMP.search(name)
+    if stamped:
+        return f"{stamped.group(1)}.export"
+    name = CLEANED_PREFIX.sub("", name)
+    for suffix in (".zip", ".parquet", ".CSV", ".csv"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    # Keep only characters ArangoDB allows in keys
+    return "".join(c if c.isalnum() or c in "_-:.@()+,=;$!*'%" else "_" for c in name)[:254]
+
+
+def rebuild_rollups(db):
+    """Recompute every rollup from the stored events (one full scan per cell type).
+
+    RollupBatches is kept: the rebuilt totals already count the events of
+    every applied file, so reloading one of them must still be skipped.
+    """
+    db.collection(ROLLUP_COLLECTION).truncate()
+    for granularity in GRANULARITIES:
+        for dimension, attribute in DIMENSIONS.items():
+            query = REBUILD_QUERY.format(
+                bucket=AQL_BUCKETS[granularity],
+                value="null" if attribute is None else f"e.{attribute}",
+                all=ALL_VALUE,
+            )
+            db.aql.execute(query, bind_vars={"granularity": granularity, "dimension": dimension})
+    bump_ingest_epoch(db)
+    return db.collection(ROLLUP_COLLECTION).count()
+
+
+def query_rollups(db, granularity="day", dimension="all", value=None, start=None, end=None,
+                  limit=1000):
+    """Time series for one granularity and dimension.
+
+    `value` picks one quad class or country (all values when None).
+    `start`/`end` bound the bucket in the granularity's integer form, e.g.
+    20250301 for a day or 202503011215 for a 15-minute bucket. Returns rows
+    of {bucket, value, count, goldsteinMean, toneMean} ordered by bucket.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"dimension must be one of: {', '.join(DIMENSIONS)}")
+
+    bind_vars = {
+        "granularity": granularity,
+        "dimension": dimension,
+        "start": start if start is not None else 0,
+        "end": end if end is not None else 99999999999999,
+        "limit": limit,
+    }
+    value_filter = ""
+    if dimension == "all":
+        value = ALL_VALUE
+    if value is not None:
+        value_filter = "FILTER r.value == @value"
+        bind_vars["value"] = str(value)
+    return cached_query(db, ROLLUP_QUERY.format(value_filter=value_filter), bind_vars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Event count/Goldstein/tone rollups')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute all rollups from Events')
+    parser.add_argument('--granularity', choices=GRANULARITIES, default='day')
+    parser.add_argument('--dimension', choices=list(DIMENSIONS), default='all')
+    parser.add_argument('--value', help='One quad class or country code')
+    parser.add_argument('--start', type=int, help='First bucket, e.g. 20250301')
+    parser.add_argument('--end', type=int, help='Last bucket')
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if args.rebuild:
+        print(f"Rebuilt {rebuild_rollups(db)} rollup documents")
+        return
+
+    for row in query_rollups(db, args.granularity, args.dimension, args.value, args.start, args.end):
+        goldstein = "-" if row['goldsteinMean'] is None else f"{row['goldsteinMean']:.2f}"
+        tone = "-" if row['toneMean'] is None else f"{row['toneMean']:.2f}"
+        print(f"{row['bucket']}  {row['value']:>4}  {row['count']:>8}  goldstein {goldstein}  tone {tone}")
+
+
+if __name__ == "__main__":
+    main()
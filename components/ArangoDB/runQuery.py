@@ -1,40 +1,55 @@
-from arango import ArangoClient
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request, stream_with_context
+import json
 import os
-from datetime import datetime
-from config import ARANGO_HOST, ARANGO_USERNAME, ARANGO_PASSWORD
+from arango_pool import ARANGO_DB, init_pool
+from query_cache import cache_key, get_cache
+from event_filters import compile_event_filters, parse_event_filters
+from graph_analytics import TOP_K, database_graph_stats
+from intent_parser import describe_results, parse_query
+from nl_service import get_nl_service
+from rollups import query_rollups
+from sampling import STRATA_FIELDS, sample_clause, stratum_values
 
 # Initialize Flask app
 app = Flask(__name__)
 
-@app.route('/api/events', methods=['GET'])
-def get_events():
-    try:
-        # Connect to database using config variables
-        client = ArangoClient(hosts=ARANGO_HOST)
-        db = client.db(
-            username=ARANGO_USERNAME, 
-            password=ARANGO_PASSWORD, 
-            verify=True
-        )
-        
-        # Query for events
-        aql_query = """
-            WITH Events, Actors, Locations, EventRelations
-    FOR event IN Events
-        LET location = (
-            FOR v, e IN 1..1 OUTBOUND event EventRelations
+# Shared connection pool, created once at startup
+pool = init_pool()
+
+# Result cache shared by the read endpoints; its ingest epoch is read from
+# ARANGO_DB, where the loaders bump it
+cache = get_cache()
+
+# Paging settings for /api/events
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+CURSOR_BATCH_SIZE = 1000
+CURSOR_TTL = 60
+
+# Events returned by /api/query
+DEFAULT_QUERY_LIMIT = 1000
+
+# Per-event subtraversals shared by every /api/events query
+LOCATION_LOOKUP = """
+        LET {location} = (
+            FOR v, e IN 1..1 OUTBOUND {event} EventRelations
             FILTER IS_SAME_COLLECTION("Locations", v)
             RETURN v
         )[0]
+        FILTER {location} != null
+"""
+
+ACTOR_LOOKUP = """
         LET actor = (
             FOR v, e IN 1..1 OUTBOUND event EventRelations
             FILTER IS_SAME_COLLECTION("Actors", v)
             RETURN v
         )[0]
-        FILTER location != null
-        SORT RAND()
+"""
+
+EVENT_PROJECTION = """
         RETURN {
+            key: event._key,
             source: event.source,
             goldsteinscore: TO_NUMBER(event.goldsteinScale),
             quadclass: event.quadClass,
@@ -44,27 +59,346 @@ def get_events():
             actorFilter: actor.type3Code,
             coordinates: [location.latitude, location.longitude]
         }
-        """
-        
-        # Execute the query
-        cursor = db.aql.execute(aql_query)
-        interesting_events = list(cursor)
-        print(interesting_events)
-        
-        # Add relative time for display purposes
-        now = datetime.now()
-        for i, event in enumerate(interesting_events):
+"""
+
+
+def sample_window_filters(filters, variable):
+    """FILTER lines that keep a sampling window (see sampling.sample_clause) to
+    events the listing returns, so the sample is not thinned afterwards.
+
+    Event filters (countries included) run first; events without a location
+    and outside the bbox are dropped inside the window.
+    """
+    event_filters, location_filters, _ = compile_event_filters(filters, variable, f"{variable}_location")
+    lines = [event_filters] if event_filters else []
+    lines.append(LOCATION_LOOKUP.format(event=variable, location=f"{variable}_location").strip("\n"))
+    if location_filters:
+        lines.append(location_filters)
+    return "\n".join(lines)
+
+
+def build_events_query(after=None, limit=None, filters=None, sample=None, strata=None,
+                       strata_values=None):
+    """Build the /api/events AQL query and its bind variables.
+
+    Without `limit` this is the original full listing, in `rnd` order read
+    off its index instead of sorted on RAND(). `rnd` is a hash of the event
+    key, so the order is fixed on purpose: the same on every call, and the
+    full listing streams without a sort. Clients that want a different set
+    of events each time should ask for a `sample`.
+    With `limit` events are walked in `_key` order starting after `after`,
+    so each page is a primary-index range scan rather than a full sort.
+    With `sample` a random sample of that many events is returned, optionally
+    stratified by `strata` over `strata_values` (see sampling.py).
+    `filters` (see event_filters.parse_event_filters) are applied in the
+    database: event predicates before the traversals, location predicates
+    right after the location lookup, so rejected events never leave it.
+    Samples apply every filter inside the sampling window instead (see
+    sample_window_filters).
+    """
+    filters = filters or {}
+    event_filters, location_filters, bind_vars = compile_event_filters(filters)
+    lines = ["WITH Events, Actors, Locations, EventRelations"]
+
+    if sample is not None:
+        clause, sample_vars = sample_clause(
+            sample, strata, strata_values,
+            compile_filters=lambda variable: sample_window_filters(filters, variable),
+        )
+        lines.append(clause)
+        bind_vars.update(sample_vars)
+        # Already applied in the window
+        location_filters = ""
+    else:
+        lines.append("    FOR event IN Events")
+        if limit is not None and after is not None:
+            lines.append("        FILTER event._key > @after")
+            bind_vars["after"] = after
+        if event_filters:
+            lines.append(event_filters)
+        lines.append("        SORT event._key" if limit is not None else "        SORT event.rnd")
+
+    lines.append(LOCATION_LOOKUP.format(event="event", location="location"))
+    if location_filters:
+        lines.append(location_filters)
+    lines.append(ACTOR_LOOKUP)
+
+    if sample is not None:
+        lines.append("        LIMIT @sample_size")
+        bind_vars["sample_size"] = sample
+    elif limit is not None:
+        lines.append("        LIMIT @limit")
+        bind_vars["limit"] = limit
+
+    lines.append(EVENT_PROJECTION)
+    return "\n".join(lines), bind_vars
+
+
+def parse_page_args(args):
+    """Read `after`/`limit` from the query string; returns (after, limit)"""
+    after = args.get('after') or None
+    limit = args.get('limit')
+
+    if limit is None:
+        return after, (DEFAULT_PAGE_SIZE if after is not None else None)
+
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return after, min(limit, MAX_PAGE_SIZE)
+
+
+def parse_sample_args(args):
+    """Read `sample`/`strata` from the query string; returns (sample, strata)"""
+    sample = args.get('sample')
+    strata = args.get('strata') or None
+    if sample is None:
+        if strata is not None:
+            raise ValueError("strata requires sample")
+        return None, None
+
+    sample = int(sample)
+    if sample < 1:
+        raise ValueError("sample must be a positive integer")
+    if strata is not None and strata not in STRATA_FIELDS:
+        raise ValueError(f"strata must be one of: {', '.join(STRATA_FIELDS)}")
+    if args.get('after') or args.get('limit'):
+        raise ValueError("sample cannot be combined with after/limit paging")
+    return min(sample, MAX_PAGE_SIZE), strata
+
+
+def iter_events(cursor):
+    """Yield events from a streaming cursor, releasing it when done"""
+    try:
+        for event in cursor:
             # Set all events to display "15 minutes ago"
             event['time_ago'] = "15 minutes ago"
-        
-        return jsonify(interesting_events)
-    
+            yield event
+    finally:
+        # Frees the server-side cursor if the client disconnects early
+        cursor.close(ignore_missing=True)
+
+
+def stream_json_array(rows):
+    """Yield `rows` as one JSON array, one element at a time"""
+    yield "["
+    for i, row in enumerate(rows):
+        yield ("," if i else "") + json.dumps(row)
+    yield "]"
+
+
+def stream_ndjson(rows):
+    """Yield `rows` as newline-delimited JSON"""
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+@app.route('/api/health', methods=['GET'])
+def get_health():
+    status = pool.status()
+    return jsonify(status), (200 if status['healthy'] is not False else 503)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(cache.stats())
+
+@app.route('/api/events', methods=['GET'])
+def get_events():
+    """List events.
+
+    Query parameters:
+        after  - return events whose key sorts after this one (keyset paging)
+        limit  - page size (default 500, max 5000); enables paging
+        format - "json" (default, a JSON array) or "ndjson"
+        sample - return a random sample of this many events (max 5000)
+        strata - with sample, "quadclass" or "country" for an equal share
+                 per quad class or location country
+
+    Filters (all optional, combined with AND):
+        country, quadclass, goldstein_min, goldstein_max, bbox, day_from,
+        day_to - see event_filters.parse_event_filters
+
+    Each event carries its `key`; clients page by passing the last key they
+    received as `after` until a page comes back shorter than `limit`.
+    """
+    try:
+        after, limit = parse_page_args(request.args)
+        sample, strata = parse_sample_args(request.args)
+        filters = parse_event_filters(request.args)
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            raise ValueError("format must be 'json' or 'ndjson'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Reuse the pooled database handle
+        db = pool.db(ARANGO_DB)
+
+        strata_values = stratum_values(db, strata, filters) if strata else None
+        aql_query, bind_vars = build_events_query(after, limit, filters, sample, strata, strata_values)
+
+        # Samples are random per call; everything else is served from the
+        # cache until its TTL passes or new data is loaded
+        key = cache_key(db.name, aql_query, bind_vars) if sample is None else None
+        found, cached = cache.get(key) if key else (False, None)
+        if found:
+            rows = iter(cached)
+        else:
+            # Execute the query; rows are pulled from the server one batch
+            # at a time while the response body is being written
+            cursor = db.aql.execute(
+                aql_query,
+                bind_vars=bind_vars,
+                batch_size=CURSOR_BATCH_SIZE,
+                ttl=CURSOR_TTL,
+                stream=True
+            )
+            rows = iter_events(cursor)
+            if key:
+                rows = cache.iter_and_store(key, rows)
+
+        if output_format == 'ndjson':
+            body, mimetype = stream_ndjson(rows), 'application/x-ndjson'
+        else:
+            body, mimetype = stream_json_array(rows), 'application/json'
+
+        return Response(stream_with_context(body), mimetype=mimetype)
+
     except Exception as e:
         # Return a more helpful error message with proper status code
         error_msg = str(e)
         print(f"Error retrieving events: {error_msg}")
         return jsonify({"error": error_msg}), 500
 
+@app.route('/api/rollups', methods=['GET'])
+def get_rollups():
+    """Pre-aggregated event counts, mean Goldstein score and mean tone.
+
+    Query parameters:
+        granularity - 15min, hour, day (default; by DateAdded) or event_day
+        dimension   - all (default), quadClass or country
+        value       - one quad class or country code (default: every value)
+        start, end  - bucket range, e.g. 20250301 for a day or 202503011215
+                      for a 15-minute bucket
+        limit       - maximum rows (default 1000)
+    """
+    try:
+        start = request.args.get('start', type=int)
+        end = request.args.get('end', type=int)
+        limit = request.args.get('limit', 1000, type=int)
+        rows = query_rollups(
+            pool.db(ARANGO_DB),
+            granularity=request.args.get('granularity', 'day'),
+            dimension=request.args.get('dimension', 'all'),
+            value=request.args.get('value'),
+            start=start,
+            end=end,
+            limit=max(1, min(limit, MAX_PAGE_SIZE)),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        error_msg = str(e)
+        print(f"Error retrieving rollups: {error_msg}")
+        return jsonify({"error": error_msg}), 500
+    return jsonify(rows)
+
+@app.route('/api/graph/stats', methods=['GET'])
+def get_graph_stats():
+    """Statistics of the whole stored graph (see graph_analytics.py).
+
+    Query parameters:
+        top_k      - hubs per node type and PageRank entries (default 10, max 100)
+        components - "1" adds connected components and PageRank. Off by
+                     default: they read the whole EventRelations edge list
+                     into the web process; run graph_analytics.py for
+                     them out of band instead
+    """
+    top_k = request.args.get('top_k', TOP_K, type=int)
+    components = request.args.get('components', '0') == '1'
+    try:
+        stats = database_graph_stats(pool.db(ARANGO_DB), max(1, min(top_k, 100)), components)
+    except Exception as e:
+        error_msg = str(e)
+        print(f"Error computing graph stats: {error_msg}")
+        return jsonify({"error": error_msg}), 500
+    return jsonify(stats)
+
+@app.route('/api/query', methods=['POST'])
+def post_query():
+    """Answer a natural-language event query without an LLM (see intent_parser.py).
+
+    Body: {"query": "...", "limit": 1000}. The query is parsed into the
+    /api/events filters, which run in the database; at most `limit`
+    (max 5000) matching events come back as "aqlResult", with an "answer"
+    describing them and the "filters" that were applied.
+    """
+    body = request.get_json(silent=True) or {}
+    query_text = body.get('query')
+    if not query_text:
+        return jsonify({"error": "Query is required"}), 400
+    try:
+        limit = int(body.get('limit', DEFAULT_QUERY_LIMIT))
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    intent = parse_query(query_text)
+    try:
+        db = pool.db(ARANGO_DB)
+        aql_query, bind_vars = build_events_query(limit=limit, filters=intent['filters'])
+        events = cache.get_or_compute(
+            cache_key(db.name, aql_query, bind_vars),
+            lambda: list(iter_events(db.aql.execute(aql_query, bind_vars=bind_vars,
+                                                    batch_size=CURSOR_BATCH_SIZE, ttl=CURSOR_TTL,
+                                                    stream=True)))
+        )
+    except Exception as e:
+        error_msg = str(e)
+        print(f"Error answering query: {error_msg}")
+        return jsonify({"error": error_msg}), 500
+
+    truncated = len(events) == limit
+    return jsonify({
+        "answer": describe_results(intent, len(events), truncated),
+        "aqlResult": events,
+        "filters": intent['filters'],
+        "truncated": truncated,
+        # No LLM was involved, as with the keyword matching this replaces
+        "usingFallback": True,
+    })
+
+@app.route('/api/nl-query', methods=['POST'])
+def post_nl_query():
+    """Answer a natural-language question with the shared ArangoGraphQAChain (see nl_service.py).
+
+    Body: {"query": "..."}. Returns the text answer as "result", the generated
+    AQL as "aql_query" and its rows as "aql_result". Questions answered from
+    the question cache skip the LLM: they come back with "cached": true and
+    "result": null.
+    """
+    body = request.get_json(silent=True) or {}
+    query_text = body.get('query')
+    if not query_text:
+        return jsonify({"error": "Query is required"}), 400
+    try:
+        result = get_nl_service(pool.db(ARANGO_DB)).query(query_text)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        error_msg = str(e)
+        print(f"Error processing natural language query: {error_msg}")
+        return jsonify({"error": error_msg}), 500
+    return jsonify(result)
+
+@app.route('/api/nl-query/stats', methods=['GET'])
+def get_nl_query_stats():
+    """Natural-language query counts, schema builds and question cache hit rate and time saved"""
+    return jsonify(get_nl_service(pool.db(ARANGO_DB)).stats())
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""Random event sampling without sorting the whole Events collection.
+
+Every event carries `rnd`, a uniform value in [0, 1) that the loader
+derives from its key. Persistent indexes on `rnd`, `[quadClass, rnd]` and
+`[geoCountryCode, rnd]` are defined in indexes.py. A sample of n events is
+then the n events after a random starting point in `rnd` order, wrapping
+around at 1. That is an index range scan of n entries, not a full scan
+plus a sort. Stratified samples take an equal share from each quad class
+or country.
+
+Each call samples every event with equal probability. Samples drawn
+from nearby starting points overlap.
+"""
+import argparse
+import math
+import os
+import random
+import textwrap
+import pandas as pd
+from arango_pool import get_db
+from query_cache import bump_ingest_epoch
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+
+RND_FIELD = "rnd"
+
+# strata parameter -> Events attribute it stratifies on
+STRATA_FIELDS = {
+    "quadclass": "quadClass",
+    "country": "geoCountryCode",
+}
+
+QUADCLASSES = [1, 2, 3, 4]
+
+COUNTRIES_QUERY = """
+FOR location IN Locations
+    COLLECT country = location.countryCode
+    FILTER country != null
+    RETURN country
+"""
+
+# Events still missing `rnd`; the persistent index on rnd also covers null
+BACKFILL_KEYS_QUERY = """
+FOR event IN Events
+    FILTER event.rnd == null
+    LIMIT @batch_size
+    RETURN event._key
+"""
+
+BACKFILL_QUERY = """
+WITH Events, Locations
+FOR row IN @rows
+    LET location = FIRST(
+        FOR v, e IN 1..1 OUTBOUND CONCAT("Events/", row.key) EventRelations
+        FILTER IS_SAME_COLLECTION("Locations", v)
+        RETURN v
+    )
+    UPDATE row.key WITH {rnd: row.rnd, geoCountryCode: location.countryCode} IN Events
+"""
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def random_values(keys):
+    """Uniform [0, 1) values derived from a Series of keys; reloading an event keeps its value"""
+    hashes = pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy()
+    # Top 53 bits -> an exactly representable double
+    return pd.Series((hashes >> 11) / float(1 << 53), index=keys.index)
+
+
+def backfill_random_values(db, batch_size=BACKFILL_BATCH_SIZE):
+    """Give events loaded before sampling existed their `rnd` and `geoCountryCode`.
+
+    `rnd` comes from random_values, as in the loader, so a backfilled event
+    keeps its value when it is loaded again.
+    """
+    updated = 0
+    while True:
+        keys = pd.Series(list(db.aql.execute(BACKFILL_KEYS_QUERY, bind_vars={"batch_size": batch_size})),
+                         dtype=object)
+        if keys.empty:
+            break
+        rows = [{"key": key, "rnd": float(rnd)} for key, rnd in zip(keys, random_values(keys))]
+        db.aql.execute(BACKFILL_QUERY, bind_vars={"rows": rows})
+        updated += len(rows)
+    if updated:
+        bump_ingest_epoch(db)
+    return updated
+
+
+def stratum_values(db, strata, filters=None):
+    """Values to stratify on; a matching filter narrows them"""
+    filters = filters or {}
+    if strata == "quadclass":
+        return filters.get("quadclasses") or QUADCLASSES
+    if strata == "country":
+        return filters.get("countries") or list(db.aql.execute(COUNTRIES_QUERY))
+    raise ValueError(f"strata must be one of: {', '.join(STRATA_FIELDS)}")
+
+
+def _window(variable, stratum_field, event_filters, condition):
+    lines = [f"            (FOR {variable} IN Events"]
+    if stratum_field:
+        lines.append(f"                FILTER {variable}.{stratum_field} == stratum")
+    lines.append(f"                FILTER {condition.format(v=variable)}")
+    if event_filters:
+        lines.append(textwrap.indent(event_filters, " " * 8))
+    lines.append(f"                SORT {variable}.{RND_FIELD}")
+    lines.append("                LIMIT @per_stratum")
+    lines.append(f"                RETURN {variable})")
+    return "\n".join(lines)
+
+
+def sample_clause(size, strata=None, strata_values=None, compile_filters=None, start=None):
+    """AQL lines that bind `event` to a random sample, plus their bind variables.
+
+    `compile_filters(variable)` should return the FILTER lines (and any
+    LETs they need) for that loop variable. They run inside the index
+    scans, before LIMIT, so every filtered event counts towards `size`. With
+    `strata`, each of `strata_values` gets an equal share of `size`.
+    """
+    if strata is not None and strata not in STRATA_FIELDS:
+        raise ValueError(f"strata must be one of: {', '.join(STRATA_FIELDS)}")
+    values = list(strata_values) if strata else [None]
+    if not values:
+        values = [None]
+    per_stratum = max(1, math.ceil(size / len(values)))
+    stratum_field = STRATA_FIELDS.get(strata)
+    compile_filters = compile_filters or (lambda variable: "")
+
+    # Scan from a random start to 1, then wrap around from 0
+    head = _window("head", stratum_field, compile_filters("head"), "{v}.rnd >= @rnd_start")
+    tail = _window("tail", stratum_field, compile_filters("tail"), "{v}.rnd >= 0 AND {v}.rnd < @rnd_start")
+    clause = "\n".join([
+        "    FOR stratum IN @strata",
+        "        LET picks = APPEND(",
+        head + ",",
+        tail,
+        "        )",
+        "        FOR event IN SLICE(picks, 0, @per_stratum)",
+    ])
+    bind_vars = {
+        "strata": values,
+        "per_stratum": per_stratum,
+        "rnd_start": random.random() if start is None else start,
+    }
+    return clause, bind_vars
+
+
+def sample_event_keys(db, size, strata=None, strata_values=None):
+    """Keys of a random sample of events, optionally stratified"""
+    if strata and strata_values is None:
+        strata_values = stratum_values(db, strata)
+    clause, bind_vars = sample_clause(size, strata, strata_values)
+    query = clause + "\n        LIMIT @size\n        RETURN event._key"
+    bind_vars["size"] = size
+    return list(db.aql.execute(query, bind_vars=bind_vars))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Random event sampling utilities')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Set rnd/geoCountryCode on events loaded without them')
+    parser.add_argument('--sample', type=int, help='Print the keys of a sample of this size')
+    parser.add_argument('--strata', choices=list(STRATA_FIELDS), help='Stratify the sample')
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if args.backfill:
+        print(f"Backfilled {backfill_random_values(db)} events")
+    if args.sample:
+        for key in sample_event_keys(db, args.sample, args.strata):
+            print(key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""In-memory similarity search over event features.
+
+find_similar_events used to score every event in AQL, then sort and
+LIMIT, so each lookup was a full scan on the server. This index keeps one
+compact NumPy array per feature (eventCode, quadClass, goldsteinScale,
+avgTone, numMentions, location country). It scores a batch of target
+events against all of them block by block, keeping a running top k.
+
+The default weights reproduce the AQL score exactly:
+
+    (eventCode equal) + (quadClass equal)
+    + (|goldsteinScale difference| < 1) + (|avgTone difference| < 5)
+
+Mentions (within a factor of about two) and location (same country) are
+indexed too. Their weights are 0 unless a caller asks for them.
+
+The index grows by appending cleaned frames or by pulling events added
+since its newest dateAdded from the database. Reloaded events replace
+their old rows. The loaders append every chunk they write to the saved
+index (see open_for_ingest). The index records the ingest epoch (see
+query_cache.py) it is current with; find_similar_events falls back to
+the AQL scan while the database is ahead of it. save() writes one .npy
+file per column plus meta.json. load() memory-maps those files, so
+several processes share one copy in the page cache.
+"""
+import argparse
+import glob
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from arango_pool import get_db
+from query_cache import read_ingest_epoch
+
+ARANGO_DB = os.getenv("ARANGO_DB", "Gdelt_DB")
+SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", "similarity_index")
+
+FORMAT_VERSION = 1
+
+# Feature columns and their stored dtypes
+COLUMNS = {
+    "eventCode": np.int32,
+    "quadClass": np.int8,
+    "goldsteinScale": np.float64,
+    "avgTone": np.float64,
+    "numMentions": np.int32,
+    "country": np.int32,
+    "dateAdded": np.int64,
+}
+
+# Stands in for null codes; AQL treats null == null as a match, and so does this
+NULL_CODE = -1
+
+# Score weights; the defaults match the AQL in find_similar_events
+WEIGHTS = {
+    "eventCode": 1.0,
+    "quadClass": 1.0,
+    "goldsteinScale": 1.0,
+    "avgTone": 1.0,
+    "numMentions": 0.0,
+    "location": 0.0,
+}
+
+GOLDSTEIN_TOLERANCE = 1.0
+TONE_TOLERANCE = 5.0
+# |log1p(a) - log1p(b)| below this: mention counts within about a factor of two
+MENTIONS_TOLERANCE = float(np.log(2.0))
+
+# Indexed events scored per step; bounds the score matrix to targets x BLOCK_ROWS
+BLOCK_ROWS = 65536
+
+# Events attributes fetched from the database
+FEATURES_QUERY = """
+FOR e IN Events
+    {since_filter}
+    RETURN {{
+        _key: e._key,
+        eventCode: e.eventCode,
+        quadClass: e.quadClass,
+        goldsteinScale: e.goldsteinScale,
+        avgTone: e.avgTone,
+        numMentions: e.numMentions,
+        geoCountryCode: e.geoCountryCode,
+        dateAdded: e.dateAdded
+    }}
+"""
+CURSOR_BATCH_SIZE = 10000
+
+# Cleaned CSV column -> document attribute, for appending frames at ingest
+FRAME_FIELDS = {
+    "GlobalEventID": "_key",
+    "EventCode": "eventCode",
+    "QuadClass": "quadClass",
+    "GoldsteinScale": "goldsteinScale",
+    "AvgTone": "avgTone",
+    "NumMentions": "numMentions",
+    "Actor1Geo_CountryCode": "geoCountryCode",
+    "DateAdded": "dateAdded",
+}
+
+
+def _codes(values, dtype):
+    # Nullable integers -> fixed-width ints with NULL_CODE for missing values
+    return pd.to_numeric(values, errors="coerce").fillna(NULL_CODE).to_numpy(dtype)
+
+
+def _numbers(values):
+    # AQL arithmetic treats null as 0, so missing scores are stored as 0
+    return pd.to_numeric(values, errors="coerce").fillna(0.0).to_numpy(np.float64)
+
+
+class SimilarityIndex:
+    """Feature arrays for every indexed event plus its key.
+
+    Rows are addressed by position. `keys` is a fixed-width string array,
+    and a sorted view of it maps keys to rows without a dict.
+    """
+
+    def __init__(self, keys=None, columns=None, countries=None, epoch=None):
+        self.keys = np.asarray([] if keys is None else keys, dtype=str)
+        self.columns = columns or {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+        self.countries = list(countries or [])
+        self._country_codes = {country: i for i, country in enumerate(self.countries)}
+        # Ingest epoch the index holds every event of; None if unknown
+        self.epoch = epoch
+        self._order = None
+        self._log_mentions = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    # Building
+
+    @classmethod
+    def from_frame(cls, df):
+        """Index built from cleaned rows (see Clean_CSV.py)"""
+        index = cls()
+        index.append_frame(df)
+        return index
+
+    @classmethod
+    def from_db(cls, db):
+        """Index of every event in the database"""
+        index = cls()
+        index.update_from_db(db)
+        return index
+
+    def is_current(self, db):
+        """True if no ingest into `db` happened since the index last caught up"""
+        return self.epoch is not None and self.epoch == read_ingest_epoch(db)
+
+    def _country_column(self, values):
+        codes = np.full(len(values), NULL_CODE, dtype=np.int32)
+        for i, country in enumerate(values):
+            if country is None or country is pd.NA or country != country:
+                continue
+            code = self._country_codes.get(country)
+            if code is None:
+                code = self._country_codes[country] = len(self.countries)
+                self.countries.append(country)
+            codes[i] = code
+        return codes
+
+    def append_documents(self, documents):
+        """Add events given as dicts of Events attributes (as FEATURES_QUERY returns)"""
+        frame = pd.DataFrame.from_records(documents, columns=list(FRAME_FIELDS.values()))
+        return self._append(frame)
+
+    def append_frame(self, df):
+        """Add cleaned rows, e.g. each chunk a loader has just written"""
+        frame = df.reindex(columns=list(FRAME_FIELDS)).rename(columns=FRAME_FIELDS)
+        return self._append(frame[frame["_key"].notna()])
+
+    def _append(self, frame):
+        if not len(frame):
+            return 0
+        frame = frame.drop_duplicates("_key", keep="last")
+        keys = frame["_key"].astype(str).to_numpy(dtype=str)
+        added = {
+            "eventCode": _codes(frame["eventCode"], np.int32),
+            "quadClass": _codes(frame["quadClass"], np.int8),
+            "goldsteinScale": _numbers(frame["goldsteinScale"]),
+            "avgTone": _numbers(frame["avgTone"]),
+            "numMentions": pd.to_numeric(frame["numMentions"], errors="coerce").fillna(0).to_numpy(np.int32),
+            "country": self._country_column(frame["geoCountryCode"].tolist()),
+            "dateAdded": _codes(frame["dateAdded"], np.int64),
+        }
+
+        # Reloaded events replace their old rows
+        keep = ~np.isin(self.keys, keys) if len(self.keys) else slice(None)
+        self.keys = np.concatenate([self.keys[keep], keys])
+        self.columns = {
+            name: np.concatenate([self.columns[name][keep], values]) for name, values in added.items()
+        }
+        self._order = None
+        self._log_mentions = None
+        return len(keys)
+
+    def update_from_db(self, db, batch_size=CURSOR_BATCH_SIZE):
+        """Append events added since the newest indexed dateAdded (all events when empty).
+
+        Events added in that same 15-minute file are fetched again and
+        simply replace their rows. Events backfilled with an older
+        dateAdded are missed; rebuild the index after a backfill.
+        """
+        # Read first: an ingest while the events are pulled leaves the index behind
+        epoch = read_ingest_epoch(db)
+        since = int(self.columns["dateAdded"].max()) if len(self) else None
+        bind_vars = {}
+        since_filter = ""
+        if since is not None and since != NULL_CODE:
+            since_filter = "FILTER e.dateAdded >= @since"
+            bind_vars["since"] = since
+        cursor = db.aql.execute(
+            FEATURES_QUERY.format(since_filter=since_filter),
+            bind_vars=bind_vars,
+            batch_size=batch_size,
+            stream=True,
+        )
+        # Gather into frames batch by batch; one append at the end copies the arrays once
+        columns = list(FRAME_FIELDS.values())
+        frames, batch = [], []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                frames.append(pd.DataFrame.from_records(batch, columns=columns))
+                batch = []
+        frames.append(pd.DataFrame.from_records(batch, columns=columns))
+        appended = self._append(pd.concat(frames, ignore_index=True))
+        self.epoch = epoch
+        return appended
+
+    # Persistence
+
+    def save(self, path):
+        """Write the index under directory `path`.
+
+        Columns go to new files named after a fresh generation. meta.json
+        is replaced last, so readers see the old index or the new one,
+        never a mix. Files of older generations are removed afterwards.
+        """
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        generation = _read_meta(path).get("generation", 0) + 1 if os.path.exists(meta_path) else 1
+
+        for name, values in [("keys", self.keys), *self.columns.items()]:
+            np.save(os.path.join(path, f"{name}.{generation}.npy"), np.ascontiguousarray(values))
+
+        fd, tmp_path = tempfile.mkstemp(dir=path, prefix=".meta_")
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "generation": generation,
+                "rows": len(self),
+                "countries": self.countries,
+                "epoch": self.epoch,
+            }, f)
+        os.replace(tmp_path, meta_path)
+
+        for stale in glob.glob(os.path.join(path, "*.npy")):
+            if not stale.endswith(f".{generation}.npy"):
+                os.remove(stale)
+        return generation
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open an index written by save(); columns are memory-mapped unless mmap=False"""
+        meta = _read_meta(path)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported similarity index version in {path}: {meta.get('version')}")
+        generation = meta["generation"]
+        mode = "r" if mmap else None
+
+        def column(name):
+            return np.load(os.path.join(path, f"{name}.{generation}.npy"), mmap_mode=mode)
+
+        return cls(
+            keys=column("keys"),
+            columns={name: column(name) for name in COLUMNS},
+            countries=meta["countries"],
+            epoch=meta.get("epoch"),
+        )
+
+    # Queries
+
+    def rows_for(self, keys):
+        """Row of each key, or -1 when the key is not indexed"""
+        keys = np.asarray(keys, dtype=str)
+        if self._order is None:
+            self._order = np.argsort(self.keys, kind="stable")
+        if not len(self):
+            return np.full(len(keys), -1)
+        sorted_keys = self.keys[self._order]
+        positions = np.searchsorted(sorted_keys, keys).clip(0, len(self) - 1)
+        found = sorted_keys[positions] == keys
+        return np.where(found, self._order[positions], -1)
+
+    def _mentions(self):
+        if self._log_mentions is None:
+            self._log_mentions = np.log1p(self.columns["numMentions"].astype(np.float32))
+        return self._log_mentions
+
+    def _targets_from_rows(self, rows):
+        targets = {name: np.asarray(values[rows]) for name, values in self.columns.items()}
+        targets["logMentions"] = self._mentions()[rows]
+        return targets
+
+    def _targets_from_documents(self, documents):
+        frame = pd.DataFrame.from_records(documents, columns=list(FRAME_FIELDS.values()))
+        countries = [self._country_codes.get(c, NULL_CODE) if isinstance(c, str) else NULL_CODE
+                     for c in frame["geoCountryCode"]]
+        mentions = pd.to_numeric(frame["numMentions"], errors="coerce").fillna(0).to_numpy(np.float32)
+        return {
+            "eventCode": _codes(frame["eventCode"], np.int32),
+            "quadClass": _codes(frame["quadClass"], np.int8),
+            "goldsteinScale": _numbers(frame["goldsteinScale"]),
+            "avgTone": _numbers(frame["avgTone"]),
+            "country": np.asarray(countries, dtype=np.int32),
+            "logMentions": np.log1p(mentions),
+        }
+
+    def _score(self, targets, rows, weights):
+        """targets x indexed-events score matrix; `rows` is a slice or an array of rows"""
+        columns = {name: self.columns[name][rows] for name in ("eventCode", "quadClass",
+                                                                "goldsteinScale", "avgTone", "country")}
+        scores = np.zeros((len(targets["eventCode"]), len(columns["eventCode"])), dtype=np.float32)
+
+        def add(weight, matches):
+            if weight:
+                scores[:] += weight * matches
+
+        add(weights["eventCode"], columns["eventCode"] == targets["eventCode"][:, None])
+        add(weights["quadClass"], columns["quadClass"] == targets["quadClass"][:, None])
+        add(weights["goldsteinScale"],
+            np.abs(columns["goldsteinScale"] - targets["goldsteinScale"][:, None]) < GOLDSTEIN_TOLERANCE)
+        add(weights["avgTone"],
+            np.abs(columns["avgTone"] - targets["avgTone"][:, None]) < TONE_TOLERANCE)
+        if weights["numMentions"]:
+            add(weights["numMentions"],
+                np.abs(self._mentions()[rows] - targets["logMentions"][:, None]) < MENTIONS_TOLERANCE)
+        if weights["location"]:
+            # Unknown locations never match
+            add(weights["location"], (columns["country"] == targets["country"][:, None])
+                & (targets["country"][:, None] != NULL_CODE))
+        return scores
+
+    def _top_k(self, targets, k, exclude_rows, weights):
+        """(rows, scores), each targets x k, best first"""
+        count = len(targets["eventCode"])
+        best_rows = np.empty((count, 0), dtype=np.int64)
+        best_scores = np.empty((count, 0), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, len(self))
+            scores = self._score(targets, slice(start, stop), weights)
+            inside = (exclude_rows >= start) & (exclude_rows < stop)
+            scores[np.flatnonzero(inside), exclude_rows[inside] - start] = -np.inf
+
+            # Best k of this block, merged with the best k so far
+            take = min(k, stop - start)
+            picked = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            rows = np.concatenate([best_rows, picked + start], axis=1)
+            merged = np.concatenate([best_scores, np.take_along_axis(scores, picked, axis=1)], axis=1)
+            order = np.argsort(-merged, axis=1, kind="stable")[:, :k]
+            best_rows = np.take_along_axis(rows, order, axis=1)
+            best_scores = np.take_along_axis(merged, order, axis=1)
+        return best_rows, best_scores
+
+    def _results(self, rows, scores):
+        results = []
+        for target_rows, target_scores in zip(rows, scores):
+            valid = np.isfinite(target_scores)
+            results.append([(str(self.keys[row]), float(score))
+                            for row, score in zip(target_rows[valid], target_scores[valid])])
+        return results
+
+    def similar_batch(self, keys, k=5, weights=None):
+        """Top-k (key, score) lists for several indexed events at once.
+
+        Each target event is excluded from its own results. Unknown keys
+        raise KeyError.
+        """
+        rows = self.rows_for(keys)
+        missing = [key for key, row in zip(keys, rows) if row < 0]
+        if missing:
+            raise KeyError(f"Events not in the similarity index: {', '.join(map(str, missing[:5]))}")
+        if k < 1 or not len(self):
+            return [[] for _ in rows]
+        weights = {**WEIGHTS, **(weights or {})}
+        return self._results(*self._top_k(self._targets_from_rows(rows), k, rows, weights))
+
+    def similar(self, key, k=5, weights=None):
+        """Top-k (key, score) list for one indexed event"""
+        return self.similar_batch([key], k, weights)[0]
+
+    def similar_to(self, documents, k=5, weights=None):
+        """Top-k lists for events given as documents, e.g. ones not indexed yet.
+
+        An indexed event with the same key is excluded from its own results.
+        """
+        if k < 1 or not len(self):
+            return [[] for _ in documents]
+        weights = {**WEIGHTS, **(weights or {})}
+        exclude = self.rows_for([str(document.get("_key")) for document in documents])
+        return self._results(*self._top_k(self._targets_from_documents(documents), k, exclude, weights))
+
+    def pair_scores(self, key, other_keys, weights=None):
+        """Scores of the indexed events `other_keys` against the indexed event `key`"""
+        rows = self.rows_for([key, *other_keys])
+        if (rows < 0).any():
+            raise KeyError("Events not in the similarity index")
+        weights = {**WEIGHTS, **(weights or {})}
+        return self._score(self._targets_from_rows(rows[:1]), rows[1:], weights)[0].tolist()
+
+
+def _read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index(path=SIMILARITY_INDEX_DIR):
+    """The saved index at `path`, memory-mapped, or None if there is none.
+
+    Reopened when another process saves a newer generation.
+    """
+    global _index, _index_mtime
+    try:
+        mtime = os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            _index = SimilarityIndex.load(path)
+            _index_mtime = mtime
+        return _index
+
+
+def open_for_ingest(path=SIMILARITY_INDEX_DIR):
+    """The saved index at `path` loaded into memory for appending, or None if there is none.
+
+    Loaders append each chunk they write, set `epoch` to the epoch their
+    bump_ingest_epoch() returned and save. Two loaders saving at once can
+    drop each other's rows; the epoch check in find_similar_events then
+    falls back to AQL until the next --update.
+    """
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return SimilarityIndex.load(path, mmap=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, update and query the event similarity index')
+    parser.add_argument('--db', default=ARANGO_DB, help='Database name')
+    parser.add_argument('--path', default=SIMILARITY_INDEX_DIR, help='Index directory')
+    parser.add_argument('--build', action='store_true', help='Index every event in the database')
+    parser.add_argument('--update', action='store_true', help='Append events added since the last update')
+    parser.add_argument('--append', nargs='+', metavar='FILE', help='Append cleaned CSV/Parquet files')
+    parser.add_argument('--similar', metavar='KEY', help='Print the events most similar to this one')
+    parser.add_argument('--limit', type=int, default=5, help='Results for --similar')
+    args = parser.parse_args()
+
+    if args.build:
+        index = SimilarityIndex.from_db(get_db(args.db))
+    elif os.path.exists(os.path.join(args.path, 'meta.json')):
+        index = SimilarityIndex.load(args.path, mmap=not (args.update or args.append))
+    else:
+        index = SimilarityIndex()
+
+    changed = args.build
+    if args.update:
+        print(f"Appended {index.update_from_db(get_db(args.db))} events")
+        changed = True
+    if args.append:
+        from bulk_loader import read_cleaned_csv
+
+        for path in args.append:
+            appended = sum(index.append_frame(chunk) for chunk in read_cleaned_csv(path))
+            print(f"Appended {appended} events from {path}")
+        changed = True
+    if changed:
+        index.save(args.path)
+        print(f"Saved {len(index)} events to {args.path}")
+
+    if args.similar:
+        for key, score in index.similar(args.similar, args.limit):
+            print(f"{key}  {score:g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from functools import lru_cache
+import networkx as nx
+
+# Collections some deployments add on top of the core model; joined in when present
+OPTIONAL_COLLECTIONS = ("QuadClasses", "ActorType3Codes", "TypeRelations", "Countries", "CountryRelations")
+# Vertex collections the traversals can reach; clusters require them in a WITH line
+VERTEX_COLLECTIONS = ("Events", "Actors", "Locations", "Countries", "QuadClasses", "ActorType3Codes")
+
+_EVENTS = """
+LET events = (
+    FOR key IN @event_keys
+        LET e = DOCUMENT('Events', key)
+        FILTER e != null
+        RETURN e
+)
+LET hops = (
+    FOR e IN events
+        FOR v, rel IN 1..1 OUTBOUND e EventRelations
+            FILTER v != null
+            RETURN {
+                node: v,
+                edge: {
+                    from: rel._from,
+                    to: rel._to,
+                    key: rel._key,
+                    type: NOT_NULL(rel.type,
+                                   PARSE_IDENTIFIER(rel._to).collection == 'Actors' ? 'HAS_ACTOR' : 'OCCURRED_AT')
+                }
+            }
+)
+LET neighbors = UNIQUE(hops[*].node)
+LET actors = neighbors[* FILTER PARSE_IDENTIFIER(CURRENT).collection == 'Actors']
+LET event_nodes = (
+    FOR e IN events
+        RETURN {_id: e._id, type: 'Events', key: e._key, quadClass: e.quadClass, eventCode: e.eventCode}
+)
+LET neighbor_nodes = (
+    FOR v IN neighbors
+        RETURN MERGE(UNSET(v, '_id', '_key', '_rev'),
+                     {_id: v._id, type: PARSE_IDENTIFIER(v).collection, key: v._key})
+)
+"""
+
+_QUADCLASSES = """
+LET quadclass_nodes = (
+    FOR qc IN UNIQUE(events[*].quadClass)
+        FILTER qc != null
+        LET q = DOCUMENT('QuadClasses', TO_STRING(qc))
+        FILTER q != null
+        RETURN {_id: q._id, type: 'QuadClasses', key: q._key, description: NOT_NULL(q.description, '')}
+)
+LET quadclass_edges = (
+    FOR e IN events
+        LET qid = CONCAT('QuadClasses/', e.quadClass)
+        FILTER e.quadClass != null AND qid IN quadclass_nodes[*]._id
+        RETURN {from: e._id, to: qid, type: 'HAS_QUADCLASS'}
+)
+"""
+
+_TYPE_CODES = """
+LET type_nodes = (
+    FOR code IN UNIQUE(actors[*].type3Code)
+        FILTER code != null
+        LET t = DOCUMENT('ActorType3Codes', code)
+        FILTER t != null
+        RETURN {_id: t._id, type: 'ActorType3Codes', key: t._key, code: NOT_NULL(t.code, t._key)}
+)
+LET type_edges = (
+    FOR a IN actors
+        LET tid = CONCAT('ActorType3Codes/', a.type3Code)
+        FILTER a.type3Code != null AND tid IN type_nodes[*]._id
+        RETURN {from: a._id, to: tid, type: 'HAS_TYPE'}
+)
+"""
+
+_TYPE_RELATIONS = """
+LET type_relation_edges = (
+    FOR t IN type_nodes
+        FOR v, rel IN 1..1 ANY t._id TypeRelations
+            FILTER v._id IN node_ids
+            RETURN {from: rel._from, to: rel._to, key: rel._key, type: NOT_NULL(rel.type, 'RELATED_TO')}
+)
+"""
+
+_COUNTRIES = """
+LET country_hits = (
+    FOR id IN node_ids
+        FOR c IN 1..1 ANY id CountryRelations
+            FILTER PARSE_IDENTIFIER(c).collection == 'Countries'
+            RETURN {_id: c._id, type: 'Countries', key: c._key, code: NOT_NULL(c.code, c._key)}
+)
+LET country_nodes = UNIQUE(country_hits)
+LET country_edges = (
+    FOR c IN country_nodes
+        FOR v, rel IN 1..1 ANY c._id CountryRelations
+            FILTER v._id IN APPEND(node_ids, country_nodes[*]._id)
+            RETURN {from: rel._from, to: rel._to, key: rel._key, type: NOT_NULL(rel.type, 'RELATED_TO')}
+)
+"""
+
+
+@lru_cache(maxsize=None)
+def subgraph_query(optional=frozenset()):
+    """AQL for the neighborhood of a set of events, joining whichever optional collections exist"""
+    # WITH may only name existing collections
+    declared = [name for name in VERTEX_COLLECTIONS if name not in OPTIONAL_COLLECTIONS or name in optional]
+    parts = [f"WITH {', '.join(declared)}\n", _EVENTS]
+    nodes = ["event_nodes", "neighbor_nodes"]
+    edges = ["hops[*].edge"]
+
+    if "QuadClasses" in optional:
+        parts.append(_QUADCLASSES)
+        nodes.append("quadclass_nodes")
+        edges.append("quadclass_edges")
+    if "ActorType3Codes" in optional:
+        parts.append(_TYPE_CODES)
+        nodes.append("type_nodes")
+        edges.append("type_edges")
+
+    parts.append(f"LET node_ids = FLATTEN([{', '.join(nodes)}])[*]._id\n")
+    if "ActorType3Codes" in optional and "TypeRelations" in optional:
+        parts.append(_TYPE_RELATIONS)
+        edges.append("type_relation_edges")
+    if "Countries" in optional and "CountryRelations" in optional:
+        parts.append(_COUNTRIES)
+        nodes.append("country_nodes")
+        edges.append("country_edges")
+
+    parts.append(f"RETURN {{nodes: FLATTEN([{', '.join(nodes)}]), edges: FLATTEN([{', '.join(edges)}])}}")
+    return "".join(parts)
+
+
+def available_collections(db):
+    """Names of the optional collections that exist in `db`"""
+    names = {collection["name"] for collection in db.collections()}
+    return frozenset(name for name in OPTIONAL_COLLECTIONS if name in names)
+
+
+def extract_subgraph(db, event_keys, optional=None):
+    """Fetch the neighborhood of the seed events in one query.
+
+    Returns {"nodes": [...], "edges": [...]}. Every node carries `_id`,
+    `type` (its collection) and `key`. Every edge carries `from`, `to` and
+    `type`, plus `key` for stored edges. Events keep only the attributes
+    the graph views use. QuadClasses, ActorType3Codes and Countries are
+    only joined when those collections exist. Pass `optional` to skip the
+    lookup.
+    """
+    if optional is None:
+        optional = available_collections(db)
+    cursor = db.aql.execute(subgraph_query(frozenset(optional)),
+                            bind_vars={"event_keys": [str(key) for key in event_keys]})
+    return next(cursor, {"nodes": [], "edges": []})
+
+
+def build_graph(subgraph):
+    """Turn an extract_subgraph() result into a NetworkX graph"""
+    G = nx.Graph()
+    for node in subgraph["nodes"]:
+        attributes = dict(node)
+        G.add_node(attributes.pop("_id"), **attributes)
+    for edge in subgraph["edges"]:
+        attributes = {"type": edge["type"]}
+        if edge.get("key"):
+            attributes["key"] = edge["key"]
+        G.add_edge(edge["from"], edge["to"], **attributes)
+    return G
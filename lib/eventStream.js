@@ -0,0 +1,74 @@
+// lib/eventStream.js
+
+export const EVENTS_PAGE_SIZE = 2000;
+
+/**
+ * Read a newline-delimited JSON response body, calling onRow for each row
+ * as soon as its line has arrived.
+ * @param {Response} response - fetch Response with an NDJSON body
+ * @param {Function} onRow - called with each parsed row
+ * @returns {Promise<number>} Number of rows read
+ */
+export const readNdjson = async (response, onRow) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  let count = 0;
+
+  const flushLine = (line) => {
+    if (line.trim()) {
+      onRow(JSON.parse(line));
+      count += 1;
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.forEach(flushLine);
+  }
+
+  buffered += decoder.decode();
+  flushLine(buffered);
+  return count;
+};
+
+/**
+ * Fetch every event from /api/events using keyset paging, one NDJSON page
+ * at a time.
+ * @param {string} baseUrl - URL of the events endpoint
+ * @param {Object} options
+ * @param {Object} [options.params] - extra query parameters (e.g. filters)
+ * @param {number} [options.pageSize] - rows per page
+ * @param {Function} [options.onPage] - called with each page's rows as it completes
+ * @returns {Promise<Array>} All events
+ */
+export const fetchEventPages = async (baseUrl, { params = {}, pageSize = EVENTS_PAGE_SIZE, onPage } = {}) => {
+  const events = [];
+  let after = null;
+
+  while (true) {
+    const query = new URLSearchParams({ ...params, limit: String(pageSize), format: 'ndjson' });
+    if (after) query.set('after', after);
+
+    const separator = baseUrl.includes('?') ? '&' : '?';
+    const response = await fetch(`${baseUrl}${separator}${query.toString()}`);
+    if (!response.ok) {
+      throw new Error(`Error fetching events: ${response.status}`);
+    }
+
+    const page = [];
+    await readNdjson(response, (row) => page.push(row));
+    events.push(...page);
+    if (onPage) onPage(page, events);
+
+    if (page.length < pageSize) break;
+    after = page[page.length - 1].key;
+  }
+
+  return events;
+};